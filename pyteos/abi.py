@@ -0,0 +1,397 @@
+#!/usr/bin/python3
+
+"""
+Serialization of action data according to contract ABI definitions.
+
+.. module:: abi
+    :platform: Unix, Windows
+    :synopsis: Serialization of action data according to contract ABI definitions.
+
+.. moduleauthor:: Tokenika
+
+"""
+
+import struct
+import hashlib
+import datetime
+import binascii
+
+_NAME_CHARS = ".12345abcdefghijklmnopqrstuvwxyz"
+_BASE58_CHARS = \
+    "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_EPOCH = datetime.datetime(1970, 1, 1)
+_BLOCK_TIMESTAMP_EPOCH = datetime.datetime(2000, 1, 1)
+
+# NumPy type codes of the columns of builtin types. Columns of other types 
+# hold Python objects.
+_COLUMN_TYPES = {
+    "bool": "?",
+    "int8": "i1", "uint8": "u1", "int16": "i2", "uint16": "u2",
+    "int32": "i4", "uint32": "u4", "int64": "i8", "uint64": "u8",
+    "varint32": "i4", "varuint32": "u4",
+    "float32": "f4", "float64": "f8",
+    "name": "U13", "account_name": "U13", "permission_name": "U13",
+    "action_name": "U13", "table_name": "U13", "scope_name": "U13",
+    "time": "M8[s]", "time_point_sec": "M8[s]", "time_point": "M8[us]",
+    "block_timestamp_type": "M8[ms]",
+    "checksum160": "U40", "checksum256": "U64", "checksum512": "U128",
+    }
+
+
+class AbiError(Exception):
+    """ Raised if data does not match the ABI definition.
+    """
+    pass
+
+
+def name_to_int(name):
+    """ Converts an EOSIO name, for example `eosio.token`, to `uint64`.
+    """
+    name = str(name)
+    if len(name) > 13:
+        raise AbiError("Name is longer than 13 characters: " + name)
+
+    value = 0
+    for i in range(13):
+        symbol = 0
+        if i < len(name):
+            symbol = _NAME_CHARS.find(name[i])
+            if symbol < 0:
+                raise AbiError("Invalid character in name: " + name)
+        if i < 12:
+            value |= (symbol & 0x1f) << (64 - 5 * (i + 1))
+        else:
+            value |= symbol & 0x0f
+    return value
+
+
+def symbol_to_int(precision, code):
+    """ Converts a symbol, given its precision and code, to `uint64`.
+    """
+    if len(code) > 7 or not code.isupper():
+        raise AbiError("Invalid symbol code: " + code)
+    value = int(precision) & 0xff
+    for i, char in enumerate(code):
+        value |= ord(char) << (8 * (i + 1))
+    return value
+
+
+def base58_decode(text):
+    """ Decodes a base58 string into bytes.
+    """
+    value = 0
+    for char in text:
+        digit = _BASE58_CHARS.find(char)
+        if digit < 0:
+            raise AbiError("Invalid base58 character: " + char)
+        value = value * 58 + digit
+
+    data = value.to_bytes((value.bit_length() + 7) // 8, "big")
+    leading_zeros = len(text) - len(text.lstrip(_BASE58_CHARS[0]))
+    return b"\x00" * leading_zeros + data
+
+
+def _ripemd160(data):
+    try:
+        return hashlib.new("ripemd160", data).digest()
+    except ValueError: # not provided by the local OpenSSL
+        return None
+
+
+def _time_seconds(text):
+    text = str(text).split(".")[0]
+    return datetime.datetime.strptime(text, "%Y-%m-%dT%H:%M:%S")
+
+
+class Serializer:
+    """ Serializes action data, according to the given contract ABI.
+
+    - **parameters**::
+
+        abi: The ABI of a contract, as a json object.
+
+    - **attributes**::
+
+        actions: A map of action names to the names of their data structures.
+        tables: A map of table names to the names of their row structures.
+        keys: A map of table names to the names of their primary key fields,
+            if declared.
+    """
+    def __init__(self, abi):
+        self.types = {}
+        self.structs = {}
+        self.actions = {}
+        self.tables = {}
+        self.keys = {}
+
+        for type_def in abi.get("types") or []:
+            self.types[type_def["new_type_name"]] = type_def["type"]
+        for struct_def in abi.get("structs") or []:
+            self.structs[struct_def["name"]] = struct_def
+        for action_def in abi.get("actions") or []:
+            self.actions[action_def["name"]] = action_def["type"]
+        for table_def in abi.get("tables") or []:
+            self.tables[table_def["name"]] = table_def["type"]
+            if table_def.get("key_names"):
+                self.keys[table_def["name"]] = table_def["key_names"][0]
+
+        self.__builtins = {
+            "bool": self.__bool,
+            "int8": lambda v: struct.pack("<b", int(v)),
+            "uint8": lambda v: struct.pack("<B", int(v)),
+            "int16": lambda v: struct.pack("<h", int(v)),
+            "uint16": lambda v: struct.pack("<H", int(v)),
+            "int32": lambda v: struct.pack("<i", int(v)),
+            "uint32": lambda v: struct.pack("<I", int(v)),
+            "int64": lambda v: struct.pack("<q", int(v)),
+            "uint64": lambda v: struct.pack("<Q", int(v)),
+            "int128": lambda v: int(v).to_bytes(16, "little", signed=True),
+            "uint128": lambda v: int(v).to_bytes(16, "little"),
+            "varint32": self.__varint32,
+            "varuint32": self.__varuint32,
+            "float32": lambda v: struct.pack("<f", float(v)),
+            "float64": lambda v: struct.pack("<d", float(v)),
+            "name": lambda v: struct.pack("<Q", name_to_int(v)),
+            "account_name": lambda v: struct.pack("<Q", name_to_int(v)),
+            "permission_name": lambda v: struct.pack("<Q", name_to_int(v)),
+            "action_name": lambda v: struct.pack("<Q", name_to_int(v)),
+            "table_name": lambda v: struct.pack("<Q", name_to_int(v)),
+            "scope_name": lambda v: struct.pack("<Q", name_to_int(v)),
+            "string": self.__string,
+            "bytes": self.__bytes,
+            "checksum160": lambda v: self.__checksum(v, 20),
+            "checksum256": lambda v: self.__checksum(v, 32),
+            "checksum512": lambda v: self.__checksum(v, 64),
+            "time": self.__time_point_sec,
+            "time_point_sec": self.__time_point_sec,
+            "time_point": self.__time_point,
+            "block_timestamp_type": self.__block_timestamp,
+            "symbol": self.__symbol,
+            "symbol_code": self.__symbol_code,
+            "asset": self.__asset,
+            "extended_asset": self.__extended_asset,
+            "public_key": self.__public_key,
+        }
+
+    def action_type(self, action):
+        """ Returns the name of the data type of the given action.
+        """
+        try:
+            return self.actions[action]
+        except KeyError:
+            raise AbiError("Action is not defined in the ABI: " + action)
+
+    def serialize(self, type_name, value):
+        """ Returns the binary representation of a value of the given type.
+        """
+        type_name = self.resolve(type_name)
+
+        if type_name.endswith("[]"):
+            if not isinstance(value, (list, tuple)):
+                raise AbiError("Array expected for type " + type_name)
+            return self.__varuint32(len(value)) + b"".join(
+                [self.serialize(type_name[:-2], item) for item in value])
+
+        if type_name.endswith("?"):
+            if value is None:
+                return b"\x00"
+            return b"\x01" + self.serialize(type_name[:-1], value)
+
+        if type_name in self.__builtins:
+            try:
+                return self.__builtins[type_name](value)
+            except (ValueError, TypeError, struct.error) as e:
+                raise AbiError(
+                    "Cannot serialize {} as {}: {}"
+                        .format(repr(value), type_name, e))
+
+        if type_name in self.structs:
+            return self.__struct(self.structs[type_name], value)
+
+        raise AbiError("Type is not supported: " + type_name)
+
+    def serialize_action(self, action, data):
+        """ Returns hex-encoded binary data for the given action.
+
+        - **parameters**::
+
+            action: The name of the action.
+            data: The action arguments, as a dictionary.
+        """
+        return binascii.hexlify(
+            self.serialize(self.action_type(action), data)).decode("ascii")
+
+    def table_type(self, table):
+        """ Returns the name of the row type of the given table.
+        """
+        try:
+            return self.tables[table]
+        except KeyError:
+            raise AbiError("Table is not defined in the ABI: " + table)
+
+    def fields(self, type_name):
+        """ Returns the fields of a struct type, following the fields of its
+        base structs, as dictionaries with "name" and "type" keys.
+        """
+        return self.__fields(self.__struct_def(type_name))
+
+    def columns(self, type_name):
+        """ Returns the columns of a struct type, as a list of `(field, code)`
+        tuples, where `code` is a NumPy type code, "O" for Python objects, or
+        a list of columns, for struct fields. The code of arrays of builtin 
+        types is the code of the items followed by "[]".
+        """
+        columns = []
+        for field in self.fields(type_name):
+            field_type = self.resolve(field["type"])
+            if field_type in self.structs:
+                code = self.columns(field_type)
+            elif field_type.endswith("[]") \
+                    and self.resolve(field_type[:-2]) in _COLUMN_TYPES:
+                code = _COLUMN_TYPES[self.resolve(field_type[:-2])] + "[]"
+            else:
+                code = _COLUMN_TYPES.get(field_type, "O")
+            columns.append((field["name"], code))
+        return columns
+
+    def resolve(self, type_name):
+        """ Resolves type aliases declared in the ABI.
+        """
+        seen = set()
+        while type_name in self.types and not type_name in seen:
+            seen.add(type_name)
+            type_name = self.types[type_name]
+        return type_name
+
+    def __struct_def(self, type_name):
+        type_name = self.resolve(type_name)
+        if not type_name in self.structs:
+            raise AbiError("Struct expected: " + type_name)
+        return self.structs[type_name]
+
+    def __fields(self, struct_def):
+        """ Returns the fields of a struct, following the fields of its base
+        structs.
+        """
+        fields = []
+        seen = set()
+        while struct_def and not struct_def["name"] in seen:
+            seen.add(struct_def["name"])
+            fields = (struct_def.get("fields") or []) + fields
+            struct_def = self.__struct_def(struct_def["base"]) \
+                if struct_def.get("base") else None
+        return fields
+
+    def __struct(self, struct_def, value):
+        if not isinstance(value, dict):
+            raise AbiError("Object expected for type " + struct_def["name"])
+
+        fields = self.__fields(struct_def)
+        unknown = set(value) - set([field["name"] for field in fields])
+        if unknown:
+            raise AbiError("Fields not defined in {}: {}".format(
+                struct_def["name"], ", ".join(sorted(unknown))))
+
+        data = b""
+        for field in fields:
+            if not field["name"] in value:
+                if field["type"].endswith("?"):
+                    data += b"\x00"
+                    continue
+                raise AbiError("Missing field: " + field["name"])
+            data += self.serialize(field["type"], value[field["name"]])
+        return data
+
+    def __bool(self, value):
+        if isinstance(value, str):
+            value = value.lower() in ("true", "1")
+        return b"\x01" if value else b"\x00"
+
+    def __varuint32(self, value):
+        value = int(value)
+        data = b""
+        while True:
+            byte = value & 0x7f
+            value >>= 7
+            if value:
+                data += bytes([byte | 0x80])
+            else:
+                return data + bytes([byte])
+
+    def __varint32(self, value):
+        value = int(value)
+        return self.__varuint32(((value << 1) ^ (value >> 31)) & 0xffffffff)
+
+    def __string(self, value):
+        data = str(value).encode("utf-8")
+        return self.__varuint32(len(data)) + data
+
+    def __bytes(self, value):
+        data = binascii.unhexlify(value)
+        return self.__varuint32(len(data)) + data
+
+    def __checksum(self, value, size):
+        data = binascii.unhexlify(value)
+        if len(data) != size:
+            raise AbiError("Checksum of {} bytes expected".format(size))
+        return data
+
+    def __time_point_sec(self, value):
+        seconds = (_time_seconds(value) - _EPOCH).total_seconds()
+        return struct.pack("<I", int(seconds))
+
+    def __time_point(self, value):
+        text = str(value)
+        micro = 0
+        if "." in text:
+            micro = int((text.split(".")[1] + "000000")[:6])
+        seconds = (_time_seconds(text) - _EPOCH).total_seconds()
+        return struct.pack("<q", int(seconds) * 1000000 + micro)
+
+    def __block_timestamp(self, value):
+        text = str(value)
+        half = 1 if "." in text and int(text.split(".")[1][:1] or 0) >= 5 \
+            else 0
+        seconds = (_time_seconds(text) - _BLOCK_TIMESTAMP_EPOCH) \
+            .total_seconds()
+        return struct.pack("<I", int(seconds) * 2 + half)
+
+    def __symbol(self, value):
+        precision, code = str(value).split(",")
+        return struct.pack("<Q", symbol_to_int(precision, code.strip()))
+
+    def __symbol_code(self, value):
+        return struct.pack("<Q", symbol_to_int(0, str(value)) >> 8)
+
+    def __asset(self, value):
+        amount, code = str(value).strip().split(" ")
+        precision = len(amount.split(".")[1]) if "." in amount else 0
+        return struct.pack("<q", int(amount.replace(".", ""))) \
+            + struct.pack("<Q", symbol_to_int(precision, code))
+
+    def __extended_asset(self, value):
+        try:
+            quantity = value["quantity"]
+            contract = value["contract"]
+        except (KeyError, TypeError):
+            raise AbiError(
+                "Extended asset expects 'quantity' and 'contract': "
+                    + repr(value))
+        return self.__asset(quantity) \
+            + struct.pack("<Q", name_to_int(contract))
+
+    def __public_key(self, value):
+        value = str(value)
+        if value.startswith("PUB_K1_"):
+            data = base58_decode(value[7:])
+            check = _ripemd160(data[:-4] + b"K1")
+        elif value.startswith("EOS"):
+            data = base58_decode(value[3:])
+            check = _ripemd160(data[:-4])
+        else:
+            raise AbiError("Unsupported public key format: " + value)
+
+        key = data[:-4]
+        if len(key) != 33 or (check is not None and check[:4] != data[-4:]):
+            raise AbiError("Invalid public key: " + value)
+        return self.__varuint32(0) + key
@@ -0,0 +1,185 @@
+#!/usr/bin/python3
+
+"""
+Local archive of irreversible blocks, for offline analysis.
+
+.. module:: archive
+    :platform: Unix, Windows
+    :synopsis: Local archive of irreversible blocks, for offline analysis.
+
+.. moduleauthor:: Tokenika
+
+"""
+
+import os
+import mmap
+import zlib
+import struct
+import threading
+import pyteos
+
+_MAGIC = b"EOSFBLK1"
+_HEADER = struct.Struct("<8sQ")
+_OFFSET = struct.Struct("<Q")
+_LENGTH = struct.Struct("<I")
+
+
+class BlockArchive:
+    """ An append-only archive of a contiguous range of blocks.
+
+    Blocks are stored in the `<path>.blocks` file as zlib compressed json
+    records, each prefixed with its length. The `<path>.index` file holds a
+    header with the number of the first block, followed by fixed-width
+    offsets of the records, one per block. Both files are read through
+    `mmap`, so that random access does not read the whole archive.
+
+    Only irreversible blocks are exported, therefore archived blocks never
+    change. Set the archive with `pyteos.set_block_archive`, to make
+    `GetBlock` read archived blocks without calling the node.
+
+    - **parameters**::
+
+        path: The path of the archive files, without extension.
+
+    - **attributes**::
+
+        first: The number of the first archived block, `None` if empty.
+        count: The number of archived blocks.
+    """
+    def __init__(self, path):
+        self.blocks_file = path + ".blocks"
+        self.index_file = path + ".index"
+        self.first = None
+        self.count = 0
+        self.__blocks = None
+        self.__index = None
+        self.__lock = threading.Lock()
+
+        if os.path.exists(self.index_file) \
+                and os.path.getsize(self.index_file) >= _HEADER.size:
+            with open(self.index_file, "rb") as index:
+                magic, first = _HEADER.unpack(index.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError("Not a block archive: " + self.index_file)
+            self.first = first
+            self.count = (os.path.getsize(self.index_file) - _HEADER.size) \
+                // _OFFSET.size
+
+    @property
+    def last(self):
+        """ The number of the last archived block, `None` if empty.
+        """
+        return None if not self.count else self.first + self.count - 1
+
+    def __contains__(self, block_num):
+        try:
+            block_num = int(block_num)
+        except (TypeError, ValueError):
+            return False
+        return self.count > 0 \
+            and self.first <= block_num < self.first + self.count
+
+    def get(self, block_num):
+        """ Returns the json text of an archived block, `None` if the block
+        is not archived.
+        """
+        with self.__lock:
+            if not block_num in self:
+                return None
+            if self.__index is None:
+                self.__map()
+
+            offset, = _OFFSET.unpack_from(self.__index,
+                _HEADER.size + (int(block_num) - self.first) * _OFFSET.size)
+            length, = _LENGTH.unpack_from(self.__blocks, offset)
+            start = offset + _LENGTH.size
+            record = self.__blocks[start:start + length]
+        return zlib.decompress(record).decode("utf-8")
+
+    def append(self, block_num, block_text):
+        """ Appends the json text of a block next to the last archived one.
+        """
+        record = zlib.compress(block_text.encode("utf-8"))
+        with self.__lock:
+            self.__append(block_num, record)
+
+    def __append(self, block_num, record):
+        if self.count and block_num != self.first + self.count:
+            raise ValueError(
+                "Block {} does not follow the archive end {}."
+                    .format(block_num, self.last))
+        self.__unmap()
+
+        with open(self.blocks_file, "ab") as blocks:
+            offset = blocks.tell()
+            blocks.write(_LENGTH.pack(len(record)) + record)
+
+        with open(self.index_file, "ab") as index:
+            if not self.count:
+                index.truncate(0)
+                index.write(_HEADER.pack(_MAGIC, block_num))
+                self.first = block_num
+            index.write(_OFFSET.pack(offset))
+        self.count = self.count + 1
+
+    def export(self, first, last=None, is_verbose=True):
+        """ Fetches blocks from the node, and appends them to the archive.
+
+        Blocks that are not irreversible are not exported. Blocks already
+        archived are skipped.
+
+        - **parameters**::
+
+            first: The number of the first block to export.
+            last: The number of the last block to export, defaults to the
+                last irreversible block.
+            is_verbose: If `False`, do not print progress.
+
+        Returns the number of exported blocks.
+        """
+        get_info = pyteos.GetInfo(is_verbose=False)
+        if get_info.error:
+            return 0
+        irreversible = int(get_info.last_irreversible_block_num)
+        last = irreversible if last is None else min(int(last), irreversible)
+
+        if self.count:
+            if first > self.last + 1:
+                raise ValueError(
+                    "Block {} does not follow the archive end {}."
+                        .format(first, self.last))
+            first = max(first, self.last + 1)
+
+        exported = 0
+        for block_num in range(first, last + 1):
+            block = pyteos.GetBlock(block_num, fields=[], is_verbose=False)
+            if block.error:
+                break
+            self.append(block_num, block._json_text)
+            exported = exported + 1
+
+        if is_verbose:
+            pyteos.output__("archived blocks: {} - {}"
+                .format(self.first, self.last))
+        return exported
+
+    def close(self):
+        """ Releases the memory maps of the archive files.
+        """
+        with self.__lock:
+            self.__unmap()
+
+    def __map(self):
+        with open(self.blocks_file, "rb") as blocks:
+            self.__blocks = mmap.mmap(
+                blocks.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(self.index_file, "rb") as index:
+            self.__index = mmap.mmap(
+                index.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __unmap(self):
+        if self.__index is not None:
+            self.__index.close()
+            self.__blocks.close()
+        self.__index = None
+        self.__blocks = None
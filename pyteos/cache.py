@@ -0,0 +1,198 @@
+#!/usr/bin/python3
+
+"""
+Cache of responses to chain queries that never change.
+
+.. module:: cache
+    :platform: Unix, Windows
+    :synopsis: Cache of responses to chain queries that never change.
+
+.. moduleauthor:: Tokenika
+
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+import collections
+
+
+class ResponseCache:
+    """ A two-tier cache of json responses: an in-memory LRU limited by the
+    size of the cached texts, backed by an optional store on disk.
+
+    Only responses that cannot be reorganised are cached: blocks not above
+    the last irreversible block of the node that returned them, keyed by 
+    the chain id, and contract code keyed by its code hash.
+    Set the cache with `pyteos.set_response_cache`.
+
+    If the last irreversible block of a node goes backwards, the chain was
+    reset, for example a local node started again, and the cached blocks 
+    are dropped, from the disk store, too. The last irreversible blocks are
+    kept in the disk store, so that a reset is detected across processes.
+
+    - **parameters**::
+
+        budget: The maximal total length of the texts kept in memory,
+            defaults to 64 M characters.
+        path: The directory of the disk store, if `None`, there is no disk
+            store.
+        refresh_interval: The time in seconds, after which the last 
+            irreversible block number may be read again from the node, to
+            tell whether a block is irreversible, defaults to 1s.
+
+    - **attributes**::
+
+        chain_id: The chain id last reported by a node, "" if none.
+        hits: The number of responses served from memory.
+        disk_hits: The number of responses served from the disk store.
+        misses: The number of responses not found.
+        size: The total length of the texts kept in memory.
+    """
+    def __init__(self, budget=64 * 1024 * 1024, path=None, refresh_interval=1):
+        self.budget = budget
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.chain_id = ""
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.size = 0
+        self.__irreversible = {}
+        self.__marks = {}
+        self.__entries = collections.OrderedDict()
+        self.__lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.join(path, "blocks"), exist_ok=True)
+            try:
+                with open(self.__marks_file(), "r", encoding="utf-8") as f:
+                    self.__marks = json.load(f)
+            except (OSError, ValueError):
+                pass
+
+    def get(self, key):
+        """ Returns the cached text for the key, `None` if not cached.
+        """
+        with self.__lock:
+            text = self.__entries.get(key)
+            if text is not None:
+                self.__entries.move_to_end(key)
+                self.hits = self.hits + 1
+                return text
+
+        if self.path:
+            try:
+                with open(self.__file(key), "r", encoding="utf-8") as f:
+                    text = f.read()
+            except FileNotFoundError:
+                pass
+            else:
+                with self.__lock:
+                    self.disk_hits = self.disk_hits + 1
+                    self.__remember(key, text)
+                return text
+
+        with self.__lock:
+            self.misses = self.misses + 1
+        return None
+
+    def put(self, key, text):
+        """ Caches the text for the key. The caller guarantees that the
+        text never changes.
+        """
+        with self.__lock:
+            if key in self.__entries:
+                return
+            self.__remember(key, text)
+        if self.path:
+            file = self.__file(key)
+            if not os.path.exists(file):
+                self.__write(file, text)
+
+    def block_key(self, block):
+        """ Returns the key of a block, given its number or id, in the chain
+        last reported by a node.
+        """
+        return "block:{}:{}".format(self.chain_id, block)
+
+    def irreversible(self, block_num, node="", chain_id=""):
+        """ Records the last irreversible block number reported by a node.
+        If it is lower than the one reported before, the chain was reset, 
+        and the cached blocks are dropped.
+
+        - **parameters**::
+
+            block_num: The last irreversible block number.
+            node: The http address of the node, "" for the node of the 
+                `teos` configuration.
+            chain_id: The chain id reported by the node.
+        """
+        block_num = int(block_num)
+        mark = "{}@{}".format(chain_id, node)
+        with self.__lock:
+            if block_num < self.__marks.get(mark, 0):
+                self.__drop_blocks()
+            self.chain_id = chain_id
+            self.__irreversible[node] = (block_num, time.time())
+            if self.__marks.get(mark) != block_num:
+                self.__marks[mark] = block_num
+                if self.path:
+                    self.__write(self.__marks_file(), json.dumps(self.__marks))
+
+    def last_irreversible(self, node=""):
+        """ Returns the last irreversible block number reported by a node, 
+        0 if none.
+        """
+        with self.__lock:
+            return self.__irreversible.get(node, (0, 0))[0]
+
+    def irreversible_time(self, node=""):
+        """ Returns the time of the last report of a node, 0 if none.
+        """
+        with self.__lock:
+            return self.__irreversible.get(node, (0, 0))[1]
+
+    def clear(self):
+        """ Empties the memory tier, the disk store is kept.
+        """
+        with self.__lock:
+            self.__entries.clear()
+            self.size = 0
+
+    def __drop_blocks(self):
+        for key in [key for key in self.__entries if key.startswith("block:")]:
+            self.size = self.size - len(self.__entries.pop(key))
+        self.__marks = {}
+        if self.path:
+            shutil.rmtree(os.path.join(self.path, "blocks"), ignore_errors=True)
+            os.makedirs(os.path.join(self.path, "blocks"), exist_ok=True)
+
+    def __write(self, file, text):
+        temp = "{}.{}.{}.tmp".format(file, os.getpid(), threading.get_ident())
+        with open(temp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(temp, file)
+
+    def __marks_file(self):
+        return os.path.join(self.path, "irreversible.json")
+
+    def __remember(self, key, text):
+        if len(text) > self.budget:
+            return
+        self.__entries[key] = text
+        self.size = self.size + len(text)
+        while self.size > self.budget:
+            _, evicted = self.__entries.popitem(last=False)
+            self.size = self.size - len(evicted)
+
+    def __file(self, key):
+        return os.path.join(self.path, 
+            "blocks" if key.startswith("block:") else "", 
+            hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+    def __str__(self):
+        return "hits: {}, disk hits: {}, misses: {}, size: {}".format(
+            self.hits, self.disk_hits, self.misses, self.size)
@@ -0,0 +1,452 @@
+#!/usr/bin/python3
+
+"""
+Parallel, property-based fuzzing of contract actions.
+
+.. module:: fuzz
+    :platform: Unix, Windows
+    :synopsis: Parallel, property-based fuzzing of contract actions.
+
+.. moduleauthor:: Tokenika
+
+"""
+
+import time
+import random
+import binascii
+import threading
+import pyteos
+import abi
+
+_NAME_CHARS = "abcdefghijklmnopqrstuvwxyz12345"
+# Printable characters, without quotes and backslashes, that `teos`
+# arguments cannot take.
+_STRING_CHARS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ" \
+    "0123456789 .,:;-_+=!?#@()[]{}"
+_INTEGER_RANGES = {
+    "int8": (-2**7, 2**7 - 1), "uint8": (0, 2**8 - 1),
+    "int16": (-2**15, 2**15 - 1), "uint16": (0, 2**16 - 1),
+    "int32": (-2**31, 2**31 - 1), "uint32": (0, 2**32 - 1),
+    "int64": (-2**63, 2**63 - 1), "uint64": (0, 2**64 - 1),
+    "int128": (-2**127, 2**127 - 1), "uint128": (0, 2**128 - 1),
+    "varint32": (-2**31, 2**31 - 1), "varuint32": (0, 2**32 - 1),
+    }
+_NAME_TYPES = ("name", "account_name", "permission_name", "action_name",
+    "table_name", "scope_name")
+
+
+class PayloadGenerator:
+    """ Generates random action data, well-typed according to a contract ABI.
+
+    Integers are biased towards small values and range limits, names are
+    mostly the names of the given accounts, optional fields are sometimes
+    missing, and arrays are short.
+
+    - **parameters**::
+
+        serializer: An `abi.Serializer` of the contract.
+        names: The names that name fields are mostly chosen from.
+        public_keys: The public keys that key fields are chosen from.
+        symbols: The symbols of assets, defaults to ("EOS",).
+        max_array: The maximal length of arrays, defaults to 4.
+        seed: The seed of the random generator.
+    """
+    def __init__(
+            self, serializer, names=(), public_keys=(), symbols=("EOS",),
+            max_array=4, seed=None):
+        self.serializer = serializer
+        self.names = list(names)
+        self.public_keys = list(public_keys)
+        self.symbols = list(symbols)
+        self.max_array = max_array
+        self.random = random.Random(seed)
+
+    def action(self, action):
+        """ Returns random data of an action.
+        """
+        return self.value(self.serializer.action_type(action))
+
+    def value(self, type_name):
+        """ Returns a random value of a type.
+        """
+        type_name = self.serializer.resolve(type_name)
+        rnd = self.random
+
+        if type_name.endswith("[]"):
+            return [self.value(type_name[:-2])
+                for i in range(rnd.randint(0, self.max_array))]
+        if type_name.endswith("?"):
+            return None if rnd.random() < 0.2 else self.value(type_name[:-1])
+        if type_name in self.serializer.structs:
+            return self.__struct(type_name)
+
+        if type_name in _INTEGER_RANGES:
+            return self.__integer(*_INTEGER_RANGES[type_name])
+        if type_name in _NAME_TYPES:
+            if self.names and rnd.random() < 0.8:
+                return rnd.choice(self.names)
+            return self.name()
+        if type_name == "bool":
+            return rnd.random() < 0.5
+        if type_name in ("float32", "float64"):
+            return rnd.choice([0.0, -1.0, 1.0, rnd.uniform(-1e6, 1e6)])
+        if type_name == "string":
+            return "".join([rnd.choice(_STRING_CHARS)
+                for i in range(rnd.randint(0, 16))])
+        if type_name == "bytes":
+            return self.__hex(rnd.randint(0, 16))
+        if type_name in ("checksum160", "checksum256", "checksum512"):
+            return self.__hex(int(type_name[8:]) // 8)
+        if type_name in ("time", "time_point_sec", "time_point",
+                "block_timestamp_type"):
+            return time.strftime("%Y-%m-%dT%H:%M:%S",
+                time.gmtime(rnd.randint(0, 2**31 - 1)))
+        if type_name == "symbol":
+            return "4," + rnd.choice(self.symbols)
+        if type_name == "symbol_code":
+            return rnd.choice(self.symbols)
+        if type_name == "asset":
+            return self.__asset()
+        if type_name == "extended_asset":
+            return {"quantity": self.__asset(),
+                "contract": self.value("name")}
+        if type_name == "public_key":
+            return rnd.choice(self.public_keys) if self.public_keys else ""
+
+        raise abi.AbiError("Type is not supported: " + type_name)
+
+    def name(self):
+        """ Returns a random account name.
+        """
+        return "".join([self.random.choice(_NAME_CHARS) for i in range(12)])
+
+    def __struct(self, type_name):
+        value = {}
+        for field in self.serializer.fields(type_name):
+            value[field["name"]] = self.value(field["type"])
+        return value
+
+    def __integer(self, low, high):
+        rnd = self.random
+        choice = rnd.random()
+        if choice < 0.5:
+            return rnd.randint(max(low, 0), min(high, 10))
+        if choice < 0.7:
+            return rnd.choice([low, high, max(low, -1), min(high, 1)])
+        return rnd.randint(low, high)
+
+    def __hex(self, size):
+        return binascii.hexlify(
+            bytes([self.random.randint(0, 255) for i in range(size)])
+            ).decode("ascii")
+
+    def __asset(self):
+        amount = self.__integer(-10**6, 10**6)
+        return "{}{}.{:04d} {}".format(
+            "-" if amount < 0 else "", abs(amount) // 10000,
+            abs(amount) % 10000, self.random.choice(self.symbols))
+
+
+class FuzzReport:
+    """ The result of a fuzz campaign.
+
+    - **attributes**::
+
+        pushed: The number of accepted actions.
+        rejected: The number of actions rejected by the contract or the node.
+        elapsed: The time in seconds of pushing and checking.
+        rate: The number of pushed actions per second, accepted or not.
+        failure: The name of the failed invariant, `None` if all held.
+        cases: The accepted actions, up to the failure, in the order they
+            were executed by the chain, as tuples 
+            `(action, data, authorizer)`.
+        shrunk: The minimal list of cases that fails the invariant, if
+            shrinking succeeded, else `None`. If the replay budget is spent, 
+            the list may not be minimal.
+    """
+    def __init__(self):
+        self.pushed = 0
+        self.rejected = 0
+        self.elapsed = 0
+        self.rate = 0
+        self.failure = None
+        self.cases = []
+        self.shrunk = None
+
+    def __str__(self):
+        text = "pushed: {}, rejected: {}, {:.1f} actions/s".format(
+            self.pushed, self.rejected, self.rate)
+        if self.failure:
+            text = text + "\nfailed invariant: " + self.failure
+            if self.shrunk is None:
+                return text + ", after {} actions, not shrunk".format(
+                    len(self.cases))
+            for action, data, authorizer in self.shrunk:
+                text = text + "\n    {} {} by {}".format(
+                    action, data, authorizer)
+        return text
+
+
+class Fuzzer:
+    """ Pushes random, well-typed actions to a contract, from many generated
+    accounts, in parallel threads, and checks invariants of the contract
+    state.
+
+    Invariants are checked after each batch of parallel pushes. If one fails,
+    and a `reset` callback is given, the accepted actions are replayed in
+    the order the chain executed them, after the contract state is reset, 
+    and reduced with the delta debugging algorithm, to a minimal list that 
+    still fails the invariant. The order is taken from the global sequence 
+    numbers of the action receipts, or, if they are missing, from the order
+    in which the pushes completed.
+
+    To spread the pushes over a local multi-node setup, set a
+    `router.NodeRouter` with `pin_pushes=False` with
+    `pyteos.set_node_router`.
+
+    - **parameters**::
+
+        contract: A contract object or the name of the contract account.
+        creator: An account object or the name of the account that creates
+            the accounts.
+        key: The key object of the created accounts. Its private key has to
+            be in the wallet, or in the `pyteos.LocalSigner`.
+        actions: The names of the actions to push, defaults to all the
+            actions of the contract ABI.
+        accounts: The number of created accounts, defaults to 8.
+        invariants: Callables that take the contract argument, and return
+            `False`, or raise `AssertionError`, if the contract state is
+            wrong. Other exceptions, for example `pyteos.TableReadError`, 
+            fail the invariant, too. For example::
+
+                lambda contract: all(contract.table_frame("accounts")
+                    ["balance"] >= 0)
+
+        reset: A callable that takes the contract argument, and resets the
+            contract state, used for shrinking, defaults to `None`.
+        workers: The number of parallel pushes, defaults to 8.
+        seed: The seed of the random generator.
+        symbols: The symbols of generated assets, defaults to ("EOS",).
+        max_replays: The maximal number of replays when shrinking, 
+            defaults to 100.
+
+    - **attributes**::
+
+        names: The names of the created accounts.
+        generator: The `PayloadGenerator`.
+    """
+    def __init__(
+            self, contract, creator, key, actions=None, accounts=8,
+            invariants=(), reset=None, workers=8, seed=None,
+            symbols=("EOS",), max_replays=100):
+        self.contract = contract
+        try:
+            self.contract_name = contract.account_name
+        except:
+            try:
+                self.contract_name = contract.name
+            except:
+                self.contract_name = contract
+        self.creator = creator
+        self.key = key
+        self.invariants = list(invariants)
+        self.reset = reset
+        self.workers = workers
+        self.max_replays = max_replays
+        self.random = random.Random(seed)
+
+        serializer = pyteos.abi_serializer(self.contract_name)
+        if serializer is None:
+            raise abi.AbiError("The contract does not have any ABI.")
+        self.actions = list(actions or sorted(serializer.actions))
+
+        self.generator = PayloadGenerator(
+            serializer, public_keys=[key.key_public], symbols=symbols,
+            seed=self.random.random())
+        self.names = [self.generator.name() for i in range(accounts)]
+        self.generator.names = self.names + [self.contract_name]
+        self.__created = False
+        self.__lock = threading.Lock()
+        self.__completed = 0
+
+    def create_accounts(self):
+        """ Creates the accounts, in parallel threads.
+        """
+        results = pyteos.run_parallel(
+            [lambda name=name: pyteos.Account(
+                self.creator, name, self.key, self.key, is_verbose=False)
+                for name in self.names],
+            self.workers)
+        self.__created = True
+        return [name for name, result in zip(self.names, results)
+            if result.error]
+
+    def case(self):
+        """ Returns a random case, a tuple `(action, data, authorizer)`.
+
+        The authorizer is the first name in the data that is a created
+        account, if any, so that actions taking their actor as an argument
+        are authorized, else a random created account.
+        """
+        action = self.random.choice(self.actions)
+        data = self.generator.action(action)
+        authorizer = next(
+            (value for value in _values(data) if value in self.names),
+            self.random.choice(self.names))
+        return (action, data, authorizer)
+
+    def run(self, count=1000, batch=None, is_verbose=True):
+        """ Pushes random actions and checks the invariants after each batch.
+
+        - **parameters**::
+
+            count: The number of actions.
+            batch: The number of actions pushed in parallel, between checks
+                of the invariants, defaults to the number of workers.
+            is_verbose: If `False`, do not print the report.
+
+        Returns a `FuzzReport`.
+        """
+        if not self.__created:
+            failed = self.create_accounts()
+            if failed:
+                raise RuntimeError(
+                    "Cannot create accounts: " + ", ".join(failed))
+
+        batch = batch or self.workers
+        report = FuzzReport()
+        start = time.time()
+        while report.pushed + report.rejected < count:
+            cases = [self.case() for i in range(min(batch,
+                count - report.pushed - report.rejected))]
+            results = pyteos.run_parallel(
+                [lambda case=case: self.__push(case) for case in cases],
+                self.workers)
+            accepted = [(order, case) for case, (error, order) 
+                in zip(cases, results) if not error]
+            report.rejected = report.rejected + len(cases) - len(accepted)
+            report.pushed = report.pushed + len(accepted)
+
+            # Concurrent pushes are executed in the order the node receives
+            # them, not in the order they were submitted.
+            if all([order[0] is not None for order, case in accepted]):
+                accepted.sort(key=lambda item: item[0][0])
+            else:
+                accepted.sort(key=lambda item: item[0][1])
+            report.cases.extend([case for order, case in accepted])
+
+            report.failure = self.__check()
+            if report.failure:
+                break
+
+        report.elapsed = time.time() - start
+        report.rate = (report.pushed + report.rejected) \
+            / max(report.elapsed, 1e-6)
+        if report.failure and self.reset is not None:
+            report.shrunk = self.shrink(report.cases)
+        if is_verbose:
+            pyteos.output__(str(report))
+        return report
+
+    def shrink(self, cases, max_replays=None):
+        """ Returns a minimal list of cases, that fails an invariant when
+        pushed in order after the contract state is reset, `None` if the
+        cases do not fail when replayed in order.
+
+        - **parameters**::
+
+            cases: The list of cases, as tuples `(action, data, authorizer)`.
+            max_replays: The maximal number of replays, defaults to the 
+                `max_replays` argument of the fuzzer. If the budget is spent,
+                the smallest failing list found is returned.
+        """
+        budget = [self.max_replays if max_replays is None else max_replays]
+
+        # Once the budget is spent, no list fails, so that the reduction 
+        # ends with the smallest failing list found.
+        def fails(cases):
+            if budget[0] <= 0:
+                return False
+            budget[0] = budget[0] - 1
+            return self.__fails(cases)
+
+        if not fails(cases):
+            return None
+
+        granularity = 2
+        while len(cases) >= 2:
+            size = -(-len(cases) // granularity)
+            chunks = [cases[i:i + size] for i in range(0, len(cases), size)]
+            reduced = None
+            for chunk in chunks:
+                if fails(chunk):
+                    reduced = (chunk, 2)
+                    break
+            if reduced is None and len(chunks) > 2:
+                for i in range(len(chunks)):
+                    complement = [case for chunk in chunks[:i] + chunks[i + 1:]
+                        for case in chunk]
+                    if fails(complement):
+                        reduced = (complement, max(granularity - 1, 2))
+                        break
+            if reduced is not None:
+                cases, granularity = reduced
+            elif granularity >= len(cases):
+                break
+            else:
+                granularity = min(len(cases), 2 * granularity)
+        return cases
+
+    def __push(self, case):
+        """ Returns a tuple `(error, order)`, where `order` is a tuple of the 
+        global sequence number of the action receipt, `None` if not known, 
+        and the completion order of the push.
+        """
+        action, data, authorizer = case
+        push_action = pyteos.PushAction(
+            self.contract_name, action, data, permission=authorizer,
+            forceUnique=1, is_verbose=False, suppress_error_msg=True)
+        with self.__lock:
+            self.__completed = self.__completed + 1
+            completed = self.__completed
+        if push_action.error:
+            return (push_action.error, (None, completed))
+
+        try:
+            sequence = int(push_action.json["processed"]["action_traces"][0]
+                ["receipt"]["global_sequence"])
+        except (KeyError, IndexError, TypeError, ValueError):
+            sequence = None
+        return (push_action.error, (sequence, completed))
+
+    def __check(self):
+        for invariant in self.invariants:
+            name = getattr(invariant, "__name__", repr(invariant))
+            try:
+                holds = invariant(self.contract)
+            except AssertionError:
+                holds = False
+            except Exception as e:
+                return "{} ({}: {})".format(name, type(e).__name__, e)
+            if holds is not None and not holds:
+                return name
+        return None
+
+    def __fails(self, cases):
+        self.reset(self.contract)
+        for case in cases:
+            self.__push(case)
+        return self.__check() is not None
+
+
+def _values(data):
+    """ Yields the scalar values of action data, depth first.
+    """
+    if isinstance(data, dict):
+        for value in data.values():
+            yield from _values(value)
+    elif isinstance(data, list):
+        for value in data:
+            yield from _values(value)
+    else:
+        yield data
@@ -0,0 +1,212 @@
+#!/usr/bin/python3
+
+"""
+Local SQLite index of the actions stored in blocks.
+
+.. module:: indexer
+    :platform: Unix, Windows
+    :synopsis: Local SQLite index of the actions stored in blocks.
+
+.. moduleauthor:: Tokenika
+
+"""
+
+import json
+import sqlite3
+import pyteos
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS actions (
+    id INTEGER PRIMARY KEY,
+    block_num INTEGER NOT NULL,
+    trx_id TEXT NOT NULL,
+    contract TEXT NOT NULL,
+    action TEXT NOT NULL,
+    data TEXT
+);
+CREATE TABLE IF NOT EXISTS authorizations (
+    action_id INTEGER NOT NULL,
+    account TEXT NOT NULL,
+    permission TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS progress (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    block_num INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS actions_contract ON actions (contract, action);
+CREATE INDEX IF NOT EXISTS actions_action ON actions (action);
+CREATE INDEX IF NOT EXISTS actions_block ON actions (block_num);
+CREATE INDEX IF NOT EXISTS actions_trx ON actions (trx_id);
+CREATE INDEX IF NOT EXISTS authorizations_account
+    ON authorizations (account, action_id);
+CREATE INDEX IF NOT EXISTS authorizations_action
+    ON authorizations (action_id);
+"""
+
+_TRANSACTION_FIELDS = ["trx.id", "trx.transaction.actions"]
+
+
+class ActionIndex:
+    """ An index of actions, by account, contract, action name and block
+    number, stored in a local SQLite database.
+
+    Blocks are ingested incrementally, up to the last irreversible block,
+    thus the index is never invalidated by a fork. Ingestion resumes from
+    the last indexed block. Deferred transactions, given by their ids, and 
+    transactions already indexed are skipped.
+
+    - **parameters**::
+
+        path: The path of the database file, defaults to "actions.db".
+
+    - **attributes**::
+
+        last_block: The number of the last indexed block, 0 if none.
+    """
+    def __init__(self, path="actions.db"):
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(_SCHEMA)
+
+    @property
+    def last_block(self):
+        row = self.connection.execute(
+            "SELECT block_num FROM progress WHERE id = 0").fetchone()
+        return row[0] if row else 0
+
+    def update(self, last=None, is_verbose=True):
+        """ Ingests blocks following the last indexed one.
+
+        - **parameters**::
+
+            last: The number of the last block to ingest, defaults to the
+                last irreversible block.
+            is_verbose: If `False`, do not print progress.
+
+        Returns the number of ingested blocks.
+        """
+        get_info = pyteos.GetInfo(is_verbose=False)
+        if get_info.error:
+            return 0
+        irreversible = int(get_info.last_irreversible_block_num)
+        last = irreversible if last is None else min(int(last), irreversible)
+
+        first = self.last_block + 1
+        for block_num in range(first, last + 1):
+            block = pyteos.GetBlock(block_num, fields=[], is_verbose=False)
+            if block.error:
+                last = block_num - 1
+                break
+            with self.connection:
+                for transaction in block.transactions(_TRANSACTION_FIELDS):
+                    self.__put_transaction(block_num, transaction)
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO progress VALUES (0, ?)",
+                    (block_num,))
+
+        if is_verbose and last >= first:
+            pyteos.output__("indexed blocks: {} - {}"
+                .format(first, self.last_block))
+        return max(0, last - first + 1)
+
+    def query(
+            self, account=None, contract=None, action=None,
+            first=None, last=None, limit=None):
+        """ Returns indexed actions, in the chain order.
+
+        - **parameters**::
+
+            account: An account object or the name of an account that
+                authorized the action.
+            contract: A contract object or the name of the account of the
+                contract that handles the action.
+            action: The name of the action.
+            first: The number of the first block to search.
+            last: The number of the last block to search.
+            limit: The maximal number of returned actions.
+
+        Each action is a dictionary with `block_num`, `trx_id`, `contract`,
+        `action`, `data` and `authorization` fields.
+        """
+        try:
+            account = account.name
+        except:
+            pass
+        try:
+            contract = contract.name
+        except:
+            pass
+
+        conditions = []
+        parameters = []
+        if account is not None:
+            conditions.append("id IN (SELECT action_id FROM authorizations "
+                "WHERE account = ?)")
+            parameters.append(account)
+        if contract is not None:
+            conditions.append("contract = ?")
+            parameters.append(contract)
+        if action is not None:
+            conditions.append("action = ?")
+            parameters.append(action)
+        if first is not None:
+            conditions.append("block_num >= ?")
+            parameters.append(int(first))
+        if last is not None:
+            conditions.append("block_num <= ?")
+            parameters.append(int(last))
+
+        statement = "SELECT id, block_num, trx_id, contract, action, data " \
+            "FROM actions"
+        if conditions:
+            statement += " WHERE " + " AND ".join(conditions)
+        statement += " ORDER BY id"
+        if limit is not None:
+            statement += " LIMIT ?"
+            parameters.append(int(limit))
+        statement = "SELECT selected.*, account, permission " \
+            "FROM (" + statement + ") AS selected " \
+            "LEFT JOIN authorizations ON action_id = selected.id " \
+            "ORDER BY selected.id, authorizations.rowid"
+
+        actions = []
+        previous = None
+        for id, block_num, trx_id, contract, action, data, actor, permission \
+                in self.connection.execute(statement, parameters):
+            if id != previous:
+                previous = id
+                actions.append({
+                    "block_num": block_num,
+                    "trx_id": trx_id,
+                    "contract": contract,
+                    "action": action,
+                    "data": json.loads(data),
+                    "authorization": []
+                    })
+            if actor is not None:
+                actions[-1]["authorization"].append(
+                    {"actor": actor, "permission": permission})
+        return actions
+
+    def close(self):
+        self.connection.close()
+
+    def __put_transaction(self, block_num, transaction):
+        trx = transaction.get("trx")
+        if not isinstance(trx, dict): # a deferred transaction id
+            return
+        trx_id = trx.get("id", "")
+        if trx_id and self.connection.execute(
+                "SELECT 1 FROM actions WHERE trx_id = ?", (trx_id,)).fetchone():
+            return
+        actions = (trx.get("transaction") or {}).get("actions") or []
+
+        for action in actions:
+            cursor = self.connection.execute(
+                "INSERT INTO actions (block_num, trx_id, contract, action, data)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (block_num, trx_id, action["account"],
+                    action["name"], json.dumps(action.get("data"))))
+            self.connection.executemany(
+                "INSERT INTO authorizations VALUES (?, ?, ?)",
+                [(cursor.lastrowid, auth["actor"], auth["permission"])
+                    for auth in action.get("authorization") or []])
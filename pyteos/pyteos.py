@@ -21,6 +21,13 @@ import glob
 import re
 import pathlib
 import shutil
+import hashlib
+import datetime
+import threading
+import contextlib
+
+import abi
+import traces
 
 _is_verbose = True
 
@@ -60,7 +67,7 @@ class Setup:
     def __init__(self):
 
         with open(self.__setupFile) as json_data:
-            print("Reading setup from file:\n   {}" \
+            output__("Reading setup from file:\n   {}" \
                     .format(os.path.realpath(self.__setupFile)))
             setup_json = json.load(json_data)
 
@@ -98,8 +105,61 @@ class Setup:
         self.node_block_count = setup_json[self.__NODE_BLOCK_COUNT]
         self.node_block_num = setup_json[self.__NODE_BLOCK_NUM]
 
-setup = Setup()
-version()
+class _LazySetup:
+    """ Stands for the `Setup` object, that is created at its first use, not
+    at import, and then cached.
+    """
+    __setup = None
+    __lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if _LazySetup.__setup is None:
+            with _LazySetup.__lock:
+                if _LazySetup.__setup is None:
+                    setup = Setup()
+                    _LazySetup.__setup = setup
+                    if _is_verbose:
+                        version()
+        return getattr(_LazySetup.__setup, name)
+
+setup = _LazySetup()
+
+
+_node_router = None
+_pinned = threading.local()
+
+# Commands that call the node, and that take the `--address` option:
+_READ_COMMANDS = set([
+    ("get", "info"), ("get", "block"), ("get", "account"), 
+    ("get", "accounts"), ("get", "code"), ("get", "table")])
+_PUSH_COMMANDS = set([
+    ("create", "account"), ("set", "contract"), ("push", "action")])
+
+def set_node_router(router):
+    """
+    Sets a `router.NodeRouter` that chooses the node for each command that
+    calls the node, if `None`, the node of the `teos` configuration is used.
+    """
+    global _node_router
+    _node_router = router
+
+
+@contextlib.contextmanager
+def use_node(address):
+    """
+    Sends the node commands of the current thread to a node, regardless of
+    the router set with `set_node_router`.
+
+    - **parameters**::
+
+        address: The http address (host:port) of the node.
+    """
+    previous = getattr(_pinned, "address", None)
+    _pinned.address = address
+    try:
+        yield
+    finally:
+        _pinned.address = previous
 
 ##############################################################################
 # pyteos commands
@@ -114,30 +174,55 @@ class _Command:
     global _is_verbose 
     global setup    
    
-    _jarg = json.loads("{}")
-    json = json.loads("{}")
     _out = ""
-    error = False 
+
+    def __new__(cls, *args, **kwargs):
+        # The request state is set per instance, before subclass constructors
+        # put their arguments, so that commands can run in parallel threads.
+        self = super().__new__(cls)
+        self._jarg = {}
+        self.json = {}
+        self._stdin = None
+        self._address = ""
+        self.error = False
+        return self
 
     def __init__(
                 self, first, second, 
-                is_verbose=True, suppress_error_msg=False):
+                is_verbose=True, suppress_error_msg=False, decode=True):
         cl = [setup.teos_exe, first, second,
             "--jarg", str(self._jarg).replace("'", '"'), "--both"]
         if _is_verbose and is_verbose:
             cl.append("-V")
 
-        process = subprocess.run(
-            cl,
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.PIPE,
-            cwd=str(pathlib.Path(setup.teos_exe).parent)) 
+        router = None
+        address = getattr(_pinned, "address", None)
+        if not (first, second) in _READ_COMMANDS | _PUSH_COMMANDS:
+            address = None
+        elif not address and _node_router is not None:
+            router = _node_router
+            address = router.acquire((first, second) in _PUSH_COMMANDS)
+        if address:
+            cl.extend(["--address", address])
+            self._address = address
 
-        # Both, right and error output is passed with stdout:
-        self._out = process.stdout.decode("utf-8")
+        try:
+            process = subprocess.run(
+                cl,
+                input=self._stdin.encode("utf-8") if self._stdin else None,
+                stdout=subprocess.PIPE, 
+                stderr=subprocess.PIPE,
+                cwd=str(pathlib.Path(setup.teos_exe).parent)) 
+
+            # Both, right and error output is passed with stdout:
+            self._out = process.stdout.decode("utf-8")
+        finally:
+            if router is not None:
+                router.release(address, self._out)
 
         # With "--both", json output is passed with stderr: 
         json_resp = process.stderr.decode("utf-8")
+        self._json_text = json_resp
 
         if _is_verbose and is_verbose:
             print(self._out)
@@ -153,6 +238,10 @@ class _Command:
                     wrapper = textwrap.TextWrapper(width=width)
                     print(wrapper.fill(self._out))
 
+        if not decode:
+            self.json = json_resp
+            return
+
         try:
             self.json = json.loads(json_resp)
         except:
@@ -165,6 +254,25 @@ class _Command:
         return repr(self.json)
 
 
+def run_parallel(commands, workers=4):
+    """
+    Runs commands in a pool of threads, so that their calls to the node 
+    overlap. Returns the results in the order of the commands.
+
+    - **parameters**::
+
+        commands: A list of callables, for example 
+            `lambda: GetAccount("alice", is_verbose=False)`.
+        workers: The number of threads, defaults to 4.
+    """
+    import concurrent.futures # imported on use, it is slow to import
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) \
+            as executor:
+        futures = [executor.submit(command) for command in commands]
+        return [future.result() for future in futures]
+
+
 class GetConfig(_Command):
     """
     Get the configurationt of the teos executable.
@@ -331,6 +439,9 @@ class WalletLock(_Command):
         
         self._jarg["name"] = name
         _Command.__init__(self, "wallet", "lock", is_verbose)
+        if not self.error and _wallet_session \
+                and _wallet_session.name == name:
+            _wallet_session.unlock_time = None
 
 
 class WalletUnlock(_Command):
@@ -371,39 +482,259 @@ class GetInfo(_Command):
             self.head_block_time = self.json["head_block_time"]
             self.last_irreversible_block_num \
                 = self.json["last_irreversible_block_num"]
+            if _response_cache is not None:
+                _response_cache.irreversible(
+                    self.last_irreversible_block_num, self._address, 
+                    self.json.get("chain_id", ""))
+
+
+_JSON_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_JSON_BRACKET = re.compile(r'["\[\]{}]')
+_JSON_SCALAR = re.compile(r'[^,\]}\s]*')
+_JSON_SPACE = re.compile(r'[\s,:]*')
+
+def _json_value_end(text, pos):
+    """ Returns the position next to the json value that starts at `pos`, 
+    without decoding it.
+    """
+    if text[pos] == '"':
+        return _JSON_STRING.match(text, pos).end()
+    if not text[pos] in "[{":
+        return _JSON_SCALAR.match(text, pos).end()
+
+    depth = 0
+    while True:
+        bracket = _JSON_BRACKET.search(text, pos)
+        char = bracket.group()
+        if char == '"':
+            pos = _JSON_STRING.match(text, bracket.start()).end()
+            continue
+        depth = depth + 1 if char in "[{" else depth - 1
+        pos = bracket.end()
+        if depth == 0:
+            return pos
+
+
+def _json_elements(text, pos):
+    """ Yields `(key, start, end)` for the members of the json object, or 
+    for the items of the json array, that starts at `pos`. For array items, 
+    `key` is `None`.
+    """
+    is_object = text[pos] == "{"
+    pos = _JSON_SPACE.match(text, pos + 1).end()
+    while not text[pos] in "]}":
+        key = None
+        if is_object:
+            end = _JSON_STRING.match(text, pos).end()
+            key = json.loads(text[pos:end])
+            pos = _JSON_SPACE.match(text, end).end()
+        end = _json_value_end(text, pos)
+        yield (key, pos, end)
+        pos = _JSON_SPACE.match(text, end).end()
+
+
+def _json_project(text, pos, fields):
+    """ Decodes only the given fields of the json value that starts at 
+    `pos`.
+
+    Fields are dotted paths, for example `trx.id`. A path applied to an array
+    is applied to each of its items. Other parts of the value are skipped, 
+    not decoded.
+    """
+    if text[pos] == "[":
+        return [_json_project(text, start, fields) 
+            for key, start, end in _json_elements(text, pos)]
+    if text[pos] != "{":
+        return json.loads(text[pos:_json_value_end(text, pos)])
+
+    paths = {}
+    for field in fields:
+        head, _, rest = field.partition(".")
+        paths.setdefault(head, []).append(rest)
+
+    projection = {}
+    for key, start, end in _json_elements(text, pos):
+        if key in paths:
+            if "" in paths[key]:
+                projection[key] = json.loads(text[start:end])
+            else:
+                projection[key] = _json_project(text, start, paths[key])
+    return projection
+
+
+_response_cache = None
+
+def set_response_cache(cache):
+    """
+    Sets a `cache.ResponseCache` for the responses of `GetBlock` and 
+    `GetCode` that never change. If `None`, responses are not cached.
+    """
+    global _response_cache
+    _response_cache = cache
+
+
+_block_archive = None
+
+def set_block_archive(archive):
+    """
+    Sets an `archive.BlockArchive` that `GetBlock` reads archived, therefore
+    irreversible, blocks from, without calling the node. If `None`, blocks
+    are always retrieved from the node.
+    """
+    global _block_archive
+    _block_archive = archive
 
 
 class GetBlock(_Command):
     """
     Retrieve a full block from the blockchain.
 
+    If a block archive is set with `set_block_archive`, and the block is 
+    archived, it is read from the archive. If a response cache is set with 
+    `set_response_cache`, irreversible blocks are cached.
+
     - **parameters**::
     
         block_number: The number of the block to retrieve.
         block_id: The ID of the block to retrieve, if set, defaults to "".
+        fields: If set, a list of the fields of the block to decode, as dotted
+            paths, for example `["block_num", "timestamp", "transactions.trx.id"]`,
+            other fields are skipped.
         is_verbose: If `False`, do not print stdout, default is `True`.    
     """
-    def __init__(self, block_number, block_id="", is_verbose=True):
+    def __init__(
+            self, block_number, block_id="", fields=None, is_verbose=True):
         if(block_id == ""):
             self._jarg["block_num_or_id"] = block_number
         else:
             self._jarg["block_num_or_id"] = block_id
-        
-        _Command.__init__(self, "get", "block", is_verbose)
+
+        stored = None
+        if _block_archive is not None and block_id == "":
+            stored = _block_archive.get(block_number)
+        source = "archived"
+        if stored is None and _response_cache is not None:
+            stored = _response_cache.get(
+                _response_cache.block_key(block_id or block_number))
+            source = "cached"
+
+        if stored is None:
+            _Command.__init__(self, "get", "block", is_verbose, decode=False)
+            if not self.error and _response_cache is not None:
+                self.__cache_irreversible()
+        else:
+            self._json_text = stored
+            if is_verbose:
+                output__("block number: {} ({})".format(
+                    block_number if block_id == "" else block_id, source))
+
+        if not self.error:
+            try:
+                if fields is None:
+                    self.json = json.loads(self._json_text)
+                else:
+                    self.json = _json_project(self._json_text, 
+                        _JSON_SPACE.match(self._json_text).end(), fields)
+            except (AttributeError, IndexError, ValueError):
+                if fields is not None:
+                    self.error = True
+
         if not self.error:   
-            self.block_num = self.json["block_num"]
-            self.ref_block_prefix = self.json["ref_block_prefix"]
-            self.timestamp = self.json["timestamp"]
+            self.block_num = self.json.get("block_num")
+            self.ref_block_prefix = self.json.get("ref_block_prefix")
+            self.timestamp = self.json.get("timestamp")
+
+    def __cache_irreversible(self):
+        try:
+            header = _json_project(self._json_text, 
+                _JSON_SPACE.match(self._json_text).end(), ["block_num", "id"])
+            block_num = int(header["block_num"])
+        except (AttributeError, IndexError, KeyError, ValueError):
+            return
+
+        # Only the node that returned the block tells whether it is 
+        # irreversible, other nodes may be on another fork.
+        node = self._address
+        if block_num > _response_cache.last_irreversible(node) \
+                and time.time() - _response_cache.irreversible_time(node) \
+                    > _response_cache.refresh_interval:
+            with use_node(node):
+                GetInfo(is_verbose=False, suppress_error_msg=True)
+        if block_num <= _response_cache.last_irreversible(node):
+            _response_cache.put(
+                _response_cache.block_key(block_num), self._json_text)
+            if "id" in header:
+                _response_cache.put(
+                    _response_cache.block_key(header["id"]), self._json_text)
+
+    def transactions(self, fields=None):
+        """ Yields the transactions of the block, decoding them one by one.
+
+        - **parameters**::
+
+            fields: If set, a list of the fields of each transaction to 
+                decode, as dotted paths, for example `["trx.id"]`, other
+                fields, like action payloads, are skipped.
+        """
+        if self.error:
+            return
+
+        text = self._json_text
+        for key, start, end in _json_elements(
+                text, _JSON_SPACE.match(text).end()):
+            if key != "transactions":
+                continue
+            if text[start] != "[":
+                return
+            for _, item_start, item_end in _json_elements(text, start):
+                if fields is None:
+                    yield json.loads(text[item_start:item_end])
+                else:
+                    yield _json_project(text, item_start, fields)
+            return
 
 
 class GetCode(_Command):
+    """
+    Retrieve the code and ABI of an account.
+
+    If a response cache is set with `set_response_cache`, the response is 
+    cached, keyed by the account and the code hash. If the code hash is 
+    given, and no file is requested, the cached response is used without 
+    calling the node. Without the code hash, the node is always called, as 
+    the contract of the account may have changed.
+
+    - **parameters**::
+
+        account_name: The name of the account.
+        wast_file: If set, the name of the file to save the contract .wast to.
+        abi_file: If set, the name of the file to save the contract .abi to.
+        is_verbose: If `False`, do not print stdout, default is `True`.
+        code_hash: If set, the expected code hash of the account.
+    """
     def __init__(
-        self, account_name, wast_file="", abi_file="", is_verbose=True
+        self, account_name, wast_file="", abi_file="", is_verbose=True,
+        code_hash=""
         ):
         self._jarg["account_name"] = account_name
         self._jarg["wast"] = wast_file        
         self._jarg["abi"] = abi_file
-        _Command.__init__(self, "get", "code", is_verbose)
+
+        cached = None
+        if _response_cache is not None and code_hash \
+                and not wast_file and not abi_file:
+            cached = _response_cache.get(
+                "code:{}:{}".format(account_name, code_hash))
+
+        if cached is None:
+            _Command.__init__(self, "get", "code", is_verbose)
+        else:
+            self._json_text = cached
+            self.json = json.loads(cached)
+            self.json["account_name"] = account_name
+            if is_verbose:
+                output__("code hash: {} (cached)".format(code_hash))
+
         if not self.error:
             self.code_hash = self.json["code_hash"]
             self.wast = self.json["wast"] 
@@ -411,6 +742,12 @@ class GetCode(_Command):
                 self.abi = self.json["abi"]
             else:
                 self.abi = ""
+            with _code_lock:
+                _code_hashes[account_name] = (self.code_hash, time.time())
+            if cached is None and _response_cache is not None:
+                _response_cache.put(
+                    "code:{}:{}".format(account_name, self.code_hash), 
+                    self._json_text)
 
 
 class GetTable(_Command):
@@ -427,6 +764,487 @@ class GetTable(_Command):
         self._jarg["lower_bound"] = lower
         self._jarg["upper_bound"] = upper
         _Command.__init__(self, "get", "table", is_verbose)
+        if not self.error:
+            self.rows = self.json["rows"]
+            self.more = self.json["more"] in (True, "true", "1", 1)
+
+
+class TableReadError(Exception):
+    """ Raised if a page of a table cannot be read.
+    """
+    pass
+
+
+def _table_rows(contract, table, scope, key="", limit=100):
+    """ Yields all rows of a table, reading it page after page.
+
+    If `key` names the primary key field of the rows, pages are read with
+    the lower bound set next to the last row seen. Otherwise, the page limit 
+    is doubled until the whole table is returned at once.
+
+    Raises `TableReadError` if a page cannot be read, so that a failed read
+    is not taken for an empty table.
+    """
+    lower = ""
+    last = None
+    while True:
+        get_table = GetTable(
+            contract, table, scope, limit=limit, lower=lower, 
+            is_verbose=False)
+        if get_table.error:
+            raise TableReadError("Cannot read the table {} of {}, scope {}: {}"
+                .format(table, contract, scope, get_table._out.strip()))
+
+        rows = get_table.rows
+        if not key or (rows and not key in rows[0]):
+            if get_table.more:
+                limit = limit * 2
+                continue
+            yield from rows
+            return
+
+        fresh = [row for row in rows if row[key] != last]
+        yield from fresh
+        if not get_table.more or not fresh:
+            return
+
+        last = fresh[-1][key]
+        try:
+            lower = str(int(last) + 1)
+            last = None
+        except ValueError:
+            try: # the key is a name, compared as a number by the node:
+                lower = str(abi.name_to_int(last) + 1)
+                last = None
+            except abi.AbiError:
+                lower = last
+
+
+def _row_digest(row):
+    return hashlib.sha1(
+        json.dumps(row, sort_keys=True).encode("utf-8")).digest()
+
+
+def _table_snapshot(contract, table, scope, key, limit):
+    """ Returns the digest of a table, and its rows with their digests, 
+    keyed by the primary key.
+
+    The table digest is the sum of the row digests, thus it does not depend 
+    on the order of the rows.
+    """
+    rows = {}
+    digest = 0
+    for row in _table_rows(contract, table, scope, key, limit):
+        row_key = row[key] if key in row else next(iter(row.values()))
+        row_digest = _row_digest(row)
+        rows[row_key] = (row_digest, row)
+        digest = digest + int.from_bytes(row_digest, "big")
+    return (digest % (1 << 160), rows)
+
+
+def _column_dtype(columns):
+    """ Returns the NumPy dtype specification of columns given by 
+    `abi.Serializer.columns`.
+    """
+    return [(field, _column_dtype(code) if isinstance(code, list)
+        else "O" if code.endswith("[]") else code) 
+            for field, code in columns]
+
+
+def _column_value(code, value):
+    if code == "O":
+        return value
+    if code.endswith("[]"):
+        if not isinstance(value, list):
+            raise ValueError("array expected, got " + repr(value))
+        return [_column_value(code[:-2], item) for item in value]
+    if value is None or (value == "" and not code.startswith("U")):
+        raise ValueError("no value")
+    if code == "?":
+        return value in (True, "true", "1", 1)
+    if code[0] in "iu":
+        return int(value)
+    if code[0] == "f":
+        return float(value)
+    return str(value).rstrip("Z")
+
+
+def _row_values(columns, row):
+    """ Converts the values of a table row, that `teos` returns as strings, 
+    to the types of the columns given by `abi.Serializer.columns`.
+
+    Raises `abi.AbiError` if a field is missing, or if its value does not 
+    fit the column.
+    """
+    if not isinstance(row, dict):
+        raise abi.AbiError("Object expected, got " + repr(row))
+    values = []
+    for field, code in columns:
+        if not field in row:
+            raise abi.AbiError("Missing field: " + field)
+        if isinstance(code, list):
+            values.append(_row_values(code, row[field]))
+            continue
+        try:
+            values.append(_column_value(code, row[field]))
+        except (TypeError, ValueError) as e:
+            raise abi.AbiError(
+                "Cannot convert the field {} to {}: {}".format(field, code, e))
+    return tuple(values)
+
+
+class TransactionContext:
+    """ Cache of the chain data needed to build transactions.
+
+    Holds the chain id and the reference block, refreshed with `GetInfo` 
+    not more often than every `refresh_interval` seconds, and the public 
+    keys required by the active permission of accounts. Set with 
+    `set_transaction_context`, it is passed to `teos` with each transaction, 
+    so that `teos` does not query the node for the same data.
+
+    - **parameters**::
+
+        refresh_interval: The time in seconds after which the reference 
+            block is refreshed, defaults to 10s.
+
+    - **attributes**::
+
+        keys: A map of account names to the public keys required by their 
+            active permissions.
+    """
+    def __init__(self, refresh_interval=10):
+        self.refresh_interval = refresh_interval
+        self.keys = {}
+        self.__info = (None, 0)
+        self.__lock = threading.Lock()
+
+    def refresh(self):
+        """ Reads the reference block and the chain id from the node.
+        """
+        get_info = GetInfo(is_verbose=False, suppress_error_msg=True)
+        if get_info.error:
+            self.__info = (None, 0)
+            return
+        self.__info = (get_info.json, time.time())
+
+    def reference_block(self):
+        """ Returns the id and the current time of the reference block, 
+        and the chain id.
+
+        The time is the time of the block advanced by the time elapsed since
+        the block was read, so that transaction expiration does not shrink.
+        """
+        with self.__lock:
+            info, info_time = self.__info
+            if info is None \
+                    or time.time() - info_time > self.refresh_interval:
+                self.refresh()
+                info, info_time = self.__info
+        if info is None:
+            return ("", "", "")
+
+        head_block_time = datetime.datetime.strptime(
+            info["head_block_time"].split(".")[0], "%Y-%m-%dT%H:%M:%S")
+        head_block_time += datetime.timedelta(
+            seconds=int(time.time() - info_time))
+        return (
+            info["head_block_id"],
+            head_block_time.strftime("%Y-%m-%dT%H:%M:%S"),
+            info.get("chain_id", ""))
+
+    def required_keys(self, account):
+        """ Returns the public keys required by the active permission of an 
+        account.
+
+        Returns an empty list if the permission is not satisfied with a single
+        key, then, the node has to be asked.
+        """
+        if not account in self.keys:
+            keys = []
+            get_account = GetAccount(
+                account, is_verbose=False, suppress_error_msg=True)
+            if not get_account.error:
+                for permission in get_account.json.get("permissions", []):
+                    if permission["perm_name"] != "active":
+                        continue
+                    auth = permission["required_auth"]
+                    if not auth.get("accounts") and len(auth["keys"]) == 1 \
+                            and int(auth["keys"][0]["weight"]) \
+                                >= int(auth["threshold"]):
+                        keys = [auth["keys"][0]["key"]]
+            self.keys[account] = keys
+        return self.keys[account]
+
+    def forget(self, account):
+        """ Forgets the keys of an account, if its permissions change.
+        """
+        self.keys.pop(account, None)
+
+_transaction_context = None
+
+def set_transaction_context(context):
+    """
+    Sets a `TransactionContext` used by transaction commands, if `None`, 
+    `teos` queries the node for each transaction.
+    """
+    global _transaction_context
+    _transaction_context = context
+
+
+def _put_transaction_context(jarg, accounts, skip_signature):
+    ref_block_id, ref_block_time, chain_id = ("", "", "")
+    required_keys = []
+    if _transaction_context:
+        ref_block_id, ref_block_time, chain_id \
+            = _transaction_context.reference_block()
+        if ref_block_id and not skip_signature:
+            for account in accounts:
+                keys = _transaction_context.required_keys(account)
+                if not keys:
+                    required_keys = []
+                    break
+                required_keys.extend(
+                    [key for key in keys if not key in required_keys])
+
+    jarg["ref-block-id"] = ref_block_id
+    jarg["ref-block-time"] = ref_block_time
+    jarg["chain-id"] = chain_id
+    jarg["required-keys"] = ",".join(required_keys)
+
+
+class LocalSigner:
+    """ Signs transactions with the keys held by the session.
+
+    Transactions are signed in the `teos` process that builds them, instead
+    of being sent to the wallet. The wallet signs only with the keys that the
+    signer does not hold. Set with `set_local_signer`.
+
+    - **parameters**::
+
+        holders: Wallet objects, key objects, account objects with private
+            keys, like `AccountEosio`, or private keys in WIF format. Keys
+            imported to a wallet later are used, too.
+    """
+    def __init__(self, *holders):
+        self.holders = list(holders)
+
+    def add(self, holder):
+        """ Adds a wallet, a key or an account to the signer.
+        """
+        self.holders.append(holder)
+
+    def private_keys(self):
+        """ Returns the private keys held, in WIF format.
+        """
+        keys = []
+        for holder in self.holders:
+            if isinstance(holder, Wallet):
+                holder_keys = [key[1] for key in holder.json["keys"]]
+            elif isinstance(holder, str):
+                holder_keys = [holder]
+            else:
+                holder_keys = [getattr(holder, "key_private", "")]
+            holder_keys = [key for key in holder_keys if key]
+            keys.extend([key for key in holder_keys if not key in keys])
+        return keys
+
+_local_signer = None
+
+def set_local_signer(signer):
+    """
+    Sets a `LocalSigner` used by transaction commands, if `None`, all 
+    transactions are signed by the wallet.
+    """
+    global _local_signer
+    _local_signer = signer
+
+
+def _local_signer_input(jarg, skip_signature):
+    keys = []
+    if _local_signer and not skip_signature:
+        keys = _local_signer.private_keys()
+
+    jarg["local-sign"] = 1 if keys else 0
+    return ",".join(keys) + "\n" if keys else None
+
+
+class WalletSession:
+    """
+    Keeps a wallet open and unlocked, without redundant wallet commands.
+
+    The session tracks whether the wallet is open and when it was unlocked.
+    `open` and `unlock` do not call `teos` if the wallet is known to be open
+    and unlocked. The wallet is unlocked again before `keosd` locks it, when 
+    its lock timeout expires. Set with `set_wallet_session`, the session 
+    unlocks the wallet before each signed transaction.
+
+    - **parameters**::
+
+        wallet: A wallet object or the name of the wallet.
+        password: If the wallet argument is not a wallet object, the password 
+            returned by wallet create, else anything, defaults to "".
+        timeout: The lock timeout of `keosd`, in seconds, defaults to 900s.
+        margin: The time in seconds before the timeout when the wallet is 
+            unlocked again, defaults to 30s.
+
+    - **attributes**::
+
+        is_open: Whether the wallet is known to be open.
+        unlock_time: The time when the wallet was unlocked, `None` if it is 
+            not known to be unlocked.
+    """
+    def __init__(self, wallet="default", password="", timeout=900, margin=30):
+        try:
+            self.name = wallet.name
+            self.password = wallet.password
+        except:
+            self.name = wallet
+            self.password = password
+
+        self.timeout = timeout
+        self.margin = margin
+        self.is_open = False
+        self.unlock_time = None
+        self.__lock = threading.Lock()
+
+    def open(self):
+        """ Opens the wallet, if it is not known to be open.
+        """
+        with self.__lock:
+            self.__open()
+        return self.is_open
+
+    def unlock(self):
+        """ Opens and unlocks the wallet, if it is not known to be unlocked,
+        or if its lock timeout is about to expire.
+
+        If the wallet cannot be unlocked, it is not taken for open any more,
+        as `keosd` could have been restarted, and it is opened and unlocked 
+        once again.
+        """
+        with self.__lock:
+            if self.unlock_time is not None and time.time() \
+                    < self.unlock_time + self.timeout - self.margin:
+                return True
+            for attempt in range(2):
+                self.__open()
+                if not self.is_open:
+                    return False
+
+                wallet_unlock = WalletUnlock(
+                    self.name, self.password, is_verbose=False)
+                if not wallet_unlock.error \
+                        or "already unlocked" in wallet_unlock._out.lower():
+                    self.unlock_time = time.time()
+                    return True
+                self.is_open = False
+                self.unlock_time = None
+        return False
+
+    def lock(self):
+        """ Locks the wallet.
+        """
+        with self.__lock:
+            WalletLock(self.name, is_verbose=False)
+            self.unlock_time = None
+
+    def forget(self):
+        """ Forgets the state of the wallet, for example, if `keosd` was 
+        restarted.
+        """
+        with self.__lock:
+            self.is_open = False
+            self.unlock_time = None
+
+    def __open(self):
+        if self.is_open:
+            return
+        wallet_open = WalletOpen(self.name, is_verbose=False)
+        self.is_open = not wallet_open.error
+        if not self.is_open:
+            self.unlock_time = None
+
+_wallet_session = None
+
+def set_wallet_session(session):
+    """
+    Sets a `WalletSession` that unlocks the wallet before signed 
+    transactions, if `None`, the wallet is expected to be unlocked.
+    """
+    global _wallet_session
+    _wallet_session = session
+
+
+def _unlock_wallet(skip_signature):
+    if _wallet_session and not skip_signature:
+        _wallet_session.unlock()
+
+
+_trace_sink = None
+
+def set_trace_sink(sink):
+    """
+    Sets a `traces.TraceSink` that records the results of `PushAction` in 
+    the background, then `PushAction` does not print them. If `None`, the 
+    results are not recorded, and `Contract.push_action` prints the console
+    output.
+    """
+    global _trace_sink
+    _trace_sink = sink
+
+
+_code_hashes = {}
+_serializers = {}
+_code_lock = threading.Lock()
+_code_expiry = 10.0
+
+def set_code_expiry(seconds):
+    """
+    Sets how long, in seconds, `abi_serializer` trusts the code hash of an 
+    account before it asks the node again, default is 10. 
+    """
+    global _code_expiry
+    _code_expiry = seconds
+
+
+def abi_serializer(account):
+    """ Returns an ABI serializer of the contract of an account.
+
+    The contract ABI is fetched with `GetCode`, and is cached, keyed by the 
+    code hash. The code hash of the account is checked with the node again, 
+    when it is older than set with `set_code_expiry`, or when the contract 
+    is set. Returns `None` if the account does not have any ABI, or if 
+    `GetCode` failed, then the hash of the account is forgotten.
+
+    - **parameters**::
+
+        account: An account object or the name of an account.
+    """
+    try:
+        account = account.name
+    except:
+        pass
+
+    with _code_lock:
+        code_hash, checked = _code_hashes.get(account, (None, 0))
+        if code_hash in _serializers \
+                and time.time() - checked < _code_expiry:
+            return _serializers[code_hash]
+
+    code = GetCode(account, is_verbose=False)
+    if code.error:
+        _forget_code(account)
+        return None
+    with _code_lock:
+        if not code.code_hash in _serializers:
+            _serializers[code.code_hash] = abi.Serializer(code.abi) \
+                if code.abi else None
+        return _serializers[code.code_hash]
+
+
+def _forget_code(account):
+    with _code_lock:
+        _code_hashes.pop(account, None)
 
 
 class CreateKey(_Command):
@@ -511,6 +1329,12 @@ class CreateAccount(_Command):
         self._jarg["force-unique"] = forceUnique
         self._jarg["max-cpu-usage"] = max_cpu_usage
         self._jarg["max-net-usage"] = max_net_usage          
+        _put_transaction_context(
+            self._jarg, 
+            permission_name.split(",") if permission_name else [creator_name],
+            skip_signature)
+        _unlock_wallet(skip_signature)
+        self._stdin = _local_signer_input(self._jarg, skip_signature)
         _Command.__init__(self, "create", "account", is_verbose)
         if not self.error:
             self.name = name
@@ -549,6 +1373,11 @@ class SetContract(_Command):
             (defaults to 0 which means no limit).
         max_net_usage: An upper limit on the net usage budget, in bytes, for 
             the transaction (defaults to 0 which means no limit).
+        compress: Whether to compress the transaction with zlib, defaults 
+            to `True`.
+
+    If `wast_file` is not set, the WASM file emitted by the build is 
+    deployed, if it is not older than the WAST file.
     """    
     def __init__(
             self, account, contract_dir, 
@@ -556,7 +1385,7 @@ class SetContract(_Command):
             permission="", expiration_sec=30, 
             skip_signature=0, dont_broadcast=0, forceUnique=0,
             max_cpu_usage=0, max_net_usage=0,
-            is_verbose=True
+            is_verbose=True, compress=True
             ):
 
         try:
@@ -580,16 +1409,45 @@ class SetContract(_Command):
         self._jarg["force-unique"] = forceUnique
         self._jarg["max-cpu-usage"] = max_cpu_usage
         self._jarg["max-net-usage"] = max_net_usage        
+        self._jarg["compress"] = 1 if compress else 0
+        _put_transaction_context(
+            self._jarg, 
+            permission_name.split(",") if permission_name 
+                else [self.account_name],
+            skip_signature)
+        _unlock_wallet(skip_signature)
+        self._stdin = _local_signer_input(self._jarg, skip_signature)
         _Command.__init__(self, "set", "contract", is_verbose)
+        _forget_code(self.account_name)
 
 
 class PushAction(_Command):
+    """
+    Push a transaction with a single action.
+
+    The action data is serialized locally, with the contract ABI cached by
+    `abi_serializer`. If it cannot be done, the data is passed to the node, 
+    for conversion.
+
+    - **parameters**::
+
+        contract: A contract object or the name of the contract account.
+        action: The name of the action.
+        data: The action arguments, as a dictionary or as a json string.
+        permission: An account object or the name of an account that 
+            authorizes the action.
+        is_verbose: If `False`, do not print stdout, default is `True`. 
+            Ignored if a trace sink is set with `set_trace_sink`, then 
+            stdout is not printed.
+        suppress_error_msg: If `True`, do not print error messages, default 
+            is `False`.
+    """
     def __init__(
             self, contract, action, data,
             permission="", expiration_sec=30, 
             skip_signature=0, dont_broadcast=0, forceUnique=0,
             max_cpu_usage=0, max_net_usage=0,
-            is_verbose=True        
+            is_verbose=True, suppress_error_msg=False
         ):
         try:
             contract_name = contract.name
@@ -602,9 +1460,28 @@ class PushAction(_Command):
             except:
                 pass
 
+        if isinstance(data, dict):
+            data_json = data
+            data = json.dumps(data)
+        else:
+            try:
+                data_json = json.loads(data)
+            except ValueError:
+                data_json = None
+
+        binargs = ""
+        if data_json is not None:
+            try:
+                serializer = abi_serializer(contract_name)
+                if serializer:
+                    binargs = serializer.serialize_action(action, data_json)
+            except abi.AbiError:
+                pass
+
         self._jarg["contract"] = contract_name
         self._jarg["action"] = action
         self._jarg["data"] = data.replace('"', '\\"')
+        self._jarg["binargs"] = binargs
         self._jarg["permission"] = permission
         self._jarg["expiration"] = expiration_sec
         self._jarg["skip-sign"] = skip_signature
@@ -612,9 +1489,18 @@ class PushAction(_Command):
         self._jarg["force-unique"] = forceUnique
         self._jarg["max-cpu-usage"] = max_cpu_usage
         self._jarg["max-net-usage"] = max_net_usage              
-        _Command.__init__(self, "push", "action", is_verbose)
+        _put_transaction_context(
+            self._jarg, permission.split(",") if permission else [], 
+            skip_signature)
+        _unlock_wallet(skip_signature)
+        self._stdin = _local_signer_input(self._jarg, skip_signature)
+        _Command.__init__(
+            self, "push", "action", is_verbose and _trace_sink is None, 
+            suppress_error_msg)
         if not self.error:
             self.name = contract_name
+            if _trace_sink:
+                _trace_sink.put(self.json)
 
 
 class Template(_Command):
@@ -666,9 +1552,23 @@ class ABI(_Command):
 
 
 class WAST(_Command):
+    """
+    Build the WAST file of a contract, and the WASM file next to it.
+
+    - **parameters**::
+
+        source: A contract object or a directory or a comma separated list of 
+            source files.
+        wast_file: The target WAST file, defaults to a file in the `build` 
+            directory of the contract.
+        include_dir: A comma separated list of include directories.
+        is_verbose: If `False`, do not print stdout, default is `True`.
+        optimize: If "size" or "speed", the WASM file is optimized with the 
+            binaryen `wasm-opt`, defaults to "".
+    """
     def __init__(
             self, source, wast_file="", 
-            include_dir="", is_verbose=True):
+            include_dir="", is_verbose=True, optimize=""):
 
         try:
             source = source.contract_dir
@@ -678,6 +1578,7 @@ class WAST(_Command):
         self._jarg["src"] = source
         self._jarg["wast_file"] = wast_file
         self._jarg["include_dir"] = include_dir
+        self._jarg["optimize"] = optimize
 
         _Command.__init__(self, "build", "contract", is_verbose)
         # if not self.error:
@@ -944,9 +1845,9 @@ class Contract(SetContract):
             self.is_verbose)
 
 
-    def wast(self):
+    def wast(self, optimize=""):
         if self.is_mutable:
-            WAST(str(self.contract_path_absolute))
+            WAST(str(self.contract_path_absolute), optimize=optimize)
         else:
             print("ERROR!")
             print("Cannot modify system contracts.")
@@ -960,9 +1861,95 @@ class Contract(SetContract):
             print("Cannot modify system contracts.")
 
     
-    def build(self):
+    def build(self, optimize=""):
         self.abi()
-        self.wast()
+        self.wast(optimize)
+
+
+    def watch(
+            self, scenario=None, include_dirs=(), debounce=0.3, interval=0.5,
+            cycles=None):
+        """ Rebuilds the contract when its sources or headers change, and
+        redeploys it if its code or ABI changed.
+
+        Files are watched with `inotify`, if available, else polled. Bursts 
+        of saves are debounced. The ABI and WASM conversions are cached by 
+        `teos`, therefore unchanged parts are not rebuilt. Each cycle prints 
+        the time from the first detected change to the result.
+
+        - **parameters**::
+
+            scenario: If set, a callable run after each deployment, with the
+                contract as the argument.
+            include_dirs: A list of include directories of the contract.
+            debounce: The time in seconds without changes that ends a burst 
+                of saves, defaults to 0.3s.
+            interval: The polling interval in seconds, if `inotify` is not 
+                available, defaults to 0.5s.
+            cycles: If set, the number of rebuilds before returning.
+        """
+        import workspace # imports pyteos
+
+        if not self.is_mutable:
+            print("ERROR!")
+            print("Cannot modify system contracts.")
+            return
+
+        target = workspace.ContractTarget(self.contract_path_absolute)
+        target.scan(include_dirs)
+        watcher = workspace.FileWatcher(target.dependencies, interval)
+        include_dir = ",".join([str(dir) for dir in include_dirs])
+
+        code = GetCode(self.account_name, is_verbose=False)
+        deployed = (
+            code.code_hash if not code.error else "", 
+            self.__digest(target.outputs[1]))
+
+        cycle = 0
+        try:
+            while cycles is None or cycle < cycles:
+                cycle = cycle + 1
+                changed, first = watcher.wait(debounce)
+                output__("changed: " + ", ".join(
+                    sorted([file.name for file in changed])))
+
+                path = str(self.contract_path_absolute)
+                abi = ABI(path, include_dir=include_dir, is_verbose=False)
+                wast = WAST(path, include_dir=include_dir, is_verbose=False)
+                target.scan(include_dirs)
+                watcher.watch(target.dependencies)
+                if abi.error or wast.error:
+                    output__("cycle {}: build failed, {:.2f}s".format(
+                        cycle, time.time() - first))
+                    continue
+
+                built = (
+                    self.__digest(target.outputs[0].with_suffix(".wasm")), 
+                    self.__digest(target.outputs[1]))
+                redeployed = built != deployed or not built[0]
+                if redeployed:
+                    self.error = False
+                    self.deploy()
+                    if self.error:
+                        output__("cycle {}: deployment failed, {:.2f}s"
+                            .format(cycle, time.time() - first))
+                        continue
+                    deployed = built
+                if scenario:
+                    scenario(self)
+                output__("cycle {}: {}, {:.2f}s".format(
+                    cycle, "redeployed" if redeployed else "unchanged",
+                    time.time() - first))
+        finally:
+            watcher.close()
+
+
+    def __digest(self, file):
+        try:
+            with open(str(file), "rb") as f:
+                return hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return ""
 
 
     def push_action(
@@ -970,10 +1957,18 @@ class Contract(SetContract):
             permission="",
             expiration_sec=30, 
             skip_signature=0, dont_broadcast=0, forceUnique=0,
-            max_cpu_usage=0, max_net_usage=0, is_verbose=False
+            max_cpu_usage=0, max_net_usage=0, is_verbose=False,
+            inline_console=False
         ):
         """ Implements the `push action` command. 
 
+        The `data` argument may be a dictionary or a json string.
+
+        The console output of the action is kept in the `console` attribute,
+        and printed, if not empty. If `inline_console` is `True`, the console
+        output of the inline actions that the action sends is appended. If a 
+        trace sink is set with `set_trace_sink`, nothing is printed, the sink
+        records the output.
         """
         if not permission:
             permission=self.account_name
@@ -992,13 +1987,11 @@ class Contract(SetContract):
             )
         if not push_action.error:
             self.action_json = push_action.json
-            try:
-                self.console = \
-                    self.action_json["processed"]["action_traces"][0] \
-                    ["console"]
+            self.console = "".join([trace.get("console", "") for trace, depth
+                in traces.action_traces(self.action_json)
+                if inline_console or depth == 0])
+            if _trace_sink is None and self.console:
                 print(self.console)
-            except:
-                pass
 
         if (dont_broadcast or is_verbose) and not push_action.error:
             pprint.pprint(self.action_json)
@@ -1029,6 +2022,219 @@ class Contract(SetContract):
         return GetTable(self.name, table, scope)
 
 
+    def table_key(self, table):
+        """ Returns the name of the primary key of a contract's table.
+
+        The name is read from the contract's ABI. If the ABI does not 
+        declare it, returns an empty string.
+        """
+        code = GetCode(self.account_name, is_verbose=False)
+        if code.error or not code.abi:
+            return ""
+        for table_def in code.abi.get("tables", []):
+            if table_def["name"] == table and table_def.get("key_names"):
+                return table_def["key_names"][0]
+        return ""
+
+
+    def table_frame(self, table, scope="", limit=1000):
+        """ Returns all rows of a contract's table, as a NumPy structured 
+        array, so that the table can be analysed with vectorised operations.
+
+        The columns are typed after the row fields declared in the contract's
+        ABI: integers, floats and booleans are numbers, names and checksums 
+        are strings, times are `datetime64` values, and struct fields are 
+        nested columns. Arrays of these types are lists of typed values, 
+        `numpy.stack` makes a matrix of them. Fields of other types, like 
+        `asset` or `string`, hold Python objects. Rows are read page after 
+        page, and converted page after page. Raises `abi.AbiError` if a row
+        misses a field, or if a value does not fit its column.
+
+        Requires NumPy.
+
+        - **parameters**::
+
+            table: The name of the table as specified by the contract abi.
+            scope: An account object or the name of an account, defaults 
+                to the contract account.
+            limit: The number of rows read per page.
+        """
+        import numpy # imported on use, it is an optional dependency
+
+        if not scope:
+            scope=self.account_name
+        else:
+            try: # scope is an account:
+                scope=scope.name
+            except: # scope is the name of an account:
+                scope=scope
+
+        serializer = abi_serializer(self.account_name)
+        if serializer is None:
+            raise abi.AbiError("The contract does not have any ABI.")
+        columns = serializer.columns(serializer.table_type(table))
+        dtype = numpy.dtype(_column_dtype(columns))
+
+        chunks = []
+        page = []
+        for row in _table_rows(self.account_name, table, scope, 
+                serializer.keys.get(table, ""), limit):
+            page.append(_row_values(columns, row))
+            if len(page) == limit:
+                chunks.append(numpy.array(page, dtype=dtype))
+                page = []
+        chunks.append(numpy.array(page, dtype=dtype))
+        return numpy.concatenate(chunks)
+
+
+    def snapshot_state(self, scopes=None, limit=100, workers=4):
+        """ Returns the state of all the tables of the contract. 
+
+        The tables declared in the contract's ABI are read with paginated 
+        reads, in parallel threads. Each row is kept with a digest of its 
+        contents, and each table with a digest of its rows, so that `diff` 
+        compares only the rows of changed tables.
+
+        - **parameters**::
+
+            scopes: A list of account objects or names of accounts, defaults
+                to the contract account.
+            limit: The number of rows read per page.
+            workers: The number of threads.
+
+        The snapshot maps `(table, scope)` tuples to tuples of the table
+        digest and a map of primary keys to tuples of a row digest and the 
+        row. Raises `TableReadError` if any table cannot be read.
+        """
+        scopes = scopes or [self.account_name]
+        scopes = [getattr(scope, "name", scope) for scope in scopes]
+
+        serializer = abi_serializer(self.account_name)
+        if serializer is None:
+            raise abi.AbiError("The contract does not have any ABI.")
+
+        tables = [(table, scope) 
+            for table in sorted(serializer.tables) for scope in scopes]
+        snapshots = run_parallel(
+            [lambda table=table, scope=scope: _table_snapshot(
+                self.account_name, table, scope, serializer.keys.get(table, ""), 
+                limit)
+                for table, scope in tables], 
+            workers)
+        return dict(zip(tables, snapshots))
+
+
+    def diff(self, before, after):
+        """ Returns the row changes between two snapshots returned by 
+        `snapshot_state`, as a list of tuples `(change, table, scope, key, 
+        old, new)`, where `change` is one of "insert", "update" or "delete", 
+        `old` is `None` for inserted rows, and `new` is `None` for deleted 
+        rows.
+
+        Tables with equal digests are skipped.
+
+        For example::
+
+            before = contract.snapshot_state()
+            contract.push_action("move", data)
+            changes = contract.diff(before, contract.snapshot_state())
+        """
+        changes = []
+        for table_scope in sorted(set(before) | set(after)):
+            digest_before, rows_before = before.get(table_scope, (0, {}))
+            digest_after, rows_after = after.get(table_scope, (0, {}))
+            if digest_before == digest_after \
+                    and len(rows_before) == len(rows_after):
+                continue
+
+            table, scope = table_scope
+            for key, (digest, row) in rows_after.items():
+                previous = rows_before.get(key)
+                if previous is None:
+                    changes.append(("insert", table, scope, key, None, row))
+                elif previous[0] != digest:
+                    changes.append(
+                        ("update", table, scope, key, previous[1], row))
+            for key, (digest, row) in rows_before.items():
+                if not key in rows_after:
+                    changes.append(("delete", table, scope, key, row, None))
+        return changes
+
+
+    def watch_table(
+            self, table, scope="", interval=1, max_interval=None, 
+            key=None, limit=100):
+        """ Yields changes of a contract's table.
+
+        The table is polled with paginated `GetTable` reads. Rows are indexed 
+        with digests of their contents, keyed by the primary key, so that only
+        changed rows are yielded, as tuples `(change, key, row)`, where 
+        `change` is one of "insert", "update" or "delete", and `row` is `None`
+        for deleted rows. If any page of the table cannot be read, the poll 
+        is skipped, and the index of the previous poll is kept.
+
+        The polling interval starts from `interval` seconds and is doubled, 
+        up to `max_interval` (defaults to eight times `interval`), while the 
+        table does not change. Any change resets it to `interval`.
+
+        - **parameters**::
+
+            table: The name of the table as specified by the contract abi.
+            scope: An account object or the name of an account, defaults 
+                to the contract account.
+            interval: The shortest time in seconds between polls.
+            max_interval: The longest time in seconds between polls.
+            key: The name of the primary key field, defaults to the first key
+                declared in the contract's ABI.
+            limit: The number of rows read per page.
+        """
+        if not scope:
+            scope=self.account_name
+        else:
+            try: # scope is an account:
+                scope=scope.name
+            except: # scope is the name of an account:
+                scope=scope
+
+        if key is None:
+            key = self.table_key(table)
+        if max_interval is None:
+            max_interval = 8 * interval
+
+        index = None
+        sleep = interval
+        while True:
+            current = {}
+            changes = []
+            try:
+                for row in _table_rows(
+                        self.account_name, table, scope, key, limit):
+                    row_key = row[key] if key in row \
+                        else next(iter(row.values()))
+                    digest = _row_digest(row)
+                    current[row_key] = digest
+                    if index is None:
+                        continue
+                    previous = index.get(row_key)
+                    if previous is None:
+                        changes.append(("insert", row_key, row))
+                    elif previous != digest:
+                        changes.append(("update", row_key, row))
+            except TableReadError:
+                time.sleep(sleep)
+                continue
+
+            if index is not None:
+                for row_key in index:
+                    if not row_key in current:
+                        changes.append(("delete", row_key, None))
+            index = current
+
+            yield from changes
+            sleep = interval if changes else min(2 * sleep, max_interval)
+            time.sleep(sleep)
+
+
     def get_code(self):
         """ Prints a contract's code.
 
@@ -0,0 +1,186 @@
+#!/usr/bin/python3
+
+"""
+Routing of node commands over many nodes, with health checks.
+
+.. module:: router
+    :platform: Unix, Windows
+    :synopsis: Routing of node commands over many nodes, with health checks.
+
+.. moduleauthor:: Tokenika
+
+"""
+
+import time
+import threading
+import pyteos
+
+ROUND_ROBIN = "round_robin"
+LEAST_OUTSTANDING = "least_outstanding"
+
+# `teos` errors meaning that the node cannot be reached:
+_TRANSPORT_ERRORS = ("connection refused", "connection reset",
+    "timeout waiting", "the circuit to", "host not found")
+
+
+class Endpoint:
+    """ The state of a node, as seen by the router.
+
+    - **attributes**::
+
+        address: The http address (host:port) of the node.
+        outstanding: The number of commands being executed by the node.
+        is_healthy: Whether the node answered the last probe, and its head
+            block is not lagging behind.
+        head_block: The head block number of the node at the last probe,
+            `None` if the node did not answer.
+        probe_time: The time of the last probe.
+    """
+    def __init__(self, address):
+        self.address = address
+        self.outstanding = 0
+        self.is_healthy = True
+        self.head_block = None
+        self.probe_time = None
+
+    def __str__(self):
+        return "{}: {}, head block: {}, outstanding: {}".format(
+            self.address, "healthy" if self.is_healthy else "down",
+            self.head_block, self.outstanding)
+
+
+class NodeRouter:
+    """ Chooses the node for each command that calls the node.
+
+    Reads are balanced over the healthy nodes, either in turn, or choosing
+    the node with the least commands being executed. Transactions may be
+    pinned to the primary node. A background thread probes the nodes with
+    `GetInfo`, and drops the nodes that do not answer, or whose head block
+    lags behind the best one. A node is also dropped if a command fails to
+    reach it, until the next successful probe. If no node is healthy, all
+    the nodes are used. Set the router with `pyteos.set_node_router`.
+
+    - **parameters**::
+
+        endpoints: A list of http addresses (host:port) of the nodes.
+        primary: The address of the node that transactions are pushed to,
+            defaults to the first endpoint.
+        policy: `ROUND_ROBIN` or `LEAST_OUTSTANDING`, defaults to
+            `ROUND_ROBIN`.
+        pin_pushes: If `False`, transactions are balanced like reads,
+            defaults to `True`.
+        probe_interval: The time in seconds between probes, if 0, nodes are
+            not probed, defaults to 2s.
+        max_lag: The number of blocks that a node may lag behind the best
+            node, defaults to 10.
+
+    - **attributes**::
+
+        endpoints: A map of addresses to `Endpoint` objects.
+    """
+    def __init__(
+            self, endpoints, primary=None, policy=ROUND_ROBIN,
+            pin_pushes=True, probe_interval=2, max_lag=10):
+        if not endpoints:
+            raise ValueError("No node endpoints.")
+        if not policy in (ROUND_ROBIN, LEAST_OUTSTANDING):
+            raise ValueError("Unknown routing policy: " + str(policy))
+
+        self.endpoints = dict(
+            [(address, Endpoint(address)) for address in endpoints])
+        self.primary = primary or endpoints[0]
+        if not self.primary in self.endpoints:
+            self.endpoints[self.primary] = Endpoint(self.primary)
+        self.policy = policy
+        self.pin_pushes = pin_pushes
+        self.probe_interval = probe_interval
+        self.max_lag = max_lag
+        self.__order = list(self.endpoints.values())
+        self.__next = 0
+        self.__lock = threading.Lock()
+        self.__stop = threading.Event()
+        self.__thread = None
+        if probe_interval:
+            self.__thread = threading.Thread(target=self.__run, daemon=True)
+            self.__thread.start()
+
+    def acquire(self, is_push=False):
+        """ Returns the address of the node for a command, and counts the
+        command as outstanding, until `release`.
+        """
+        with self.__lock:
+            if is_push and self.pin_pushes:
+                endpoint = self.endpoints[self.primary]
+            else:
+                candidates = [endpoint for endpoint in self.__order
+                    if endpoint.is_healthy] or self.__order
+                start = self.__next % len(candidates)
+                candidates = candidates[start:] + candidates[:start]
+                self.__next = self.__next + 1
+                if self.policy == LEAST_OUTSTANDING:
+                    endpoint = min(candidates,
+                        key=lambda endpoint: endpoint.outstanding)
+                else:
+                    endpoint = candidates[0]
+            endpoint.outstanding = endpoint.outstanding + 1
+            return endpoint.address
+
+    def release(self, address, out=""):
+        """ Counts a command as completed. If the `teos` output tells that
+        the node could not be reached, the node is dropped.
+        """
+        with self.__lock:
+            endpoint = self.endpoints[address]
+            endpoint.outstanding = max(0, endpoint.outstanding - 1)
+            if out.startswith("ERROR") and any(
+                    [error in out.lower() for error in _TRANSPORT_ERRORS]):
+                endpoint.is_healthy = False
+
+    def probe(self):
+        """ Reads the head block of each node, and marks the nodes healthy or
+        not.
+        """
+        head_blocks = {}
+        for address in list(self.endpoints):
+            with pyteos.use_node(address):
+                get_info = pyteos.GetInfo(
+                    is_verbose=False, suppress_error_msg=True)
+            head_blocks[address] = None if get_info.error \
+                else int(get_info.head_block)
+
+        best = max([head_block for head_block in head_blocks.values()
+            if head_block is not None] or [0])
+        with self.__lock:
+            for address, head_block in head_blocks.items():
+                endpoint = self.endpoints[address]
+                endpoint.head_block = head_block
+                endpoint.probe_time = time.time()
+                endpoint.is_healthy = head_block is not None \
+                    and best - head_block <= self.max_lag
+
+    def healthy(self):
+        """ Returns the addresses of the healthy nodes.
+        """
+        with self.__lock:
+            return [endpoint.address for endpoint in self.__order
+                if endpoint.is_healthy]
+
+    def close(self):
+        """ Stops probing the nodes.
+        """
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def __run(self):
+        while not self.__stop.is_set():
+            try:
+                self.probe()
+            except Exception as e:
+                print("ERROR! Node probe: " + str(e))
+            self.__stop.wait(self.probe_interval)
+
+    def __str__(self):
+        with self.__lock:
+            return "\n".join([str(endpoint) for endpoint in self.__order])
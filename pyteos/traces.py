@@ -0,0 +1,163 @@
+#!/usr/bin/python3
+
+"""
+Background recording of the traces of pushed transactions.
+
+.. module:: traces
+    :platform: Unix, Windows
+    :synopsis: Background recording of the traces of pushed transactions.
+
+.. moduleauthor:: Tokenika
+
+"""
+
+import json
+import time
+import queue
+import threading
+
+_CLOSE = object()
+
+
+def action_traces(transaction):
+    """ Yields the action traces of a pushed transaction, with the traces of
+    inline actions following the trace of the action that sent them, and
+    the depth of each trace, 0 for the actions of the transaction.
+
+    - **parameters**::
+
+        transaction: The json response to a push command.
+    """
+    try:
+        traces = transaction["processed"]["action_traces"]
+    except (KeyError, TypeError):
+        return
+
+    pending = [(trace, 0) for trace in reversed(traces or [])]
+    while pending:
+        trace, depth = pending.pop()
+        yield (trace, depth)
+        pending.extend([(inline, depth + 1)
+            for inline in reversed(trace.get("inline_traces") or [])])
+
+
+def action_records(transaction, time_stamp=None):
+    """ Returns flat records of the action traces of a pushed transaction,
+    ready to be written as json lines.
+    """
+    processed = transaction.get("processed") or {}
+    trx_id = transaction.get("transaction_id", processed.get("id", ""))
+    status = (processed.get("receipt") or {}).get("status", "")
+
+    records = []
+    for index, (trace, depth) in enumerate(action_traces(transaction)):
+        act = trace.get("act") or {}
+        receipt = trace.get("receipt") or {}
+        records.append({
+            "time": time_stamp,
+            "trx_id": trx_id,
+            "status": status,
+            "index": index,
+            "depth": depth,
+            "receiver": receipt.get("receiver", act.get("account", "")),
+            "account": act.get("account", ""),
+            "action": act.get("name", ""),
+            "authorization": act.get("authorization", []),
+            "data": act.get("data"),
+            "console": trace.get("console", ""),
+            "elapsed": trace.get("elapsed"),
+            "receipt": receipt
+            })
+    return records
+
+
+class TraceSink:
+    """ Writes the action traces of pushed transactions, including inline
+    actions, with their console output and receipts, to a file of json
+    lines, in a background thread.
+
+    `put` never waits: transactions are queued, and if the queue is full,
+    they are dropped and counted. Set the sink with `pyteos.set_trace_sink`,
+    then `PushAction` results are put to the sink, and neither `PushAction`
+    nor `Contract.push_action` print them.
+
+    - **parameters**::
+
+        path: The path of the json lines file, appended to.
+        max_queue: The maximal number of queued transactions, defaults to
+            10000.
+        echo: If `True`, the background thread prints the console output of
+            the actions, defaults to `False`.
+
+    - **attributes**::
+
+        written: The number of written action records.
+        dropped: The number of transactions dropped, because the queue was
+            full.
+    """
+    def __init__(self, path, max_queue=10000, echo=False):
+        self.path = path
+        self.echo = echo
+        self.written = 0
+        self.dropped = 0
+        self.__lock = threading.Lock()
+        self.__queue = queue.Queue(max_queue)
+        self.__file = open(path, "a", encoding="utf-8")
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def put(self, transaction):
+        """ Queues the json response of a push command. Returns `False` if
+        the transaction is dropped.
+        """
+        try:
+            self.__queue.put_nowait((transaction, time.time()))
+            return True
+        except queue.Full:
+            with self.__lock:
+                self.dropped = self.dropped + 1
+            return False
+
+    def flush(self):
+        """ Waits until the queued transactions are written.
+        """
+        self.__queue.join()
+
+    def close(self):
+        """ Writes the queued transactions, stops the thread and closes the
+        file.
+        """
+        if not self.__thread.is_alive():
+            return
+        self.__queue.put(_CLOSE)
+        self.__thread.join()
+        self.__file.close()
+
+    def __run(self):
+        while True:
+            item = self.__queue.get()
+            if item is _CLOSE:
+                self.__file.flush()
+                self.__queue.task_done()
+                return
+            try:
+                self.__write(*item)
+            except Exception as e:
+                print("ERROR! Trace sink: " + str(e))
+            if self.__queue.empty():
+                self.__file.flush()
+            self.__queue.task_done()
+
+    def __write(self, transaction, time_stamp):
+        for record in action_records(transaction, time_stamp):
+            self.__file.write(json.dumps(record) + "\n")
+            with self.__lock:
+                self.written = self.written + 1
+            if self.echo and record["console"]:
+                print(record["console"])
+
+    def __str__(self):
+        with self.__lock:
+            written, dropped = (self.written, self.dropped)
+        return "written: {}, dropped: {}, queued: {}".format(
+            written, dropped, self.__queue.qsize())
@@ -0,0 +1,383 @@
+#!/usr/bin/python3
+
+"""
+Incremental, parallel build of all the contracts of a workspace.
+
+.. module:: workspace
+    :platform: Unix, Windows
+    :synopsis: Incremental, parallel build of all the contracts of a workspace.
+
+.. moduleauthor:: Tokenika
+
+"""
+
+import os
+import re
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+import pathlib
+import concurrent.futures
+import pyteos
+
+_INCLUDE = re.compile(r'^\s*#\s*include\s*([<"])([^>"]+)[>"]', re.MULTILINE)
+_SOURCE_EXTENSIONS = (".cpp", ".c")
+
+
+class ContractTarget:
+    """ A contract of the workspace, with the files that its build depends
+    on.
+
+    - **attributes**::
+
+        name: The name of the contract directory.
+        path: The path of the contract directory.
+        sources: The source files of the contract.
+        outputs: The .wast and .abi files made by the build.
+        dependencies: The source files and the headers that the sources
+            include, directly or not.
+        contracts: The names of other contracts of the workspace, whose
+            headers are included.
+    """
+    def __init__(self, path):
+        self.path = pathlib.Path(path).resolve()
+        self.name = self.path.name
+        self.sources = sorted(
+            [file for file in self.path.iterdir()
+                if file.suffix in _SOURCE_EXTENSIONS and file.is_file()])
+        self.dependencies = set()
+        self.contracts = set()
+
+        stem = self.sources[0].stem if self.sources else self.name
+        target_dir = self.path / "build"
+        if not target_dir.exists():
+            target_dir = self.path
+        self.outputs = [target_dir / (stem + ".wast"),
+            target_dir / (stem + ".abi")]
+
+    def scan(self, include_dirs=(), headers=None):
+        """ Reads the include directives of the sources again.
+
+        - **parameters**::
+
+            include_dirs: A list of shared include directories.
+            headers: A map of files to the headers they include, shared by
+                scans of many contracts.
+        """
+        headers = {} if headers is None else headers
+        self.dependencies = set()
+        pending = list(self.sources)
+        while pending:
+            file = pending.pop()
+            if file in self.dependencies:
+                continue
+            self.dependencies.add(file)
+            if not file in headers:
+                headers[file] = _includes(file, self.path, include_dirs)
+            pending.extend(headers[file])
+
+    def is_stale(self):
+        """ Whether any output is missing, or older than any dependency.
+        """
+        try:
+            built = min([output.stat().st_mtime for output in self.outputs])
+        except FileNotFoundError:
+            return True
+        for file in self.dependencies:
+            try:
+                if file.stat().st_mtime > built:
+                    return True
+            except FileNotFoundError:
+                return True
+        return False
+
+    def __repr__(self):
+        return "ContractTarget({})".format(str(self.path))
+
+
+def _includes(file, contract_path, include_dirs):
+    """ Returns the headers that a file includes, that are found in the
+    directory of the file, in the contract directory, or in the include
+    directories.
+    """
+    try:
+        text = file.read_text(errors="replace")
+    except OSError:
+        return []
+
+    includes = []
+    for delimiter, name in _INCLUDE.findall(text):
+        search = [pathlib.Path(dir) for dir in include_dirs]
+        if delimiter == '"':
+            search = [file.parent, contract_path] + search
+        for dir in search:
+            header = dir / name
+            if header.is_file():
+                includes.append(header.resolve())
+                break
+    return includes
+
+
+def _build(path, include_dir, optimize=""):
+    """ Builds a contract in a worker process. Returns the error output, or
+    an empty string.
+    """
+    pyteos.set_verbose(False)
+    abi = pyteos.ABI(path, include_dir=include_dir, is_verbose=False)
+    if abi.error:
+        return abi._out
+    wast = pyteos.WAST(
+        path, include_dir=include_dir, is_verbose=False, optimize=optimize)
+    if wast.error:
+        return wast._out
+    return ""
+
+
+class ContractWorkspace:
+    """ The contracts of a workspace, built in parallel processes, only if
+    they are stale.
+
+    Each sub-directory of the workspace that contains `.cpp` or `.c` files
+    is a contract. Its sources are scanned for `#include` directives, that
+    are resolved in the directory of the including file, in the contract
+    directory and in the shared include directories. A contract is stale if
+    its `.wast` or `.abi` file is missing, or older than any of its sources
+    or any header they include.
+
+    - **parameters**::
+
+        workspace: The path of the workspace, defaults to the
+            `contractWorkspace` of the `teos` configuration.
+        include_dirs: A list of include directories shared by the contracts.
+        paths: A list of additional contract directories, outside the
+            workspace.
+
+    - **attributes**::
+
+        targets: A map of contract names to `ContractTarget` objects.
+    """
+    def __init__(self, workspace=None, include_dirs=None, paths=None):
+        if workspace is None:
+            config = pyteos.GetConfig(is_verbose=False)
+            workspace = pathlib.Path(config.json["contractWorkspace"])
+            if not workspace.is_absolute():
+                workspace = pathlib.Path(config.json["contextDir"]) / workspace
+        self.workspace = pathlib.Path(workspace)
+        self.include_dirs = [pathlib.Path(dir) for dir in include_dirs or []]
+
+        self.targets = {}
+        contract_paths = [path for path in sorted(self.workspace.iterdir())
+            if path.is_dir()] if self.workspace.is_dir() else []
+        for path in contract_paths + [pathlib.Path(path) for path in paths or []]:
+            target = ContractTarget(path)
+            if target.sources:
+                self.targets[target.name] = target
+        self.scan()
+
+    def scan(self):
+        """ Reads the include directives of all the contracts again.
+        """
+        headers = {}
+        for target in self.targets.values():
+            target.scan(self.include_dirs, headers)
+            target.contracts = set()
+            for other in self.targets.values():
+                if other is not target and any(
+                        [other.path in file.parents
+                            for file in target.dependencies]):
+                    target.contracts.add(other.name)
+
+    def dependents(self, file):
+        """ Returns the names of the contracts that depend on a file.
+        """
+        file = pathlib.Path(file).resolve()
+        return sorted([target.name for target in self.targets.values()
+            if file in target.dependencies])
+
+    def stale(self):
+        """ Returns the names of the contracts that need a build.
+        """
+        return sorted([target.name for target in self.targets.values()
+            if target.is_stale()])
+
+    def build(
+            self, names=None, jobs=None, force=False, optimize="",
+            is_verbose=True):
+        """ Builds stale contracts, in parallel processes.
+
+        - **parameters**::
+
+            names: A list of names of the contracts to consider, defaults to
+                all the contracts.
+            jobs: The maximal number of parallel builds, defaults to the
+                number of processors.
+            force: If `True`, build even if not stale.
+            optimize: "size" or "speed" to optimize the WASM files, or a map
+                of contract names to these values, defaults to "".
+            is_verbose: If `False`, do not print progress.
+
+        Returns a map of the names of built contracts to error messages,
+        empty if a build succeeded.
+        """
+        targets = [self.targets[name] for name in names or self.targets]
+        if not force:
+            targets = [target for target in targets if target.is_stale()]
+        if not targets:
+            if is_verbose:
+                pyteos.output__("All contracts are up to date.")
+            return {}
+
+        include_dir = ",".join([str(dir) for dir in self.include_dirs])
+        results = {}
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=jobs or os.cpu_count()) as executor:
+            futures = {
+                executor.submit(_build, str(target.path), include_dir,
+                    optimize.get(target.name, "") 
+                        if isinstance(optimize, dict) else optimize):
+                    target.name for target in targets}
+            for future in concurrent.futures.as_completed(futures):
+                name = futures[future]
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    results[name] = str(e)
+                if is_verbose:
+                    pyteos.output__("{}: {}".format(
+                        name, "ERROR\n" + results[name]
+                            if results[name] else "built"))
+        return results
+
+
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_IN_EVENT = struct.Struct("iIII")
+
+
+class _Inotify:
+    """ Linux `inotify` notifications about files in directories.
+    """
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.__add_watch = libc.inotify_add_watch
+        self.__add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.__dirs = {}
+
+    def watch(self, dir):
+        if dir in self.__dirs.values():
+            return
+        wd = self.__add_watch(self.fd, str(dir).encode(),
+            _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+        self.__dirs[wd] = dir
+
+    def read(self, timeout):
+        """ Returns the paths of changed files, waiting not longer than
+        `timeout` seconds.
+        """
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return set()
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        pos = 0
+        while pos < len(data):
+            wd, mask, cookie, length = _IN_EVENT.unpack_from(data, pos)
+            pos = pos + _IN_EVENT.size
+            name = data[pos:pos + length].rstrip(b"\0").decode()
+            pos = pos + length
+            if wd in self.__dirs and name:
+                changed.add(self.__dirs[wd] / name)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FileWatcher:
+    """ Waits for changes of files.
+
+    Uses Linux `inotify`, if available, else polls the modification times of
+    the files.
+
+    - **parameters**::
+
+        files: The files to watch.
+        interval: The polling interval in seconds, if `inotify` is not 
+            available, defaults to 0.5s.
+    """
+    def __init__(self, files, interval=0.5):
+        self.interval = interval
+        self.files = set()
+        self.__mtimes = {}
+        try:
+            self.__inotify = _Inotify()
+        except (OSError, AttributeError, TypeError):
+            self.__inotify = None
+        self.watch(files)
+
+    def watch(self, files):
+        """ Sets the files to watch.
+        """
+        self.files = set([pathlib.Path(file).resolve() for file in files])
+        self.__mtimes = self.__stat()
+        if self.__inotify:
+            for file in self.files:
+                self.__inotify.watch(file.parent)
+
+    def wait(self, debounce=0.3):
+        """ Waits for a change, then for `debounce` seconds without any 
+        change, so that a burst of saves makes a single change.
+
+        Returns the changed files and the time of the first change.
+        """
+        changed = set()
+        while not changed:
+            changed = self.__changes(None if self.__inotify else self.interval)
+        first = time.time()
+
+        deadline = first + debounce
+        while time.time() < deadline:
+            more = self.__changes(max(0, deadline - time.time()))
+            if more:
+                changed |= more
+                deadline = time.time() + debounce
+        return (changed, first)
+
+    def close(self):
+        if self.__inotify:
+            self.__inotify.close()
+
+    def __changes(self, timeout):
+        if self.__inotify:
+            return set([file for file in self.__inotify.read(timeout)
+                if file in self.files])
+
+        time.sleep(timeout)
+        mtimes = self.__stat()
+        changed = set([file for file in self.files
+            if mtimes.get(file) != self.__mtimes.get(file)])
+        self.__mtimes = mtimes
+        return changed
+
+    def __stat(self):
+        mtimes = {}
+        for file in self.files:
+            try:
+                mtimes[file] = file.stat().st_mtime
+            except FileNotFoundError:
+                mtimes[file] = None
+        return mtimes
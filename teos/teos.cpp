@@ -2,6 +2,7 @@
 #include <stdlib.h>
 #include <iostream>
 #include <string>
+#include <ctime>
 
 #include <boost/algorithm/string.hpp>
 #include <boost/property_tree/ptree.hpp>
@@ -37,9 +38,12 @@
 
 const char* usage = R"(
 Command Line Interface to Eos Daemon
-Usage: ./teos [HOST:PORT] [OPTIONS] [COMMAND] [SUBCOMMAND] [OPTIONS]
+Usage: ./teos [--startup-profile] [HOST:PORT] [OPTIONS] [COMMAND] [SUBCOMMAND] [OPTIONS]
 for example:
 192.168.229.140:8888 get block 255
+
+--startup-profile  prints time spent in static initialisation, option parsing 
+                   and config load.
 )";
 
 const char* commands = R"(
@@ -71,6 +75,8 @@ int main(int argc, const char *argv[]) {
   using namespace teos::control;
   using namespace boost::program_options;
 
+  StartupProfile::staticInitMs = 1000.0 * clock() / CLOCKS_PER_SEC;
+
   options_description desc("Options");
   string command;
   string subcommand;
@@ -79,6 +85,13 @@ int main(int argc, const char *argv[]) {
   TeosCommand::httpWalletAddress = TeosCommand::httpAddress;
   TeosControl::executable = argv[0];
 
+  if (argc > 1 && strcmp(argv[1], "--startup-profile") == 0)
+  {
+    StartupProfile::isOn = true;
+    argv++;
+    argc--;
+  }
+
   if (argc > 1)
   {
     string httpAddress(argv[1]);
@@ -160,6 +173,10 @@ int main(int argc, const char *argv[]) {
     {
       cout << "unknown command!" << endl;
     }    
+    if (StartupProfile::isOn)
+    {
+      StartupProfile::report();
+    }
   } else {
     HELP
     return 0;
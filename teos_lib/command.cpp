@@ -1,6 +1,10 @@
 #include <stdio.h>
 #include <iostream>
+#include <fstream>
 #include <cstdarg>
+#include <chrono>
+#include <random>
+#include <thread>
 
 #include <boost/property_tree/json_parser.hpp>
 #include <boost/date_time/posix_time/posix_time.hpp>
@@ -43,10 +47,176 @@ namespace teos
     }
   }
 
+  ///////////////////////////////////////////////////////////////////////////
+  // Transport
+  // Each call has a deadline for resolving and connecting, and another one for
+  // sending the request and reading the response. When a deadline passes, the
+  // socket is closed, what aborts the pending operation. 
+  ///////////////////////////////////////////////////////////////////////////
+  namespace 
+  {
+    namespace ip = boost::asio::ip;
+    namespace bfs = boost::filesystem;
+
+    bool exchange(
+      string host, string port, string request, 
+      teos::control::TransportSettings settings,
+      string& response, boost::system::error_code& error)
+    {
+      boost::asio::io_service io_service;
+      ip::tcp::resolver resolver(io_service);
+      ip::tcp::socket socket(io_service);
+      boost::asio::deadline_timer timer(io_service);
+      bool timedOut = false;
+
+      auto run = [&](int timeoutMs) {
+        timedOut = false;
+        timer.expires_from_now(boost::posix_time::milliseconds(timeoutMs));
+        timer.async_wait([&](const boost::system::error_code& ec) {
+          if (ec != boost::asio::error::operation_aborted) {
+            timedOut = true;
+            boost::system::error_code ignored;
+            resolver.cancel();
+            socket.close(ignored);
+          }
+        });
+        io_service.reset();
+        io_service.run();
+        if (timedOut) {
+          error = boost::asio::error::timed_out;
+        }
+      };
+
+      ip::tcp::resolver::iterator endpoints;
+      error = boost::asio::error::would_block;
+      resolver.async_resolve(ip::tcp::resolver::query(host, port),
+        [&](const boost::system::error_code& ec, 
+            ip::tcp::resolver::iterator iterator) {
+          error = ec;
+          endpoints = iterator;
+          timer.cancel();
+        });
+      run(settings.connectTimeoutMs);
+      if (error) {
+        return false;
+      }
+
+      boost::asio::async_connect(socket, endpoints,
+        [&](const boost::system::error_code& ec, 
+            ip::tcp::resolver::iterator) {
+          error = ec;
+          timer.cancel();
+        });
+      run(settings.connectTimeoutMs);
+      if (error) {
+        return false;
+      }
+
+      boost::asio::streambuf response_buffer;
+      boost::asio::async_write(socket, boost::asio::buffer(request),
+        [&](const boost::system::error_code& ec, size_t) {
+          if (ec) {
+            error = ec;
+            timer.cancel();
+            return;
+          }
+          // request sent, responce expected.
+          boost::asio::async_read(socket, response_buffer, 
+            boost::asio::transfer_all(),
+            [&](const boost::system::error_code& ec, size_t) {
+              error = ec == boost::asio::error::eof 
+                ? boost::system::error_code() : ec;
+              timer.cancel();
+            });
+        });
+      run(settings.readTimeoutMs);
+      if (error) {
+        return false;
+      }
+
+      response = string(
+        boost::asio::buffer_cast<const char*>(response_buffer.data()),
+        response_buffer.size());
+      return true;
+    }
+
+    long long nowMs()
+    {
+      return chrono::duration_cast<chrono::milliseconds>(
+        chrono::system_clock::now().time_since_epoch()).count();
+    }
+
+    void backoff(int attempt)
+    {
+      // Full jitter: a random wait up to an exponentially growing cap.
+      static mt19937 generator{ random_device{}() };
+      uniform_int_distribution<int> wait(
+        0, min(2000, 100 * (1 << min(attempt, 5))));
+      this_thread::sleep_for(chrono::milliseconds(wait(generator)));
+    }
+
+    /*
+     * The state of the circuit breaker is kept in the cache directory, per 
+     * address, because each `teos` call is a separate process. The file holds
+     * the number of consecutive failed calls, and the time until which the 
+     * circuit is open. The breaker never changes the status of the command: 
+     * if its file cannot be used, calls go without the breaker.
+     */
+    string breakerFile(string address)
+    {
+      try {
+        TeosControl status;
+        string dir = teos::control::getCacheDir(&status, "breaker");
+        if (dir.empty() || status.isError_) {
+          return "";
+        }
+        boost::replace_all(address, ":", "_");
+        return (bfs::path(dir) / address).string();
+      } catch (exception&) {}
+      return "";
+    }
+
+    void readBreaker(string file, int& failures, long long& openUntil)
+    {
+      failures = 0;
+      openUntil = 0;
+      try {
+        ifstream in(file);
+        if (!(in >> failures >> openUntil) || failures < 0) {
+          failures = 0;
+          openUntil = 0;
+        }
+      } catch (exception&) {}
+    }
+
+    void writeBreaker(string file, int failures, long long openUntil)
+    {
+      try {
+        if (failures == 0) {
+          bfs::remove(file);
+          return;
+        }
+        bfs::path temp = bfs::path(file).parent_path() 
+          / bfs::unique_path("%%%%-%%%%-%%%%.tmp");
+        {
+          ofstream out(temp.string());
+          out << failures << " " << openUntil << endl;
+        }
+        bfs::rename(temp, file);
+      } catch (exception&) {}
+    }
+  }
+
+  bool TeosCommand::isIdempotent()
+  {
+    string name = path_.substr(path_.rfind("/") + 1);
+    return name.find("get_") == 0 || name.find("list_") == 0 
+      || name == "abi_json_to_bin" || name == "abi_bin_to_json";
+  }
+
   void TeosCommand::callEosd()
   {
     using namespace std;
-    namespace ip = boost::asio::ip;
     namespace pt = boost::property_tree;  
     namespace control = teos::control;
 
@@ -71,14 +241,22 @@ namespace teos
     string port = string(address.substr(colon + 1, address.size()));
 
     try {
-      boost::asio::io_service io_service;
+      control::TransportSettings settings = control::getTransportSettings(this);
 
-      ip::tcp::resolver resolver(io_service);
-      ip::tcp::resolver::query query(host, port);
-      ip::tcp::resolver::iterator iterator = resolver.resolve(query);
-
-      ip::tcp::socket socket(io_service);
-      boost::asio::connect(socket, iterator);
+      int failures = 0;
+      long long openUntil = 0;
+      string breaker;
+      if (settings.breakerThreshold > 0) {
+        breaker = breakerFile(address);
+        readBreaker(breaker, failures, openUntil);
+        if (nowMs() < openUntil) {
+          putError((boost::format(
+            "The circuit to %1% is open after %2% failed calls, "
+            "retry in %3% ms.") 
+            % address % failures % (openUntil - nowMs())).str());
+          return;
+        }
+      }
 
       string postMsg = normRequest(reqJson_);
 
@@ -93,29 +271,38 @@ namespace teos
 
       ////cout << request << endl;
 
-      boost::system::error_code error;
+      int attempts = isIdempotent() ? 1 + settings.readRetries : 1;
+      if (!breaker.empty() && failures >= settings.breakerThreshold) {
+        attempts = 1; // A half-open circuit lets a single probe through.
+      }
 
-      boost::asio::streambuf request_buffer;
-      ostream request_stream(&request_buffer);
-      request_stream << request;
-      boost::asio::write(socket, request_buffer, error);
+      string message;
+      boost::system::error_code error;
+      for (int attempt = 0; attempt < attempts; attempt++) {
+        if (attempt > 0) {
+          backoff(attempt);
+        }
+        if (exchange(host, port, request, settings, message, error)) {
+          break;
+        }
+      }
 
       if (error) {
-        putError(error.message());
+        if (!breaker.empty()) {
+          failures++;
+          writeBreaker(breaker, failures, 
+            failures >= settings.breakerThreshold 
+              ? nowMs() + settings.breakerCooldownMs : 0);
+        }
+        putError(error == boost::asio::error::timed_out
+          ? "Timeout waiting for " + address + "." : error.message());
         return;
       }
-
-      // request sent, responce expected.
-
-      boost::asio::streambuf response_buffer;
-      boost::asio::read(socket, response_buffer, boost::asio::transfer_all(),
-        error);
-      if (error && error != boost::asio::error::eof) {
-        putError(error.message());
-        return;
+      if (failures > 0 && !breaker.empty()) {
+        writeBreaker(breaker, 0, 0);
       }
 
-      istream response_stream(&response_buffer);
+      istringstream response_stream(message);
       string http_version;
       response_stream >> http_version;
       unsigned int status_code;
@@ -125,14 +312,11 @@ namespace teos
       getline(response_stream, status_message);
       if (!(status_code == 200 || status_code == 201 || status_code == 202)) {
         string msg = string("status code is ") + to_string(status_code);
-        msg += string("\n eosd response is ") +
-          string(boost::asio::buffer_cast<const char*>(
-            response_buffer.data()));
+        msg += string("\n eosd response is ") + message;
         putError(msg);
         return;
       }
 
-      string message(boost::asio::buffer_cast<const char*>(response_buffer.data()));
       string mark = CRNL + CRNL; // header end mark
       size_t found = message.find(mark);
       message = message.substr(found + mark.length(), message.length());
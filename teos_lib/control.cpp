@@ -1,6 +1,7 @@
 #include <stdio.h>
 #include <iostream>
 #include <cstdarg>
+#include <chrono>
 
 #include <boost/property_tree/json_parser.hpp>
 #include <boost/date_time/posix_time/posix_time.hpp>
@@ -95,11 +96,26 @@ namespace teos
     return configJson;
   }
 
+  /**
+   * The configuration file is read once, and then cached for the lifetime of
+   * the process.
+   */
   ptree TeosControl::getConfig(TeosControl* teosControl) {
+    static string cachedFile;
+    static ptree cachedConfig;
+
+    string configJson = getConfigJson();
+    if(!cachedFile.empty() && cachedFile == configJson) {
+      return cachedConfig;
+    }
+
+    auto start = chrono::steady_clock::now();
     ptree config;
     try
     {
-      read_json(getConfigJson(), config);
+      read_json(configJson, config);
+      cachedFile = configJson;
+      cachedConfig = config;
     }
     catch (exception& e) {
       if(teosControl) {
@@ -108,9 +124,24 @@ namespace teos
         cout << teos_ERROR << endl << e.what() << endl;
       }
     }
+    StartupProfile::configLoadMs += chrono::duration<double, milli>(
+      chrono::steady_clock::now() - start).count();
+    StartupProfile::configReads++;
     return config;
   }
 
+  bool StartupProfile::isOn = false;
+  double StartupProfile::staticInitMs = 0;
+  double StartupProfile::optionParseMs = 0;
+  double StartupProfile::configLoadMs = 0;
+  int StartupProfile::configReads = 0;
+
+  void StartupProfile::report() {
+    output("static init", "%.3f ms (CPU time before main)", staticInitMs);
+    output("option parse", "%.3f ms", optionParseMs);
+    output("config load", "%.3f ms (%d reads)", configLoadMs, configReads);
+  }
+
   void TeosControl::errorRespJson(string sender, string message) 
   {
     if(respJson_.count(teos_ERROR) != 0) {
@@ -3,6 +3,10 @@
 #include <sstream>
 #include <string>
 #include <vector>
+#include <set>
+#include <fstream>
+#include <regex>
+#include <chrono>
 
 #include <boost/property_tree/ptree.hpp>
 #include <boost/property_tree/json_parser.hpp>
@@ -10,8 +14,11 @@
 #include <boost/filesystem.hpp>
 #include <boost/algorithm/string.hpp>
 
+#include <fc/crypto/sha256.hpp>
+
 #include <teoslib/control/config.hpp>
 #include <teoslib/control/build_contract.hpp>
+#include <teoslib/eos_interface.hpp>
 #include <teoslib/utilities.hpp>
 
 using namespace std;
@@ -202,6 +209,76 @@ namespace teos {
       }
     }
 
+    ///////////////////////////////////////////////////////////////////////////
+    // includeClosure
+    // Collects the files that a source file includes, directly or not. 
+    // Includes that are not found in the include dirs are skipped.
+    ///////////////////////////////////////////////////////////////////////////
+    void includeClosure(
+      const boost::filesystem::path& file,
+      const vector<boost::filesystem::path>& includeDirs,
+      set<string>& closure)
+    {
+      namespace bfs = boost::filesystem;
+      static const regex include("^\\s*#\\s*include\\s*[<\"]([^>\"]+)[>\"]");
+
+      if(!closure.insert(file.string()).second){
+        return;
+      }
+
+      ifstream in(file.string());
+      string line;
+      smatch match;
+      while(getline(in, line)){
+        if(!regex_search(line, match, include)){
+          continue;
+        }
+        bfs::path header = file.parent_path() / match[1].str();
+        for(size_t i = 0; !bfs::is_regular_file(header) 
+            && i < includeDirs.size(); i++){
+          header = includeDirs[i] / match[1].str();
+        }
+        if(bfs::is_regular_file(header)){
+          includeClosure(bfs::canonical(header), includeDirs, closure);
+        }
+      }
+    }
+
+    ///////////////////////////////////////////////////////////////////////////
+    // abiCacheKey
+    // The hash of the abigen binary stamp, the command line, and the content 
+    // of the types source with its include closure.
+    ///////////////////////////////////////////////////////////////////////////
+    string abiCacheKey(
+      const string& abigen,
+      const string& flags,
+      const boost::filesystem::path& types,
+      const vector<boost::filesystem::path>& includeDirs)
+    {
+      namespace bfs = boost::filesystem;
+
+      fc::sha256::encoder encoder;
+      string stamp = abigen;
+      if(bfs::exists(abigen)){
+        stamp += " " + to_string(bfs::file_size(abigen))
+          + " " + to_string(bfs::last_write_time(abigen));
+      }
+      stamp += "\n" + flags + "\n";
+      encoder.write(stamp.data(), stamp.size());
+
+      set<string> closure;
+      includeClosure(bfs::canonical(types), includeDirs, closure);
+      for(const string& file : closure){
+        ifstream in(file, ios::binary);
+        string content((istreambuf_iterator<char>(in)), 
+          istreambuf_iterator<char>());
+        string entry = file + "\n" + to_string(content.size()) + "\n";
+        encoder.write(entry.data(), entry.size());
+        encoder.write(content.data(), content.size());
+      }
+      return encoder.result().str();
+    }
+
     void GenerateAbi::generateAbi(
       string types_hpp,
       string target_file,
@@ -238,28 +315,35 @@ namespace teos {
         }
       }
 
-      string command_line = getSourceDir(this) 
-        + "/build/programs/eosio-abigen/eosio-abigen"
-        + " -extra-arg=-c -extra-arg=--std=c++14 -extra-arg=--target=wasm32"
-        + " -extra-arg=-nostdinc -extra-arg=-nostdinc++ -extra-arg=-DABIGEN"
-        + " -extra-arg=-I" + getEOSIO_BOOST_INCLUDE_DIR(this)
-        + " -extra-arg=-I" + getSourceDir(this) + "/externals/magic_get/include"
-        + " -extra-arg=-I" + getSourceDir(this) + "/contracts/libc++/upstream/include"
-        + " -extra-arg=-I" + getSourceDir(this) + "/contracts/musl/upstream/include"
-        + " -extra-arg=-I" + getSourceDir(this) + "/contracts"
-        + " -extra-arg=-I" + sourcePath.string();
+      vector<bfs::path> includeDirs = {
+        bfs::path(getEOSIO_BOOST_INCLUDE_DIR(this)),
+        bfs::path(getSourceDir(this) + "/externals/magic_get/include"),
+        bfs::path(getSourceDir(this) + "/contracts/libc++/upstream/include"),
+        bfs::path(getSourceDir(this) + "/contracts/musl/upstream/include"),
+        bfs::path(getSourceDir(this) + "/contracts"),
+        sourcePath
+      };
 
       if(!include_dir.empty())
       {
         vector<string> include_dirs;
         boost::split(include_dirs, include_dir, boost::algorithm::is_any_of(","));
         for (string dir : include_dirs) {
-          command_line += " -extra-arg=-I" + dir;
+          includeDirs.push_back(bfs::path(dir));
         }
       }
 
-      command_line = command_line
-        + " -extra-arg=-fparse-all-comments"
+      string abigen = getSourceDir(this) 
+        + "/build/programs/eosio-abigen/eosio-abigen";
+      string flags = 
+        " -extra-arg=-c -extra-arg=--std=c++14 -extra-arg=--target=wasm32"
+        " -extra-arg=-nostdinc -extra-arg=-nostdinc++ -extra-arg=-DABIGEN";
+      for(const bfs::path& dir : includeDirs) {
+        flags += " -extra-arg=-I" + dir.string();
+      }
+      flags += " -extra-arg=-fparse-all-comments";
+
+      string command_line = abigen + flags
         + " -destination-file=" + target_path.string()
         + " -verbose=0"
         + " -context=" + sourcePath.string()
@@ -267,12 +351,45 @@ namespace teos {
       
       //cout << command_line << endl;
 
-      if(process(command_line, this)){
+      // The ABI depends only on the abigen binary, the flags, and the 
+      // content of the sources: if they match, the cached ABI is used.
+      bfs::path cached;
+      try {
+        string cacheDir = getCacheDir(this, "abi");
+        if(!cacheDir.empty()) {
+          cached = bfs::path(cacheDir) / (abiCacheKey(
+            abigen, flags + " -context=" + sourcePath.string(), 
+            types_pth, includeDirs) + ".abi");
+        }
+      } catch (std::exception& e) {
+        cached = bfs::path();
+      }
+
+      bool isCached = !cached.empty() && bfs::exists(cached);
+      if(isCached) {
+        try {
+          bfs::copy_file(
+            cached, target_path, bfs::copy_option::overwrite_if_exists);
+        } catch (std::exception& e) {
+          isCached = false;
+        }
+      }
+
+      if(isCached || process(command_line, this)){
         boost::property_tree::ptree abi;
         boost::property_tree::read_json(target_path.string(), abi);
         respJson_.add_child("ABI", abi);
         respJson_.put("output", target_path.string());
+        respJson_.put("cached", isCached);
           //cout << responseToString();        
+
+        if(!isCached && !cached.empty()) {
+          try {
+            bfs::path temp = bfs::unique_path(cached.string() + ".%%%%%%");
+            bfs::copy_file(target_path, temp);
+            bfs::rename(temp, cached);
+          } catch (std::exception& e) {}
+        }
       }
     }
 
@@ -283,17 +400,213 @@ namespace teos {
       boostProcessSystem(command_line);
     }
 
+    ///////////////////////////////////////////////////////////////////////////
+    // systemIncludes
+    // Collects the `#include <...>` directives of a source file, and of the 
+    // contract headers it includes, that are found in the system include dirs.
+    ///////////////////////////////////////////////////////////////////////////
+    void systemIncludes(
+      const boost::filesystem::path& file,
+      const vector<boost::filesystem::path>& systemDirs,
+      set<string>& visited,
+      set<string>& includes)
+    {
+      namespace bfs = boost::filesystem;
+      static const regex include("^\\s*#\\s*include\\s*([<\"])([^>\"]+)[>\"]");
+
+      if(!visited.insert(file.string()).second){
+        return;
+      }
+
+      ifstream in(file.string());
+      string line;
+      smatch match;
+      while(getline(in, line)){
+        if(!regex_search(line, match, include)){
+          continue;
+        }
+        string name = match[2].str();
+        bfs::path local = file.parent_path() / name;
+        if(match[1].str() == "\"" && bfs::is_regular_file(local)){
+          systemIncludes(bfs::canonical(local), systemDirs, visited, includes);
+          continue;
+        }
+        for(const bfs::path& dir : systemDirs){
+          if(bfs::is_regular_file(dir / name)){
+            includes.insert(name);
+            break;
+          }
+        }
+      }
+    }
+
+    ///////////////////////////////////////////////////////////////////////////
+    // precompiledHeader
+    // Returns a precompiled header of the system includes of the sources, 
+    // built if not cached, or an empty string if it cannot be built. The 
+    // cache key covers the clang binary, the flags, the included headers, and 
+    // the stamps of all the system headers they include.
+    ///////////////////////////////////////////////////////////////////////////
+    string precompiledHeader(
+      TeosControl* teosControl,
+      const vector<string>& srcs,
+      const string& clang,
+      const string& flags,
+      const vector<boost::filesystem::path>& systemDirs)
+    {
+      namespace bfs = boost::filesystem;
+      try {
+        set<string> visited;
+        set<string> includes;
+        for(const string& src : srcs){
+          if(bfs::path(src).extension() == ".cpp"){
+            systemIncludes(bfs::canonical(src), systemDirs, visited, includes);
+          }
+        }
+        if(includes.empty()){
+          return "";
+        }
+
+        string prefix;
+        for(const string& name : includes){
+          prefix += "#include <" + name + ">\n";
+        }
+
+        fc::sha256::encoder encoder;
+        string stamp = clang;
+        if(bfs::exists(clang)){
+          stamp += " " + to_string(bfs::file_size(clang))
+            + " " + to_string(bfs::last_write_time(clang));
+        }
+        stamp += "\n" + flags + "\n" + prefix;
+        encoder.write(stamp.data(), stamp.size());
+
+        bfs::path cacheDir(getCacheDir(teosControl, "pch"));
+        if(cacheDir.empty()){
+          return "";
+        }
+        bfs::path prefixFile = bfs::unique_path(
+          cacheDir / "prefix-%%%%%%%%.hpp");
+        {
+          bfs::ofstream ofs(prefixFile);
+          ofs << prefix;
+        }
+
+        set<string> closure;
+        includeClosure(prefixFile, systemDirs, closure);
+        closure.erase(prefixFile.string());
+        for(const string& header : closure){
+          string entry = header + " " + to_string(bfs::file_size(header))
+            + " " + to_string(bfs::last_write_time(header)) + "\n";
+          encoder.write(entry.data(), entry.size());
+        }
+
+        // The prefix header is kept next to the precompiled one, as clang 
+        // validates the files that a precompiled header was built from.
+        string key = encoder.result().str();
+        bfs::path pch = cacheDir / (key + ".pch");
+        bfs::path header = cacheDir / (key + ".hpp");
+        if(bfs::exists(header)){
+          bfs::remove(prefixFile);
+        } else {
+          bfs::rename(prefixFile, header);
+        }
+
+        if(!bfs::exists(pch)){
+          bfs::path temp = bfs::unique_path(pch.string() + ".%%%%%%");
+          TeosControl status;
+          if(!process(clang + flags + " -x c++-header " + header.string()
+              + " -o " + temp.string(), &status) || !bfs::exists(temp)){
+            bfs::remove(temp);
+            return "";
+          }
+          bfs::rename(temp, pch);
+        }
+        return pch.string();
+
+      } catch (std::exception& e) {
+        return "";
+      }
+    }
+
+    ///////////////////////////////////////////////////////////////////////////
+    // runtimeBundle
+    // Returns the runtime libraries merged to a single bitcode file, linked 
+    // once and cached as long as the linker and the libraries do not change, 
+    // or an empty string if it cannot be linked.
+    ///////////////////////////////////////////////////////////////////////////
+    string runtimeBundle(
+      TeosControl* teosControl,
+      const string& llvmLink,
+      const vector<string>& libs)
+    {
+      namespace bfs = boost::filesystem;
+      try {
+        fc::sha256::encoder encoder;
+        vector<string> stamped = { llvmLink };
+        stamped.insert(stamped.end(), libs.begin(), libs.end());
+        for(const string& file : stamped){
+          if(!bfs::exists(file)){
+            return "";
+          }
+          string entry = file + " " + to_string(bfs::file_size(file))
+            + " " + to_string(bfs::last_write_time(file)) + "\n";
+          encoder.write(entry.data(), entry.size());
+        }
+
+        string cacheDir = getCacheDir(teosControl, "runtime");
+        if(cacheDir.empty()){
+          return "";
+        }
+        bfs::path bundle 
+          = bfs::path(cacheDir) / (encoder.result().str() + ".bc");
+        if(!bfs::exists(bundle)){
+          bfs::path temp = bfs::unique_path(bundle.string() + ".%%%%%%");
+          string command_line = llvmLink + " -o " + temp.string();
+          for(const string& lib : libs){
+            command_line += " " + lib;
+          }
+          TeosControl status;
+          if(!process(command_line, &status) || !bfs::exists(temp)){
+            bfs::remove(temp);
+            return "";
+          }
+          bfs::rename(temp, bundle);
+        }
+        return bundle.string();
+
+      } catch (std::exception& e) {
+        return "";
+      }
+    }
+
     /*
     See a basic example of the build procedure: 
       https://gist.github.com/yurydelendik/4eeff8248aeb14ce763e#example.
     */
     void BuildContract::buildContract(
       string src, // comma separated list of source c/cpp files
-      string include_dir // comma separated list of include dirs
+      string include_dir, // comma separated list of include dirs
+      string optimize // "", "size" or "speed"
     )
     {
       namespace bfs = boost::filesystem;
 
+      string wasmOpt;
+      if(!optimize.empty()){
+        if(optimize != "size" && optimize != "speed"){
+          putError("The 'optimize' argument can be 'size' or 'speed', it is: " 
+            + optimize);
+          return;
+        }
+        wasmOpt = getEOSIO_WASM_OPT(this);
+        if(wasmOpt.empty()){
+          putError("Cannot find the binaryen 'wasm-opt' executable, "
+            "set it with the EOSIO_WASM_OPT configuration value.");
+          return;
+        }
+      }
+
       vector<string> srcs = files(src, {".cpp", ".c"});
       if(srcs.empty()){
         putError((boost::format("The source is empty. The imput is:\n%1%\n")
@@ -307,6 +620,39 @@ namespace teos {
       bfs::path workdir;
       bfs::path workdir_build;
 
+      vector<bfs::path> systemDirs = {
+        bfs::path(getEOSIO_BOOST_INCLUDE_DIR(this)),
+        bfs::path(getSourceDir(this) + "/externals/magic_get/include"),
+        bfs::path(getSourceDir(this) + "/contracts/libc++/upstream/include"),
+        bfs::path(getSourceDir(this) + "/contracts/musl/upstream/include"),
+        bfs::path(getSourceDir(this) + "/contracts")
+      };
+
+      string clang = getEOSIO_WASM_CLANG(this);
+      string flags = 
+        " -O3 --std=c++14 --target=wasm32 -nostdinc -nostdlib"
+        " -nostdlibinc -ffreestanding -nostdlib -fno-threadsafe-statics"
+        " -fno-rtti -fno-exceptions";
+      for(const bfs::path& dir : systemDirs) {
+        flags += " -I" + dir.string();
+      }
+
+      // Times of the build stages, in milliseconds.
+      auto stageStart = chrono::steady_clock::now();
+      auto stage = [&](string name) {
+        auto now = chrono::steady_clock::now();
+        respJson_.put("timings." + name, 
+          chrono::duration<double, milli>(now - stageStart).count());
+        stageStart = now;
+      };
+
+      // The system headers are parsed once, to a precompiled header reused 
+      // by all the compilations, as long as the toolchain and the headers 
+      // do not change.
+      string pch = precompiledHeader(this, srcs, clang, flags, systemDirs);
+      respJson_.put("pch", pch);
+      stage("pch");
+
       for (string file : srcs)
       {  
         bfs::path src_file(file);
@@ -333,15 +679,7 @@ namespace teos {
         objectFileList += output.string() + " ";
 
         string command_line;
-        command_line += getEOSIO_WASM_CLANG(this)
-          + " -emit-llvm -O3 --std=c++14 --target=wasm32 -nostdinc -nostdlib"
-          + " -nostdlibinc -ffreestanding -nostdlib -fno-threadsafe-statics"
-          + " -fno-rtti -fno-exceptions"
-          + " -I" + getEOSIO_BOOST_INCLUDE_DIR(this)          
-          + " -I" + getSourceDir(this) + "/externals/magic_get/include"
-          + " -I" + getSourceDir(this) + "/contracts/libc++/upstream/include"
-          + " -I" + getSourceDir(this) + "/contracts/musl/upstream/include"
-          + " -I" + getSourceDir(this) + "/contracts"
+        command_line += clang + " -emit-llvm" + flags
           + " -I" + src_file.parent_path().string();
 
         if(!include_dir.empty())
@@ -358,26 +696,52 @@ namespace teos {
 
         //cout << "command line clang:" << endl << command_line << endl;
 
+        if(!pch.empty() && src_file.extension() == ".cpp") {
+          TeosControl status;
+          if(process(command_line + " -include-pch " + pch, &status)){
+            continue;
+          } // Else, the precompiled header does not fit, compile without.
+        }
+
         if(!process(command_line, this)){
           return;
         }   
       }
 
+      stage("compile");
+
       {
+        // The runtime libraries are merged once, then each contract links 
+        // only the needed part of the merged bundle.
+        vector<string> libs = {
+          getSourceDir(this) + "/build/contracts/musl/libc.bc",
+          getSourceDir(this) + "/build/contracts/libc++/libc++.bc",
+          getSourceDir(this) + "/build/contracts/eosiolib/eosiolib.bc"
+        };
+        string llvmLink = getEOSIO_WASM_LLVM_LINK(this);
+        string bundle = runtimeBundle(this, llvmLink, libs);
+        respJson_.put("runtime", bundle);
+        stage("runtime");
+
         string command_line;
-        command_line += getEOSIO_WASM_LLVM_LINK(this)
+        command_line += llvmLink
           + " -only-needed" 
           + " -o "  + workdir.string() + "/linked.bc"
-          + " " + objectFileList // $workdir/built/* DOES NOT WORK
-          + " " + getSourceDir(this) + "/build/contracts/musl/libc.bc"
-          + " " + getSourceDir(this) + "/build/contracts/libc++/libc++.bc"
-          + " " + getSourceDir(this) + "/build/contracts/eosiolib/eosiolib.bc";
+          + " " + objectFileList; // $workdir/built/* DOES NOT WORK
+        if(bundle.empty()){
+          for(const string& lib : libs){
+            command_line += " " + lib;
+          }
+        } else {
+          command_line += " " + bundle;
+        }
 
         //cout << "command line llvm-link:" << endl << command_line << endl;
 
         if(!process(command_line, this)){
           return;
         }   
+        stage("link");
       }
       
       {
@@ -391,6 +755,7 @@ namespace teos {
         if(!process(command_line, this)){
           return;
         } 
+        stage("llc");
       }
 
       {
@@ -405,12 +770,45 @@ namespace teos {
         if(!process(command_line, this)){
           return;
         } 
+        stage("s2wasm");
       }
       bfs::remove_all(workdir);
 
       ifstream ifs(target_path.string());
       stringstream ss;
       ss << ifs.rdbuf();
+
+      { // Emit also the WASM binary, so that deploys do not assemble it.
+        vector<uint8_t> wasm = teos::command::wastToWasm(ss.str(), this);
+        if(isError_){
+          return;
+        }
+        bfs::path wasm_path = target_path;
+        wasm_path.replace_extension(".wasm");
+        bfs::ofstream ofs(wasm_path, ios::binary);
+        ofs.write((const char*)wasm.data(), wasm.size());
+        ofs.close();
+        respJson_.put("wasm", wasm_path.string());
+        respJson_.put("size", wasm.size());
+        stage("wasm");
+
+        if(!wasmOpt.empty()){
+          bfs::path temp = bfs::unique_path(wasm_path.string() + ".%%%%%%");
+          string command_line = wasmOpt 
+            + (optimize == "size" ? " -Oz" : " -O3")
+            + " " + wasm_path.string()
+            + " -o " + temp.string();
+
+          if(!process(command_line, this) || !bfs::exists(temp)){
+            bfs::remove(temp);
+            return;
+          }
+          bfs::rename(temp, wasm_path);
+          respJson_.put("size_optimized", bfs::file_size(wasm_path));
+          stage("optimize");
+        }
+      }
+
       respJson_.put("WAST", ss.str());
       respJson_.put("output", target_path.string());
     }
@@ -84,6 +84,8 @@ wallet-dir: .
       "EOSIO_CONTRACT_WORKSPACE", CONTRACTS_DIR };// relative to EOSIO_CONTEXT_DIR
 
     arg EOSIO_SHARED_MEMORY_SIZE_MB = { "EOSIO_SHARED_MEMORY_SIZE_MB", "100" };    
+    arg EOSIO_CACHE_DIR = { "EOSIO_CACHE_DIR", "build/cache" };
+      // EOSIO_CACHE_DIR: relative to EOSIO_CONTEXT_DIR
     arg EOSIO_BOOST_INCLUDE_DIR = { "EOSIO_BOOST_INCLUDE_DIR"
       , "${HOME}/opt/boost_1_66_0/include", "/usr/local/include/" };
     arg EOSIO_WASM_CLANG = { "EOSIO_WASM_CLANG"
@@ -95,6 +97,18 @@ wallet-dir: .
     arg EOSIO_WASM_LLC = { "EOSIO_WASM_LLC"
       , "${HOME}/opt/wasm/bin/llc", "/usr/local/wasm/bin/llc" };
       // EOSIO_WASM_LLC: relative to HOME dir
+    arg EOSIO_WASM_OPT = { "EOSIO_WASM_OPT"
+      , "${HOME}/opt/binaryen/bin/wasm-opt", "/usr/local/bin/wasm-opt" };
+      // EOSIO_WASM_OPT: relative to HOME dir; if not found, wasm-opt of the 
+      // EOSIO build of binaryen is used.
+    arg EOSIO_CONNECT_TIMEOUT_MS = { "EOSIO_CONNECT_TIMEOUT_MS", "3000" };
+    arg EOSIO_READ_TIMEOUT_MS = { "EOSIO_READ_TIMEOUT_MS", "30000" };
+    arg EOSIO_READ_RETRIES = { "EOSIO_READ_RETRIES", "3" };
+      // EOSIO_READ_RETRIES: retries of idempotent reads only
+    arg EOSIO_BREAKER_THRESHOLD = { "EOSIO_BREAKER_THRESHOLD", "5" };
+      // EOSIO_BREAKER_THRESHOLD: failed calls that open the circuit, 
+      // 0 disables the circuit breaker
+    arg EOSIO_BREAKER_COOLDOWN_MS = { "EOSIO_BREAKER_COOLDOWN_MS", "10000" };
 
     namespace bfs = boost::filesystem;
 
@@ -347,6 +361,63 @@ wallet-dir: .
       return configValue(nullptr, EOSIO_SHARED_MEMORY_SIZE_MB);
     }        
 
+    ///////////////////////////////////////////////////////////////////////////
+    // getTransportSettings
+    // Values that are not non-negative numbers are replaced with defaults.
+    ///////////////////////////////////////////////////////////////////////////
+    int intConfigValue(TeosControl* teosControl, arg configKey)
+    {
+      try {
+        int value = stoi(configValue(teosControl, configKey));
+        if(value >= 0) {
+          return value;
+        }
+      } catch (std::exception&) {}
+      return stoi(configKey[1]);
+    }
+
+    TransportSettings getTransportSettings(TeosControl* teosControl)
+    {
+      TransportSettings settings;
+      settings.connectTimeoutMs 
+        = intConfigValue(teosControl, EOSIO_CONNECT_TIMEOUT_MS);
+      settings.readTimeoutMs = intConfigValue(teosControl, EOSIO_READ_TIMEOUT_MS);
+      settings.readRetries = intConfigValue(teosControl, EOSIO_READ_RETRIES);
+      settings.breakerThreshold 
+        = intConfigValue(teosControl, EOSIO_BREAKER_THRESHOLD);
+      settings.breakerCooldownMs 
+        = intConfigValue(teosControl, EOSIO_BREAKER_COOLDOWN_MS);
+      return settings;
+    }
+
+    ///////////////////////////////////////////////////////////////////////////
+    // getCacheDir
+    // Is created, if it does not exist. Caches are best-effort: if the 
+    // directory cannot be determined or created, returns an empty string, 
+    // and the error status of the caller is not changed.
+    ///////////////////////////////////////////////////////////////////////////
+    string getCacheDir(TeosControl* teosControl, string subdir)
+    {
+      try
+      {
+        bfs::path wantedPath(configValue(teosControl, EOSIO_CACHE_DIR));
+        if(!wantedPath.is_absolute()){
+          string contextDir = configValue(teosControl, EOSIO_CONTEXT_DIR);
+          if(contextDir.empty()){
+            return "";
+          }
+          wantedPath = bfs::path(contextDir) / wantedPath;
+        }
+        if(!subdir.empty()){
+          wantedPath /= subdir;
+        }
+        bfs::create_directories(wantedPath);
+        return wantedPath.string();
+
+      } catch (std::exception&) {}
+      return "";
+    }
+
     ///////////////////////////////////////////////////////////////////////////
     // getHttpServerAddress
     ///////////////////////////////////////////////////////////////////////////
@@ -546,6 +617,19 @@ wallet-dir: .
       return getValidPath(teosControl, EOSIO_WASM_LLC, "");       
     }    
 
+    ///////////////////////////////////////////////////////////////////////////
+    // getEOSIO_WASM_OPT
+    ///////////////////////////////////////////////////////////////////////////
+    string getEOSIO_WASM_OPT(TeosControl* teosControl){
+      string wasmOpt = getValidPath(teosControl, EOSIO_WASM_OPT, "");
+      if(!wasmOpt.empty()){
+        return wasmOpt;
+      }
+      bfs::path built = bfs::path(configValue(teosControl, EOSIO_SOURCE_DIR))
+        / "build/externals/binaryen/bin/wasm-opt";
+      return bfs::exists(built) ? built.string() : "";
+    }    
+
     GetConfig::GetConfig(){
         respJson_.put("contextDir", getContextDir(this));
         respJson_.put("sourceDir", getSourceDir(this));
@@ -565,7 +649,15 @@ wallet-dir: .
         respJson_.put("boostInclude", getEOSIO_BOOST_INCLUDE_DIR(this));
         respJson_.put("wasmLink", getEOSIO_WASM_LLVM_LINK(this));
         respJson_.put("wasmLlc", getEOSIO_WASM_LLC(this));
+        respJson_.put("wasmOpt", getEOSIO_WASM_OPT(this));
         respJson_.put("sharedMemory", getSharedMemorySizeMb());
+        respJson_.put("cacheDir", getCacheDir(this));
+        TransportSettings transport = getTransportSettings(this);
+        respJson_.put("connectTimeoutMs", transport.connectTimeoutMs);
+        respJson_.put("readTimeoutMs", transport.readTimeoutMs);
+        respJson_.put("readRetries", transport.readRetries);
+        respJson_.put("breakerThreshold", transport.breakerThreshold);
+        respJson_.put("breakerCooldownMs", transport.breakerCooldownMs);
         respJson_.put(
           "contractWorkspace", configValue(this, EOSIO_CONTRACT_WORKSPACE));
         respJson_.put(
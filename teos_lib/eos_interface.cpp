@@ -1,3 +1,5 @@
+#include <map>
+
 #include <boost/property_tree/ptree.hpp>
 #include <boost/property_tree/json_parser.hpp>
 #include <boost/range/algorithm/find_if.hpp>
@@ -13,6 +15,8 @@
 #include <fc/exception/exception.hpp>
 #include <eosio/utilities/key_conversion.hpp>
 #include <fc/io/fstream.hpp>
+#include <fc/crypto/hex.hpp>
+#include <fc/crypto/sha256.hpp>
 #include <eosio/chain_plugin/chain_plugin.hpp>
 #include <eosio/chain/wast_to_wasm.hpp>
 
@@ -97,7 +101,39 @@ namespace teos {
       return kp.privateKey;
     }
 
-    string KeyPair::prk = KeyPair::privateK();
+    const string& KeyPair::prk() {
+      static const string key = KeyPair::privateK();
+      return key;
+    }
+
+    string TransactionContext::refBlockId = "";
+    string TransactionContext::refBlockTime = "";
+    string TransactionContext::chainId = "";
+    vector<string> TransactionContext::requiredKeys = {};
+    vector<string> TransactionContext::signingKeys = {};
+
+    void TransactionContext::read(const ptree& reqJson) {
+      refBlockId = reqJson.get<string>("ref-block-id", "");
+      refBlockTime = reqJson.get<string>("ref-block-time", "");
+      chainId = reqJson.get<string>("chain-id", "");
+
+      requiredKeys.clear();
+      string keys = reqJson.get<string>("required-keys", "");
+      if(!keys.empty()) {
+        boost::split(requiredKeys, keys, boost::algorithm::is_any_of(","));
+      }
+
+      signingKeys.clear();
+      if(reqJson.get<bool>("local-sign", false)) {
+        string privateKeys;
+        getline(cin, privateKeys);
+        boost::trim(privateKeys);
+        if(!privateKeys.empty()) {
+          boost::split(
+            signingKeys, privateKeys, boost::algorithm::is_any_of(","));
+        }
+      }
+    }
 
 #define CODE_PATH boost::str(boost::format("%1% (%2% [%3%]) ") \
   % __func__ % __FILE__ % __LINE__)
@@ -169,8 +205,90 @@ namespace teos {
 
     using namespace teos::command;
 
+    CallChain /*void*/ sign_transaction_with_wallet(
+      chain::signed_transaction& trx, const chain_id_type& chainId);
+
+    /**
+     * Signs with the keys passed with the transaction context, what does not 
+     * need the wallet. Keys that are not known, if any, are signed with by 
+     * the wallet.
+     */
+    CallChain /*void*/ sign_transaction_locally(
+      chain::signed_transaction& trx, const chain_id_type& chainId)
+    {
+      map<string, private_key_type> localKeys;
+      for(const string& key : TransactionContext::signingKeys) {
+        private_key_type privateKey(key);
+        localKeys[string(privateKey.get_public_key())] = privateKey;
+      }
+
+      vector<string> requiredKeys = TransactionContext::requiredKeys;
+      if(requiredKeys.empty()) {
+        fc::variants available_keys;
+        for(const auto& localKey : localKeys) {
+          available_keys.push_back(fc::variant(localKey.first));
+        }
+        auto get_arg = fc::mutable_variant_object
+              ("transaction", (transaction)trx)
+              ("available_keys", available_keys);
+        CallChain callRequiredKeys(get_required_keys, get_arg);
+        if(callRequiredKeys.isError_){
+          // Local keys are not sufficient: the wallet has to sign.
+          return sign_transaction_with_wallet(trx, chainId);
+        }
+        for(const auto& key 
+            : callRequiredKeys.fcVariant_["required_keys"].get_array()) {
+          requiredKeys.push_back(key.as_string());
+        }
+      }
+
+      vector<string> walletKeys;
+      for(const string& key : requiredKeys) {
+        auto localKey = localKeys.find(key);
+        if(localKey != localKeys.end()) {
+          trx.sign(localKey->second, chainId);
+        } else {
+          walletKeys.push_back(key);
+        }
+      }
+
+      if(!walletKeys.empty()) {
+        fc::variants keys;
+        for(const string& key : walletKeys) {
+          keys.push_back(fc::variant(key));
+        }
+        fc::variants sign_args = {
+          fc::variant(trx), fc::variant(keys), fc::variant(chainId)};
+        return CallChain(wallet_sign_trx, sign_args);
+      }
+      return CallChain(fc::variant(trx));
+    }
+
     CallChain /*void*/ sign_transaction(chain::signed_transaction& trx)
     {
+      chain_id_type chainId = TransactionContext::chainId.empty()
+        ? chain_id_type{} : chain_id_type(TransactionContext::chainId);
+
+      if(!TransactionContext::signingKeys.empty()) {
+        return sign_transaction_locally(trx, chainId);
+      }
+      return sign_transaction_with_wallet(trx, chainId);
+    }
+
+    CallChain /*void*/ sign_transaction_with_wallet(
+      chain::signed_transaction& trx, const chain_id_type& chainId)
+    {
+      if(!TransactionContext::requiredKeys.empty()) {
+        // Required keys are known, no need to ask the wallet and the node.
+        fc::variants keys;
+        for(const string& key : TransactionContext::requiredKeys) {
+          keys.push_back(fc::variant(key));
+        }
+        fc::variants sign_args = {
+          fc::variant(trx), fc::variant(keys), fc::variant(chainId)};
+        return CallChain(wallet_sign_trx, sign_args);
+      }
+
       // TODO better error checking
       /*
       const auto& public_keys = call(
@@ -192,9 +310,8 @@ namespace teos {
         return callRequiredKeys;
       }
       const auto& required_keys = callRequiredKeys.fcVariant_;
-      // TODO determine chain id
       fc::variants sign_args = {fc::variant(trx), required_keys["required_keys"]
-        , fc::variant(chain_id_type{})};
+        , fc::variant(chainId)};
       /*
       const auto& signed_trx = call(
         wallet_host, wallet_port, wallet_sign_trx, sign_args);
@@ -230,18 +347,27 @@ namespace teos {
       packed_transaction::compression_type compression 
         = packed_transaction::none)     
     {
-      /*
-      auto info = get_info();
-      */ 
-      CallChain callGetInfo(string(getCommandPath + "get_info"));
-      if (callGetInfo.isError_) {
-        return callGetInfo;
-      }
+      if(!TransactionContext::refBlockId.empty()) {
+        // The reference block is known, no need to ask the node.
+        trx.expiration 
+          = fc::time_point::from_iso_string(TransactionContext::refBlockTime)
+            + fc::seconds(expirationSec);
+        trx.set_reference_block(
+          block_id_type(TransactionContext::refBlockId));
+      } else {
+        /*
+        auto info = get_info();
+        */ 
+        CallChain callGetInfo(string(getCommandPath + "get_info"));
+        if (callGetInfo.isError_) {
+          return callGetInfo;
+        }
 
-      auto info 
-        = callGetInfo.fcVariant_.as<chain_apis::read_only::get_info_results>();
-      trx.expiration = info.head_block_time + fc::seconds(expirationSec);
-      trx.set_reference_block(info.head_block_id);
+        auto info 
+          = callGetInfo.fcVariant_.as<chain_apis::read_only::get_info_results>();
+        trx.expiration = info.head_block_time + fc::seconds(expirationSec);
+        trx.set_reference_block(info.head_block_id);
+      }
 
       if (tx_force_unique) {
          trx.context_free_actions.emplace_back( generate_nonce() );
@@ -411,13 +537,64 @@ namespace teos {
       };
     }
 
+    vector<uint8_t> wastToWasm(const string& wast, TeosControl* teosControl)
+    {
+      const string binary_wasm_header = "\x00\x61\x73\x6d";
+      if(wast.compare(0, 4, binary_wasm_header) == 0) {
+        // Using already assembled WASM
+        return vector<uint8_t>(wast.begin(), wast.end());
+      }
+
+      // The cache is best-effort: its failures fall back to assembling.
+      string cacheDir = teos::control::getCacheDir(teosControl, "wasm");
+      path cached = path(cacheDir) / (fc::sha256::hash(wast).str() + ".wasm");
+      if(!cacheDir.empty()) {
+        try {
+          if(exists(cached)) {
+            string wasm;
+            fc::read_file_contents(cached.string(), wasm);
+            return vector<uint8_t>(wasm.begin(), wasm.end());
+          }
+        } catch(...) {}
+      }
+
+      vector<uint8_t> wasm;
+      try {
+        // Assembling WASM...
+        wasm = wast_to_wasm(wast);
+      } catch(fc::exception& e) {
+        teosControl->putError(e.to_detail_string(), CODE_PATH);
+        return wasm;
+      }
+
+      if(!cacheDir.empty()) {
+        path temp;
+        try {
+          temp = unique_path(cached.string() + ".%%%%%%");
+          std::ofstream out(temp.string(), std::ios::binary);
+          out.write((const char*)wasm.data(), wasm.size());
+          out.close();
+          if(out) {
+            rename(temp, cached);
+          } else {
+            remove(temp);
+          }
+        } catch(...) {
+          boost::system::error_code ec;
+          remove(temp, ec);
+        }
+      }
+      return wasm;
+    }
+
     TeosCommand setContract(
         string account,
         string contractDir,
         string wastFile, string abiFile,
         string permission, unsigned expiration,
         bool skipSignature, bool dontBroadcast, bool forceUnique,
-        unsigned maxCpuUsage, unsigned maxNetUsage)
+        unsigned maxCpuUsage, unsigned maxNetUsage,
+        bool compress)
     {    
 
       vector<string> permissions = {};
@@ -440,6 +617,17 @@ namespace teos {
         } 
       }
 
+      if(wastFile.empty()) 
+      { // Prefer the WASM emitted by the build, if it is not outdated.
+        TeosCommand status;
+        string wasmPath = teos::control::getContractFile(
+              &status, contractDir, ".wasm");
+        if (!status.isError_ 
+          && last_write_time(wasmPath) >= last_write_time(wastPath)) {
+          wastPath = wasmPath;
+        }
+      }
+
       string abiPath;
       {
         TeosCommand status;
@@ -455,14 +643,13 @@ namespace teos {
       fc::read_file_contents(wastPath, wast);
       //FC_ASSERT( !wast.empty(), "no wast file found ${f}", ("f", wastPath) );      
       vector<uint8_t> wasm;
-      const string binary_wasm_header = "\x00\x61\x73\x6d";
-      if(wast.compare(0, 4, binary_wasm_header) == 0) {
-        // Using already assembled WASM
-        wasm = vector<uint8_t>(wast.begin(), wast.end());
-      } else {
-        // Assembling WASM...
-        wasm = wast_to_wasm(wast);
-      } 
+      {
+        TeosCommand status;
+        wasm = wastToWasm(wast, &status);
+        if (status.isError_) {
+          return status;
+        }
+      }
 
       vector<chain::action> actions;
       actions.emplace_back( create_setcode(
@@ -485,7 +672,9 @@ namespace teos {
           maxCpuUsage,
           maxNetUsage,
         10000,
-        packed_transaction::zlib)/*.fcVariant_*/;
+        compress 
+          ? packed_transaction::zlib 
+          : packed_transaction::none)/*.fcVariant_*/;
     }
 
     TeosCommand getCode(string accountName, string wastFile, string abiFile) 
@@ -531,7 +720,8 @@ namespace teos {
         string permission, unsigned expiration,
         bool skipSignature, bool dontBroadcast, bool forceUnique,
         unsigned maxCpuUsage,
-        unsigned maxNetUsage
+        unsigned maxNetUsage,
+        string binArgs
         )
     {
       vector<string> permissions = {};
@@ -542,23 +732,30 @@ namespace teos {
         }        
       }
 
-      fc::variant action_args_var;
-      //try {
-      action_args_var = fc::json::from_string(data);
-      //} EOS_CAPTURE_AND_RETHROW(action_type_exception, "Fail to parse action JSON")
-
-      auto arg= fc::mutable_variant_object
-                ("code", contract)
-                ("action", action)
-                ("args", action_args_var);
-      /*
-      auto result = call(json_to_bin_func, arg);
-      */
-      CallChain callJson(json_to_bin_func, fc::variant(arg));
-      if(callJson.isError_){
-        return callJson;
+      bytes actionData;
+      if(!binArgs.empty()) {
+        // Action data serialized by the caller, no need to call the node.
+        actionData = bytes(binArgs.size() / 2);
+        fc::from_hex(binArgs, actionData.data(), actionData.size());
+      } else {
+        fc::variant action_args_var;
+        //try {
+        action_args_var = fc::json::from_string(data);
+        //} EOS_CAPTURE_AND_RETHROW(action_type_exception, "Fail to parse action JSON")
+
+        auto arg= fc::mutable_variant_object
+                  ("code", contract)
+                  ("action", action)
+                  ("args", action_args_var);
+        /*
+        auto result = call(json_to_bin_func, arg);
+        */
+        CallChain callJson(json_to_bin_func, fc::variant(arg));
+        if(callJson.isError_){
+          return callJson;
+        }
+        actionData = callJson.fcVariant_.get_object()["binargs"].as<bytes>();
       }
-      auto result = callJson.fcVariant_;
       auto accountPermissions = get_account_permissions(permissions);
 
       return send_actions(
@@ -566,7 +763,7 @@ namespace teos {
             chain::action
             { 
               accountPermissions, 
-              contract, action, result.get_object()["binargs"].as<bytes>()
+              contract, action, actionData
             }
           },
             expiration, skipSignature, dontBroadcast, forceUnique,
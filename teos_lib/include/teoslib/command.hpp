@@ -31,6 +31,8 @@ namespace teos
     virtual string normRequest(ptree& reqJson);
     virtual void normResponse(string response, ptree &respJson);
     virtual bool isWalletCommand() { return path_.find(walletCommandPath) != std::string::npos; };
+    // Reads, that may be retried if the call fails:
+    virtual bool isIdempotent();
 
   public:
     static string httpAddress;
@@ -60,16 +62,14 @@ namespace teos
       namespace control = teos::control;
       
       options_description od("");
+      // Empty defaults are resolved from the configuration by `callEosd`,
+      // when needed, not while options are being described.
       od.add_options()
         ("address,a", value<string>(&(TeosCommand::httpAddress))
-            ->default_value(TeosCommand::httpAddress.empty() 
-          ? teos::control::getHttpWalletAddress(nullptr)
-          : TeosCommand::httpAddress),
+            ->default_value(TeosCommand::httpAddress),
           "The http address (host:port) of the EOSIO daemon.")
         ("wallet,w", value<string>(&(TeosCommand::httpWalletAddress))
-            ->default_value(TeosCommand::httpWalletAddress.empty()
-          ? teos::control::getHttpWalletAddress(nullptr)
-          : TeosCommand::httpWalletAddress),
+            ->default_value(TeosCommand::httpWalletAddress),
         "The http address (host:port) where eos-wallet is running.");
       od.add(ControlOptions::groupOptionDescription());
       return od;
@@ -45,6 +45,7 @@ namespace teos
 
       CreateAccount(ptree reqJson) : TeosCommand("", reqJson)
       {
+        TransactionContext::read(reqJson_);
         copy(createAccount(
           reqJson_.get<string>("creator"), reqJson_.get<string>("name"),
           reqJson_.get<string>("ownerKey"), reqJson_.get<string>("activeKey"),
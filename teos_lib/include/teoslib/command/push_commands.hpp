@@ -41,6 +41,7 @@ namespace teos
 
       PushAction(ptree reqJson) : TeosCommand("", reqJson)
       {
+        TransactionContext::read(reqJson_);
         copy(pushAction(
           reqJson_.get<string>("contract"), 
           reqJson_.get<string>("action"), 
@@ -51,7 +52,8 @@ namespace teos
           reqJson_.get<bool>("dont-broadcast"),
           reqJson_.get<bool>("force-unique"),
           reqJson_.get<unsigned>("max-cpu-usage"),
-          reqJson_.get<unsigned>("max-net-usage")
+          reqJson_.get<unsigned>("max-net-usage"),
+          reqJson_.get<string>("binargs", "")
           ));
       }
     };
@@ -82,7 +84,8 @@ Usage: ./teos create key --jarg '{
   "dont-broadcast":<true|false>,
   "force-unique":<true|false>,
   "max-cpu-usage":"<max cpu usage>",
-  "max-net-usage":"<max net usage>"
+  "max-net-usage":"<max net usage>",
+  "binargs":"<hex of serialized data, if set, 'data' is not converted>"
   }' [OPTIONS]
 )";
       }
@@ -39,6 +39,7 @@ namespace teos
 
       SetContract(ptree reqJson) : TeosCommand("", reqJson)
       {
+        TransactionContext::read(reqJson_);
         copy(setContract(
           reqJson.get<string>("account"),
           reqJson.get<string>("contract-dir"),
@@ -49,7 +50,8 @@ namespace teos
           reqJson.get<bool>("dont-broadcast"),
           reqJson.get<bool>("force-unique"),
           reqJson.get<unsigned>("max-cpu-usage"),
-          reqJson.get<unsigned>("max-net-usage")
+          reqJson.get<unsigned>("max-net-usage"),
+          reqJson.get<bool>("compress", true)
           ));
       }
     };
@@ -80,7 +82,8 @@ Usage: ./teos [http address] create key --jarg '{
   "dont-broadcast":<true|false>,
   "force-unique":<true|false>,
   "max-cpu-usage":"<max cpu usage>",
-  "max-net-usage":"<max net usage>"
+  "max-net-usage":"<max net usage>",
+  "compress":<true|false, zlib compression of the transaction, default true>
   }' [OPTIONS]
 )";
       }
@@ -13,6 +13,7 @@
 #include <stdlib.h>
 #include <string>
 #include <iostream>
+#include <chrono>
 
 #include <boost/property_tree/ptree.hpp>
 #include <boost/date_time/posix_time/posix_time.hpp>
@@ -48,6 +49,22 @@ namespace teos
   extern boost::format output(string label, string format);
   extern ostream& sharp();
 
+  /**
+   * @brief Times of the startup phases of the `teos` process.
+   *
+   * Reported with the `--startup-profile` switch.
+   */
+  class StartupProfile
+  {
+  public:
+    static bool isOn;
+    static double staticInitMs;
+    static double optionParseMs;
+    static double configLoadMs;
+    static int configReads;
+    static void report();
+  };
+
   class TeosControl
   {
   public:
@@ -188,6 +205,7 @@ namespace teos
       using namespace boost::program_options;
 
       options_description desc("Options");      
+      auto start = std::chrono::steady_clock::now();
       try {
         desc.add(argumentDescription()).add(groupOptionDescription())
           .add(basicOptionDescription());
@@ -201,6 +219,10 @@ namespace teos
         store(parsed_options, vm);
         notify(vm);
 
+        StartupProfile::optionParseMs = 
+          std::chrono::duration<double, std::milli>(
+            std::chrono::steady_clock::now() - start).count();
+
         if (vm.count("help")) {
           cout << formatUsage(getUsage()) << endl;
           cout << desc << endl;
@@ -8,29 +8,40 @@ using namespace std;
 namespace teos {
   namespace control {
     /**
-     * Builds a contract: produces the WAST file.
+     * Builds a contract: produces the WAST file, and the WASM file next to it.
+     * 
+     * The system headers included by the sources are precompiled once, and
+     * cached in the 'pch' cache dir. The runtime libraries are merged to a 
+     * bitcode bundle once, and cached in the 'runtime' cache dir. Times of 
+     * the build stages are reported in 'timings'.
+     * 
+     * If 'optimize' is "size" or "speed", the WASM file is optimized with the 
+     * binaryen wasm-opt, and its sizes before and after are reported.
      */
     class BuildContract : public TeosControl
     {
       void buildContract(
         string src, // comma separated list of source c/cpp files
-        string include_dir = "" // comma separated list of include dirs
+        string include_dir = "", // comma separated list of include dirs
+        string optimize = "" // "", "size" or "speed"
       );
 
     public:
       BuildContract(
         string src, // comma separated list of source c/cpp files
-        string include_dir = ""
+        string include_dir = "",
+        string optimize = ""
       )
       {
-        buildContract(src, include_dir);
+        buildContract(src, include_dir, optimize);
       }
 
       BuildContract(ptree reqJson) : TeosControl(reqJson)
       {
         buildContract(
           reqJson_.get<string>("src"), 
-          reqJson_.get<string>("include_dir")
+          reqJson_.get<string>("include_dir"),
+          reqJson_.get<string>("optimize", "")
         );
       }
     };
@@ -52,7 +63,8 @@ Usage: ./teos build contract src wast_file [Options]
 Usage: ./teos create key --jarg '{
   "src":"<comma separated list of c/c++ files>",
   "wast_file":<>,
-  "include_dir":"<comma separated list of include dirs>"
+  "include_dir":"<comma separated list of include dirs>",
+  "optimize":"<empty, size or speed>"
   }' [OPTIONS]
 )";
       }
@@ -60,6 +72,7 @@ Usage: ./teos create key --jarg '{
       string src;
       string wast_file;
       string include_dir;
+      string optimize;
 
       options_description  argumentDescription() {
         options_description od("");
@@ -69,7 +82,9 @@ Usage: ./teos create key --jarg '{
           ("wast_file,o", value<string>(&wast_file)->default_value("")
             , "Target wast file.")
           ("include_dir,d", value<string>(&include_dir)->default_value("")
-            , "Comma separated list of source c/c++ files.");
+            , "Comma separated list of source c/c++ files.")
+          ("optimize,O", value<string>(&optimize)->default_value("")
+            , "Optimize the WASM file for 'size' or 'speed'.");
             
         return od;
       }
@@ -85,6 +100,7 @@ Usage: ./teos create key --jarg '{
           reqJson_.put("src", src);
           reqJson_.put("wast_file", wast_file);
           reqJson_.put("include_dir", include_dir);
+          reqJson_.put("optimize", optimize);
         }
         return ok;
       }
@@ -95,12 +111,26 @@ Usage: ./teos create key --jarg '{
 
       void printout(TeosControl command, variables_map &vm) {
         output("WAST", "%s", GET_STRING(command, "output"));
+        if(command.respJson_.count("size_optimized")) {
+          output("WASM size", "%s -> %s bytes", 
+            GET_STRING(command, "size"), 
+            GET_STRING(command, "size_optimized"));
+        }
+        for(auto& timing : command.respJson_.get_child(
+            "timings", boost::property_tree::ptree())) {
+          output(timing.first.c_str(), "%s ms", 
+            timing.second.data().c_str());
+        }
       }    
     };
 
 
     /**
      * Generates abi: produces the ABI file.
+     * 
+     * ABI files are cached in the 'abi' cache dir, keyed by the abigen binary,
+     * the flags, and the content of the types source and its include closure;
+     * if cached, abigen is not started.
      */
     class GenerateAbi : public TeosControl
     {
@@ -189,7 +219,9 @@ Usage: ./teos create key --jarg '{
       }
 
       void printout(TeosControl command, variables_map &vm) {
-        output("ABI", "%s", GET_STRING(command, "output"));
+        output("ABI", "%s%s", GET_STRING(command, "output"), 
+          command.respJson_.get<string>("cached", "false") == "true" 
+            ? " (cached)" : "");
       }        
     };
 
@@ -47,8 +47,27 @@ namespace teos {
 
     string getEOSIO_WASM_LLC(TeosControl* teosControl);
 
+    string getEOSIO_WASM_OPT(TeosControl* teosControl);
+
     string getSharedMemorySizeMb();
 
+    /*
+     * Deadlines, retries and circuit breaker of the calls to the EOSIO
+     * daemon and the wallet:
+     */
+    struct TransportSettings
+    {
+      int connectTimeoutMs;
+      int readTimeoutMs;
+      int readRetries;
+      int breakerThreshold;
+      int breakerCooldownMs;
+    };
+
+    TransportSettings getTransportSettings(TeosControl* teosControl);
+
+    string getCacheDir(TeosControl* teosControl, string subdir = "");
+
     class GetConfig : public TeosControl
     {
     public:
@@ -2,6 +2,7 @@
 
 #include <stdlib.h>
 #include <string>
+#include <vector>
 
 #include <teoslib/command.hpp>
 
@@ -14,12 +15,42 @@ namespace teos{
 
     public:
       static string privateK();
-      static string prk;
+      /**
+       * @brief A private key generated at the first call, not at startup.
+       */
+      static const string& prk();
       string privateKey;
       string publicKey;
       KeyPair();
     };
 
+    /**
+     * @brief Transaction data known to the caller.
+     *
+     * If set, the reference block and the required keys are not queried
+     * from the node, when a transaction is built.
+     */
+    class TransactionContext {
+    public:
+      static string refBlockId;
+      static string refBlockTime;
+      static string chainId;
+      static vector<string> requiredKeys;
+      static vector<string> signingKeys;
+
+      /**
+       * @brief Reads the context from a json argument.
+       *
+       * @param reqJson json tree argument: {"ref-block-id":"<block id>", 
+       * "ref-block-time":"<block time>", "chain-id":"<chain id>",
+       * "required-keys":"<comma separated list of public keys>",
+       * "local-sign":<true|false>}, all entries optional. If "local-sign" 
+       * is set, a comma separated list of private keys is read from stdin,
+       * and these keys sign transactions without the wallet.
+       */
+      static void read(const ptree& reqJson);
+    };
+
 
   TeosCommand createAccount(
     string creator, string name,
@@ -42,7 +73,20 @@ namespace teos{
     bool dontBroadcast = false,
     bool forceUnique = false,
     unsigned maxCpuUsage = 0,
-    unsigned maxNetUsage = 0); 
+    unsigned maxNetUsage = 0,
+    bool compress = true); 
+
+  /**
+   * @brief Assembles WAST text into WASM binary.
+   *
+   * Results are cached in the cache directory, keyed by the hash of the WAST
+   * text. Binary WASM input is returned as it is.
+   *
+   * @param wast WAST text or WASM binary.
+   * @param teosControl error sink.
+   * @return WASM binary, empty on error.
+   */
+  vector<uint8_t> wastToWasm(const string& wast, TeosControl* teosControl);
   
   TeosCommand pushAction(
     string contract, string action, string data,
@@ -52,7 +96,8 @@ namespace teos{
     bool dontBroadcast = false,
     bool forceUnique = false,
     unsigned maxCpuUsage = 0,
-    unsigned maxNetUsage = 0); 
+    unsigned maxNetUsage = 0,
+    string binArgs = ""); 
 
   TeosCommand getCode(
     string accountName, string wastFile, string abiFile);    
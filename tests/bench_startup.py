@@ -0,0 +1,40 @@
+# python3 ./tests/bench_startup.py
+
+import os
+import sys
+import time
+import subprocess
+
+PYTEOS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pyteos")
+REPEAT = 10
+
+def measure(statement):
+    env = dict(os.environ, PYTHONPATH=PYTEOS_DIR)
+    times = []
+    for i in range(REPEAT):
+        start = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, "-c", statement],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+        times.append(time.perf_counter() - start)
+        if process.returncode:
+            print(process.stderr.decode("utf-8"))
+            return
+    times.sort()
+    print("{:<40} best: {:6.1f} ms, median: {:6.1f} ms, output: {} bytes"
+        .format(statement, 1000 * times[0], 1000 * times[len(times) // 2],
+            len(process.stdout)))
+
+def run():
+    print('interpreter start:')
+    measure("pass")
+
+    print('import modules:')
+    for module in ["pyteos", "eosf", "node", "sess"]:
+        measure("import " + module)
+
+    print('first use of the setup:')
+    measure("import pyteos; pyteos.setup.teos_exe")
+
+if __name__ == "__main__":
+    run()
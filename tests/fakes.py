@@ -0,0 +1,95 @@
+# Fakes of `teos` processes, shared by the unit tests.
+
+import os
+import sys
+import json
+import types
+import threading
+from unittest import mock
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "pyteos"))
+
+import pyteos
+
+
+class Call:
+    """ A call of `teos`.
+
+    - **attributes**::
+
+        args: The command line.
+        command: The command, for example "get".
+        subcommand: The subcommand, for example "block".
+        jarg: The json argument, decoded.
+        address: The node address, "" if not given.
+        input: The standard input, `None` if not given.
+    """
+    def __init__(self, cl, input=None):
+        self.args = cl
+        self.command = cl[1]
+        self.subcommand = cl[2]
+        try:
+            self.jarg = json.loads(cl[4])
+        except ValueError:
+            self.jarg = {}
+        self.address = cl[cl.index("--address") + 1] \
+            if "--address" in cl else ""
+        self.input = input
+
+    def __repr__(self):
+        return "{} {} {}".format(self.command, self.subcommand, self.jarg)
+
+
+class FakeTeos:
+    """ Stands for `teos` processes, replacing `subprocess.run`.
+
+    Each call is recorded, and answered with `respond(call)`, that returns
+    a json object, or an error message starting with "ERROR".
+
+    - **parameters**::
+
+        respond: A callable that takes a `Call`.
+        out: The standard output of successful calls.
+
+    - **attributes**::
+
+        calls: The recorded calls.
+    """
+    def __init__(self, respond, out=""):
+        self.respond = respond
+        self.out = out
+        self.calls = []
+        self.__lock = threading.Lock()
+
+    def __call__(self, cl, input=None, **kwargs):
+        call = Call(cl, input)
+        with self.__lock:
+            self.calls.append(call)
+        response = self.respond(call)
+        if isinstance(response, str):
+            return types.SimpleNamespace(stdout=response.encode(), stderr=b"")
+        return types.SimpleNamespace(stdout=self.out.encode(),
+            stderr=json.dumps(response).encode())
+
+    def subcommands(self):
+        """ Returns the subcommands of the recorded calls.
+        """
+        return [call.subcommand for call in self.calls]
+
+
+def patch(test, target, new):
+    """ Replaces `target`, a dotted path, with `new`, until the end of the
+    test.
+    """
+    patcher = mock.patch(target, new)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+    return new
+
+
+def fake_teos(test, respond, out=""):
+    """ Replaces `teos` with a `FakeTeos` until the end of the test.
+    """
+    patch(test, "pyteos.setup", types.SimpleNamespace(teos_exe="teos"))
+    return patch(test, "subprocess.run", FakeTeos(respond, out))
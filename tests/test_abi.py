@@ -0,0 +1,185 @@
+# python3 ./tests/test_abi.py
+
+import os
+import re
+import sys
+import struct
+import unittest
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "pyteos"))
+
+import pyteos
+import abi
+from fakes import fake_teos
+
+ABI = {
+    "types": [{"new_type_name": "account", "type": "name"}],
+    "structs": [
+        {"name": "base", "base": "", "fields": [
+            {"name": "owner", "type": "account"}]},
+        {"name": "transfer", "base": "base", "fields": [
+            {"name": "to", "type": "name"},
+            {"name": "quantity", "type": "asset"},
+            {"name": "memo", "type": "string"},
+            {"name": "tag", "type": "uint32?"}]},
+        {"name": "orphan", "base": "missing", "fields": []}],
+    "actions": [{"name": "transfer", "type": "transfer"}],
+    "tables": [{"name": "accounts", "type": "transfer",
+        "key_names": ["owner"]}]
+    }
+
+
+class TestEncodings(unittest.TestCase):
+
+    def test_name_to_int(self):
+        self.assertEqual(abi.name_to_int("eosio"), 6138663577826885632)
+        self.assertEqual(abi.name_to_int("eosio.token"), 6138663591592764928)
+        self.assertEqual(abi.name_to_int(""), 0)
+        with self.assertRaises(abi.AbiError):
+            abi.name_to_int("Upper")
+        with self.assertRaises(abi.AbiError):
+            abi.name_to_int("a" * 14)
+
+    def test_varint(self):
+        serializer = abi.Serializer({})
+        self.assertEqual(serializer.serialize("varuint32", 300), b"\xac\x02")
+        self.assertEqual(serializer.serialize("varuint32", 0), b"\x00")
+        self.assertEqual(serializer.serialize("varint32", -1), b"\x01")
+        self.assertEqual(serializer.serialize("varint32", 1), b"\x02")
+
+    def test_asset(self):
+        serializer = abi.Serializer({})
+        symbol = abi.symbol_to_int(4, "EOS")
+        self.assertEqual(symbol,
+            4 | ord("E") << 8 | ord("O") << 16 | ord("S") << 24)
+        self.assertEqual(serializer.serialize("asset", "1.0000 EOS"),
+            struct.pack("<q", 10000) + struct.pack("<Q", symbol))
+        self.assertEqual(serializer.serialize("symbol", "4,EOS"),
+            struct.pack("<Q", symbol))
+        with self.assertRaises(abi.AbiError):
+            serializer.serialize("asset", "1.0000 eos")
+
+    def test_extended_asset(self):
+        serializer = abi.Serializer({})
+        self.assertEqual(serializer.serialize("extended_asset",
+            {"quantity": "1 SYS", "contract": "eosio"}),
+            serializer.serialize("asset", "1 SYS")
+            + struct.pack("<Q", abi.name_to_int("eosio")))
+        with self.assertRaises(abi.AbiError):
+            serializer.serialize("extended_asset", {"quantity": "1 SYS"})
+        with self.assertRaises(abi.AbiError):
+            serializer.serialize("extended_asset", "1 SYS@eosio")
+
+
+class TestSerializer(unittest.TestCase):
+
+    def setUp(self):
+        self.serializer = abi.Serializer(ABI)
+
+    def test_struct(self):
+        data = {"owner": "alice", "to": "bob", "quantity": "1 SYS",
+            "memo": "hi"}
+        self.assertEqual(self.serializer.serialize("transfer", data),
+            struct.pack("<QQ", abi.name_to_int("alice"), abi.name_to_int("bob"))
+            + struct.pack("<qQ", 1, abi.symbol_to_int(0, "SYS"))
+            + b"\x02hi" + b"\x00")
+        self.assertEqual(self.serializer.serialize_action("transfer",
+            dict(data, tag=1))[-10:], "0101000000")
+
+    def test_missing_field(self):
+        with self.assertRaises(abi.AbiError):
+            self.serializer.serialize("transfer", {"owner": "alice"})
+
+    def test_unknown_fields(self):
+        with self.assertRaises(abi.AbiError) as context:
+            self.serializer.serialize("transfer", {"owner": "alice",
+                "to": "bob", "quantity": "1 SYS", "memo": "", "amount": 1})
+        self.assertIn("amount", str(context.exception))
+
+    def test_unknown_struct(self):
+        with self.assertRaises(abi.AbiError):
+            self.serializer.serialize("orphan", {})
+        with self.assertRaises(abi.AbiError):
+            self.serializer.columns("orphan")
+        with self.assertRaises(abi.AbiError):
+            self.serializer.columns("missing")
+        with self.assertRaises(abi.AbiError):
+            self.serializer.action_type("missing")
+
+    def test_columns(self):
+        self.assertEqual(self.serializer.columns("transfer"), [
+            ("owner", "U13"), ("to", "U13"), ("quantity", "O"),
+            ("memo", "O"), ("tag", "O")])
+        self.assertEqual(self.serializer.keys, {"accounts": "owner"})
+
+
+class TestAbiSerializer(unittest.TestCase):
+
+    def setUp(self):
+        self.code = {"account_name": "alice", "code_hash": "0" * 64,
+            "wast": ""}
+        self.teos = fake_teos(self, self.respond)
+
+    def tearDown(self):
+        pyteos.set_code_expiry(10.0)
+        pyteos._forget_code("alice")
+
+    def respond(self, call):
+        if call.subcommand == "code":
+            return self.code
+        return {"transaction_id": "aa"}
+
+    def set_code(self, code_hash, abi_json):
+        self.code = {"account_name": "alice", "code_hash": code_hash,
+            "wast": "", "abi": abi_json}
+
+    def test_missing_abi_cached(self):
+        self.assertIsNone(pyteos.abi_serializer("alice"))
+        self.assertIsNone(pyteos.abi_serializer("alice"))
+        self.assertEqual(self.teos.subcommands(), ["code"])
+        pyteos._forget_code("alice")
+        pyteos.abi_serializer("alice")
+        self.assertEqual(self.teos.subcommands(), ["code"] * 2)
+
+    def test_expiry(self):
+        self.set_code("1" * 64, ABI)
+        first = pyteos.abi_serializer("alice")
+        self.assertIs(pyteos.abi_serializer("alice"), first)
+        self.assertEqual(self.teos.subcommands(), ["code"])
+
+        pyteos.set_code_expiry(0)
+        self.set_code("2" * 64, {"actions": []})
+        second = pyteos.abi_serializer("alice")
+        self.assertIsNot(second, first)
+        self.assertEqual(second.actions, {})
+        self.assertEqual(self.teos.subcommands(), ["code"] * 2)
+
+    def test_error_forgets_hash(self):
+        self.set_code("3" * 64, ABI)
+        pyteos.abi_serializer("alice")
+        pyteos.set_code_expiry(0)
+        self.code = "ERROR: node down"
+        self.assertIsNone(pyteos.abi_serializer("alice"))
+        self.assertNotIn("alice", pyteos._code_hashes)
+
+    def binargs(self):
+        return re.search(r'"binargs": "(\w*)"',
+            self.teos.calls[-1].args[4]).group(1)
+
+    def test_push_action_stale_abi(self):
+        self.set_code("4" * 64, ABI)
+        data = {"owner": "alice", "to": "bob", "quantity": "1 SYS",
+            "memo": ""}
+        pyteos.PushAction("alice", "transfer", data, is_verbose=False)
+        self.assertNotEqual(self.binargs(), "")
+
+        # The contract is set again, elsewhere, without the action.
+        pyteos.set_code_expiry(0)
+        self.set_code("5" * 64, {"actions": []})
+        pyteos.PushAction("alice", "transfer", data, is_verbose=False)
+        self.assertEqual(self.binargs(), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+# python3 ./tests/test_archive.py
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "pyteos"))
+
+import pyteos
+import archive
+from fakes import fake_teos
+
+
+def chain(irreversible):
+    """ Answers calls of a node, that has the given last irreversible block.
+    """
+    def respond(call):
+        if call.subcommand == "info":
+            return {"head_block_num": irreversible + 5, "head_block_time": "",
+                "last_irreversible_block_num": irreversible}
+        block_num = call.jarg["block_num_or_id"]
+        return {"block_num": block_num, "id": "%08x" % block_num}
+    return respond
+
+
+class TestBlockArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "chain")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_append_and_get(self):
+        block_archive = archive.BlockArchive(self.path)
+        self.assertIsNone(block_archive.last)
+        for block_num in range(5, 9):
+            block_archive.append(block_num, '{"block_num": %d}' % block_num)
+
+        self.assertEqual((block_archive.first, block_archive.last), (5, 8))
+        self.assertEqual(block_archive.get(6), '{"block_num": 6}')
+        self.assertIsNone(block_archive.get(4))
+        self.assertIsNone(block_archive.get(9))
+        self.assertTrue("7" in block_archive)
+        self.assertFalse("x" in block_archive)
+        block_archive.close()
+
+    def test_reopen(self):
+        block_archive = archive.BlockArchive(self.path)
+        block_archive.append(1, "one")
+        block_archive.append(2, "two")
+        self.assertEqual(block_archive.get(1), "one")
+        block_archive.close()
+
+        block_archive = archive.BlockArchive(self.path)
+        self.assertEqual((block_archive.first, block_archive.count), (1, 2))
+        block_archive.append(3, "three")
+        self.assertEqual(
+            [block_archive.get(i) for i in (1, 2, 3)], ["one", "two", "three"])
+        block_archive.close()
+
+    def test_not_contiguous(self):
+        block_archive = archive.BlockArchive(self.path)
+        block_archive.append(1, "one")
+        with self.assertRaises(ValueError):
+            block_archive.append(3, "three")
+        with self.assertRaises(ValueError):
+            block_archive.append(1, "one")
+        self.assertEqual(block_archive.count, 1)
+
+    def test_not_archive(self):
+        with open(self.path + ".index", "wb") as index:
+            index.write(b"x" * 32)
+        with self.assertRaises(ValueError):
+            archive.BlockArchive(self.path)
+
+
+class TestExport(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.teos = fake_teos(self, chain(10))
+
+    def tearDown(self):
+        pyteos.set_block_archive(None)
+        self.dir.cleanup()
+
+    def test_export_irreversible(self):
+        block_archive = archive.BlockArchive(
+            os.path.join(self.dir.name, "chain"))
+        self.assertEqual(block_archive.export(8, 20, is_verbose=False), 3)
+        self.assertEqual((block_archive.first, block_archive.last), (8, 10))
+        self.assertEqual(block_archive.export(1, is_verbose=False), 0)
+
+        pyteos.set_block_archive(block_archive)
+        calls = len(self.teos.calls)
+        block = pyteos.GetBlock(9, is_verbose=False)
+        self.assertEqual((block.block_num, block.json["id"]), (9, "00000009"))
+        self.assertEqual(len(self.teos.calls), calls)
+        block_archive.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+# python3 ./tests/test_cache.py
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "pyteos"))
+
+import pyteos
+import cache
+from fakes import fake_teos
+
+RESPONSES = {
+    "code": {"account_name": "alice", "code_hash": "abc",
+        "wast": "(module)", "abi": {"structs": []}},
+    "info": {"head_block_num": 20, "head_block_time": "",
+        "last_irreversible_block_num": 10},
+    "block": {"block_num": 15, "id": "0f"}
+    }
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def test_hit_and_miss(self):
+        response_cache = cache.ResponseCache()
+        self.assertIsNone(response_cache.get("a"))
+        response_cache.put("a", "text")
+        self.assertEqual(response_cache.get("a"), "text")
+        self.assertEqual(
+            (response_cache.hits, response_cache.misses), (1, 1))
+
+    def test_eviction(self):
+        response_cache = cache.ResponseCache(budget=8)
+        response_cache.put("a", "1234")
+        response_cache.put("b", "1234")
+        response_cache.get("a")
+        response_cache.put("c", "1234")
+        self.assertIsNone(response_cache.get("b"))
+        self.assertEqual(response_cache.get("a"), "1234")
+        self.assertEqual(response_cache.size, 8)
+
+    def test_disk_store(self):
+        with tempfile.TemporaryDirectory() as path:
+            cache.ResponseCache(path=path).put("a", "text")
+            response_cache = cache.ResponseCache(path=path)
+            self.assertEqual(response_cache.get("a"), "text")
+            self.assertEqual(response_cache.disk_hits, 1)
+
+    def test_irreversible(self):
+        response_cache = cache.ResponseCache()
+        response_cache.irreversible(10)
+        response_cache.irreversible("12")
+        response_cache.irreversible(3, "node:8888")
+        self.assertEqual(response_cache.last_irreversible(), 12)
+        self.assertEqual(response_cache.last_irreversible("node:8888"), 3)
+        self.assertEqual(response_cache.last_irreversible("other:8888"), 0)
+
+    def test_chain_id(self):
+        response_cache = cache.ResponseCache()
+        response_cache.irreversible(10, chain_id="aa")
+        response_cache.put(response_cache.block_key(5), "block")
+        response_cache.irreversible(10, chain_id="bb")
+        self.assertIsNone(response_cache.get(response_cache.block_key(5)))
+        self.assertEqual(response_cache.block_key(5), "block:bb:5")
+
+    def test_chain_reset(self):
+        response_cache = cache.ResponseCache()
+        response_cache.irreversible(10, chain_id="aa")
+        response_cache.put(response_cache.block_key(5), "block")
+        response_cache.put("code:alice:abc", "code")
+        response_cache.irreversible(3, chain_id="aa")
+        self.assertIsNone(response_cache.get(response_cache.block_key(5)))
+        self.assertEqual(response_cache.get("code:alice:abc"), "code")
+        self.assertEqual(response_cache.size, 4)
+
+    def test_chain_reset_on_disk(self):
+        with tempfile.TemporaryDirectory() as path:
+            response_cache = cache.ResponseCache(path=path)
+            response_cache.irreversible(10, "a:1", "aa")
+            response_cache.put(response_cache.block_key(5), "block")
+
+            response_cache = cache.ResponseCache(path=path)
+            response_cache.irreversible(12, "a:1", "aa")
+            self.assertEqual(
+                response_cache.get(response_cache.block_key(5)), "block")
+
+            # The node was started again, in another process:
+            response_cache = cache.ResponseCache(path=path)
+            response_cache.irreversible(2, "a:1", "aa")
+            self.assertIsNone(response_cache.get(response_cache.block_key(5)))
+
+
+class TestCachedCommands(unittest.TestCase):
+
+    def setUp(self):
+        self.teos = fake_teos(
+            self, lambda call: RESPONSES[call.subcommand])
+        pyteos.set_response_cache(cache.ResponseCache())
+
+    def tearDown(self):
+        pyteos.set_response_cache(None)
+        pyteos._forget_code("alice")
+        pyteos._forget_code("bob")
+
+    def test_get_code_cached(self):
+        pyteos.GetCode("alice", is_verbose=False)
+        code = pyteos.GetCode("alice", code_hash="abc", is_verbose=False)
+        self.assertEqual(self.teos.subcommands(), ["code"])
+        self.assertEqual(code.code_hash, "abc")
+
+    def test_get_code_account_name(self):
+        pyteos.GetCode("alice", is_verbose=False)
+        pyteos.GetCode("bob", is_verbose=False)
+        code = pyteos.GetCode("bob", code_hash="abc", is_verbose=False)
+        self.assertEqual(self.teos.subcommands(), ["code"] * 2)
+        self.assertEqual(code.json["account_name"], "bob")
+
+    def test_get_code_without_hash(self):
+        # The contract may have been set again, by another process.
+        pyteos.GetCode("alice", is_verbose=False)
+        pyteos.GetCode("alice", is_verbose=False)
+        self.assertEqual(self.teos.subcommands(), ["code"] * 2)
+
+    def test_get_block_irreversible_probed_once(self):
+        pyteos.GetBlock(15, is_verbose=False)
+        pyteos.GetBlock(15, is_verbose=False)
+        self.assertEqual(self.teos.subcommands(), ["block", "info", "block"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+# python3 ./tests/test_fuzz.py
+
+import os
+import sys
+import types
+import unittest
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "pyteos"))
+
+import pyteos
+import abi
+import fuzz
+from fakes import patch
+
+ABI = {
+    "types": [{"new_type_name": "account", "type": "name"}],
+    "structs": [
+        {"name": "base", "base": "", "fields": [
+            {"name": "owner", "type": "account"}]},
+        {"name": "move", "base": "base", "fields": [
+            {"name": "to", "type": "name"},
+            {"name": "v", "type": "uint8"},
+            {"name": "row", "type": "int16"},
+            {"name": "quantity", "type": "asset"},
+            {"name": "extra", "type": "extended_asset"},
+            {"name": "memo", "type": "string"},
+            {"name": "flags", "type": "bool[]"},
+            {"name": "tag", "type": "checksum256?"},
+            {"name": "at", "type": "time_point_sec"},
+            {"name": "ratio", "type": "float64"},
+            {"name": "count", "type": "varuint32"}]}],
+    "actions": [{"name": "move", "type": "move"}]
+    }
+
+
+class TestPayloadGenerator(unittest.TestCase):
+
+    def test_values_serialize(self):
+        serializer = abi.Serializer(ABI)
+        generator = fuzz.PayloadGenerator(
+            serializer, names=["alice", "bob"], symbols=("EOS", "SYS"), seed=1)
+        for i in range(200):
+            data = generator.action("move")
+            self.assertTrue(0 <= data["v"] <= 255)
+            self.assertTrue(-2**15 <= data["row"] < 2**15)
+            serializer.serialize_action("move", data)
+
+    def test_aliased_base(self):
+        serializer = abi.Serializer({
+            "types": ABI["types"]
+                + [{"new_type_name": "base_t", "type": "base"}],
+            "structs": ABI["structs"] + [
+                {"name": "close", "base": "base_t", "fields": [
+                    {"name": "flag", "type": "bool"}]}],
+            "actions": [{"name": "close", "type": "close"}]})
+        data = fuzz.PayloadGenerator(serializer, seed=1).action("close")
+        self.assertEqual(sorted(data), ["flag", "owner"])
+        serializer.serialize_action("close", data)
+
+        serializer.structs["close"]["base"] = "missing"
+        with self.assertRaises(abi.AbiError):
+            fuzz.PayloadGenerator(serializer, seed=1).action("close")
+
+    def test_seeded(self):
+        serializer = abi.Serializer(ABI)
+        first = fuzz.PayloadGenerator(serializer, seed=7)
+        second = fuzz.PayloadGenerator(serializer, seed=7)
+        self.assertEqual([first.action("move") for i in range(5)],
+            [second.action("move") for i in range(5)])
+
+
+class FakeChain:
+    """ Stands for the contract: pushed values are appended to its state.
+    Each push gets a global sequence number from `sequence`.
+    """
+    def __init__(self, sequence=None):
+        self.state = []
+        self.pushed = []
+        self.replays = 0
+        self.sequence = sequence
+
+    def push_action(self, contract, action, data, permission="", **kwargs):
+        self.state.append(data["v"])
+        self.pushed.append(data["v"])
+        receipt = {}
+        if self.sequence is not None:
+            receipt["global_sequence"] = self.sequence(len(self.pushed))
+        return types.SimpleNamespace(error=False,
+            json={"processed": {"action_traces": [{"receipt": receipt}]}})
+
+    def reset(self, contract):
+        self.replays = self.replays + 1
+        self.state = []
+
+
+def three_before_seven(contract):
+    """ Fails if 3 is followed by 7.
+    """
+    state = contract.state
+    return not (3 in state and 7 in state[state.index(3):])
+
+
+class TestFuzzer(unittest.TestCase):
+
+    def setUp(self):
+        serializer = abi.Serializer(ABI)
+        patch(self, "pyteos.abi_serializer", lambda account: serializer)
+        patch(self, "pyteos.output__", lambda msg: None)
+
+    def fuzzer(self, chain, invariants=(three_before_seven,), **kwargs):
+        patch(self, "pyteos.PushAction", chain.push_action)
+        fuzzer = fuzz.Fuzzer(chain, "eosio",
+            types.SimpleNamespace(key_public="EOS1"), reset=chain.reset,
+            invariants=invariants, **kwargs)
+        fuzzer.create_accounts = lambda: []
+        return fuzzer
+
+    def cases(self, values):
+        return [("move", {"v": value}, "alice") for value in values]
+
+    def test_shrink(self):
+        chain = FakeChain()
+        fuzzer = self.fuzzer(chain)
+        shrunk = fuzzer.shrink(self.cases([1, 3, 5, 2, 8, 9, 7, 4, 0]))
+        self.assertEqual([data["v"] for action, data, actor in shrunk], [3, 7])
+
+    def test_shrink_not_failing(self):
+        fuzzer = self.fuzzer(FakeChain())
+        self.assertIsNone(fuzzer.shrink(self.cases([7, 3, 1])))
+
+    def test_shrink_exception(self):
+        def no_seven(contract):
+            if 7 in contract.state:
+                raise pyteos.TableReadError("Cannot read the table")
+            return True
+
+        fuzzer = self.fuzzer(FakeChain(), invariants=(no_seven,))
+        shrunk = fuzzer.shrink(self.cases([1, 3, 7, 4]))
+        self.assertEqual([data["v"] for action, data, actor in shrunk], [7])
+
+    def test_exception_reported(self):
+        def unreadable(contract):
+            raise pyteos.TableReadError("Cannot read the table")
+
+        chain = FakeChain()
+        report = self.fuzzer(chain, invariants=(unreadable,), workers=1).run(
+            count=3, batch=3, is_verbose=False)
+        self.assertEqual(report.failure,
+            "unreadable (TableReadError: Cannot read the table)")
+        self.assertEqual(len(report.shrunk), 1)
+
+    def test_replay_budget(self):
+        chain = FakeChain()
+        fuzzer = self.fuzzer(chain, max_replays=8)
+        cases = self.cases([1, 3, 5, 2, 8, 9, 7, 4, 0])
+        shrunk = fuzzer.shrink(cases)
+        self.assertEqual(chain.replays, 8)
+        self.assertEqual(len(shrunk), 6)
+        chain.state = [data["v"] for action, data, actor in shrunk]
+        self.assertFalse(three_before_seven(chain))
+
+    def test_chain_order(self):
+        # The chain executes the pushes of a batch in the reverse order.
+        chain = FakeChain(sequence=lambda pushed: -pushed)
+        report = self.fuzzer(chain, invariants=(), workers=1).run(
+            count=6, batch=6, is_verbose=False)
+        self.assertEqual([data["v"] for action, data, actor in report.cases],
+            list(reversed(chain.pushed)))
+
+    def test_completion_order(self):
+        chain = FakeChain()
+        report = self.fuzzer(chain, invariants=(), workers=1).run(
+            count=6, batch=3, is_verbose=False)
+        self.assertEqual(report.pushed, 6)
+        self.assertEqual([data["v"] for action, data, actor in report.cases],
+            chain.pushed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+# python3 ./tests/test_indexer.py
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "pyteos"))
+
+import pyteos
+import indexer
+from fakes import fake_teos, patch
+
+
+def action(contract, name, actor, data=None):
+    return {"account": contract, "name": name, "data": data or {},
+        "authorization": [{"actor": actor, "permission": "active"}]}
+
+
+def transaction(trx_id, *actions):
+    return {"status": "executed", "trx": {"id": trx_id,
+        "transaction": {"actions": list(actions)}}}
+
+
+BLOCKS = {
+    1: [transaction("aa", action("ttt", "create", "alice"))],
+    2: [transaction("bb", action("ttt", "move", "bob", {"row": 1}),
+            action("ttt", "move", "alice", {"row": 2})),
+        {"status": "executed", "trx": "cc"}],
+    3: [transaction("aa", action("ttt", "create", "alice")),
+        transaction("dd", action("eosio.token", "transfer", "bob"))],
+    4: [transaction("ee", {"account": "ttt", "name": "close", "data": {},
+        "authorization": [{"actor": "alice", "permission": "active"},
+            {"actor": "bob", "permission": "owner"}]})]
+    }
+
+
+class TestActionIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "actions.db")
+        self.irreversible = 4
+        self.teos = fake_teos(self, self.respond)
+        patch(self, "pyteos.output__", lambda msg: None)
+        self.index = indexer.ActionIndex(self.path)
+
+    def tearDown(self):
+        self.index.close()
+        self.dir.cleanup()
+
+    def respond(self, call):
+        if call.subcommand == "info":
+            return {"head_block_num": self.irreversible + 3,
+                "head_block_time": "",
+                "last_irreversible_block_num": self.irreversible}
+        block_num = call.jarg["block_num_or_id"]
+        return {"block_num": block_num, "transactions": BLOCKS[block_num]}
+
+    def blocks(self):
+        return [call.jarg["block_num_or_id"] for call in self.teos.calls
+            if call.subcommand == "block"]
+
+    def names(self, **kwargs):
+        return [(action["block_num"], action["action"])
+            for action in self.index.query(**kwargs)]
+
+    def test_resume(self):
+        self.irreversible = 2
+        self.assertEqual(self.index.update(), 2)
+        self.index.close()
+
+        self.irreversible = 4
+        self.index = indexer.ActionIndex(self.path)
+        self.assertEqual(self.index.last_block, 2)
+        self.assertEqual(self.index.update(last=3), 1)
+        self.assertEqual(self.index.update(), 1)
+        self.assertEqual(self.index.update(), 0)
+        self.assertEqual(self.blocks(), [1, 2, 3, 4])
+        self.assertEqual(self.index.last_block, 4)
+
+    def test_failed_block(self):
+        respond = self.teos.respond
+        self.teos.respond = lambda call: "ERROR\nUnknown block" \
+            if call.jarg.get("block_num_or_id") == 3 else respond(call)
+        self.assertEqual(self.index.update(), 2)
+        self.assertEqual(self.index.last_block, 2)
+        self.teos.respond = respond
+        self.assertEqual(self.index.update(), 2)
+        self.assertEqual(self.blocks(), [1, 2, 3, 3, 4])
+
+    def test_skipped_transactions(self):
+        self.index.update()
+        self.assertEqual(
+            [(action["block_num"], action["trx_id"])
+                for action in self.index.query()],
+            [(1, "aa"), (2, "bb"), (2, "bb"), (3, "dd"), (4, "ee")])
+
+    def test_query(self):
+        self.index.update()
+        self.assertEqual(self.names(account="bob"),
+            [(2, "move"), (3, "transfer"), (4, "close")])
+        self.assertEqual(self.names(contract="eosio.token"),
+            [(3, "transfer")])
+        self.assertEqual(self.names(action="move"), [(2, "move")] * 2)
+        self.assertEqual(self.names(first=3), [(3, "transfer"), (4, "close")])
+        self.assertEqual(self.names(last=1), [(1, "create")])
+        self.assertEqual(self.names(limit=2), [(1, "create"), (2, "move")])
+        self.assertEqual(
+            self.names(account="alice", contract="ttt", first=2, limit=1),
+            [(2, "move")])
+
+    def test_query_fields(self):
+        self.index.update()
+        actions = self.index.query(action="move")
+        self.assertEqual(actions[1], {"block_num": 2, "trx_id": "bb",
+            "contract": "ttt", "action": "move", "data": {"row": 2},
+            "authorization": [{"actor": "alice", "permission": "active"}]})
+        self.assertEqual(self.index.query(action="close")[0]["authorization"],
+            [{"actor": "alice", "permission": "active"},
+                {"actor": "bob", "permission": "owner"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+# python3 ./tests/test_json.py
+
+import os
+import sys
+import json
+import unittest
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "pyteos"))
+
+import pyteos
+from fakes import fake_teos
+
+BLOCK = {
+    "block_num": 7, "id": "0007", "timestamp": "2018-05-01T12:00:00.000",
+    "ref_block_prefix": 99, "producer": "eosio",
+    "transactions": [
+        {"status": "executed", "trx": {"id": "aa", "transaction": {
+            "actions": [{"name": "move", "data": {"text": "a \"]} b",
+                "rows": [[1, 2], {"x": None}]}}]}}},
+        {"status": "executed", "trx": {"id": "bb", "transaction": {
+            "actions": [{"name": "restart", "data": {}},
+                {"name": "close", "data": {"flag": True}}]}}}
+    ]}
+
+
+def scan(text, fields):
+    return pyteos._json_project(
+        text, pyteos._JSON_SPACE.match(text).end(), fields)
+
+
+class TestJsonScanner(unittest.TestCase):
+
+    def test_value_end(self):
+        text = '{"a": "x\\"}", "b": [1, {"c": "]"}], "d": -1.5e3}'
+        self.assertEqual(pyteos._json_value_end(text, 0), len(text))
+        self.assertEqual(
+            [(key, json.loads(text[start:end])) for key, start, end
+                in pyteos._json_elements(text, 0)],
+            [("a", 'x"}'), ("b", [1, {"c": "]"}]), ("d", -1500.0)])
+
+    def test_array_elements(self):
+        text = '[ 1 , "two", [3], {"four": 4}, null ]'
+        self.assertEqual(
+            [json.loads(text[start:end]) for key, start, end
+                in pyteos._json_elements(text, 0)],
+            [1, "two", [3], {"four": 4}, None])
+        self.assertEqual(list(pyteos._json_elements("[]", 0)), [])
+
+    def test_project(self):
+        text = json.dumps(BLOCK, indent=2)
+        self.assertEqual(
+            scan(text, ["block_num", "transactions.trx.id", "missing"]),
+            {"block_num": 7, "transactions": [
+                {"trx": {"id": "aa"}}, {"trx": {"id": "bb"}}]})
+        self.assertEqual(
+            scan(text, ["transactions.trx.transaction.actions.name"]),
+            {"transactions": [
+                {"trx": {"transaction": {"actions": [{"name": "move"}]}}},
+                {"trx": {"transaction": {"actions": [
+                    {"name": "restart"}, {"name": "close"}]}}}]})
+        self.assertEqual(scan(text, ["producer", "block_num"]),
+            {"block_num": 7, "producer": "eosio"})
+
+
+class TestBlockTransactions(unittest.TestCase):
+
+    def setUp(self):
+        fake_teos(self, lambda call: BLOCK)
+
+    def test_fields(self):
+        block = pyteos.GetBlock(7, fields=["block_num", "timestamp"],
+            is_verbose=False)
+        self.assertEqual(block.json, {"block_num": 7,
+            "timestamp": "2018-05-01T12:00:00.000"})
+        self.assertEqual(block.block_num, 7)
+        self.assertIsNone(block.ref_block_prefix)
+
+    def test_transactions(self):
+        block = pyteos.GetBlock(7, is_verbose=False)
+        self.assertEqual(list(block.transactions()), BLOCK["transactions"])
+        self.assertEqual(list(block.transactions(["trx.id"])),
+            [{"trx": {"id": "aa"}}, {"trx": {"id": "bb"}}])
+
+
+if __name__ == "__main__":
+    unittest.main()
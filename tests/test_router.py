@@ -0,0 +1,108 @@
+# python3 ./tests/test_router.py
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "pyteos"))
+
+import pyteos
+import cache
+import router
+from fakes import fake_teos
+
+
+def nodes(nodes):
+    """ Answers calls of nodes, that have the given head and last 
+    irreversible blocks, keyed by address. Other addresses are unreachable.
+    """
+    def respond(call):
+        node = nodes.get(call.address)
+        if node is None:
+            return "ERROR\nConnection refused"
+        head, irreversible = node
+        if call.subcommand == "info":
+            return {"head_block_num": head, "head_block_time": "",
+                "last_irreversible_block_num": irreversible}
+        if call.subcommand == "block":
+            return {"block_num": call.jarg["block_num_or_id"]}
+        return {"rows": [], "more": 0}
+    return respond
+
+
+class TestNodeRouter(unittest.TestCase):
+
+    def setUp(self):
+        self.nodes = fake_teos(self, nodes({"a:1": (100, 90),
+            "b:2": (98, 60), "c:3": (50, 40)}))
+
+    def tearDown(self):
+        pyteos.set_node_router(None)
+        pyteos.set_response_cache(None)
+
+    def test_round_robin(self):
+        node_router = router.NodeRouter(["a:1", "b:2"], probe_interval=0)
+        self.assertEqual(
+            [node_router.acquire() for i in range(4)],
+            ["a:1", "b:2", "a:1", "b:2"])
+
+    def test_least_outstanding(self):
+        node_router = router.NodeRouter(["a:1", "b:2"],
+            policy=router.LEAST_OUTSTANDING, probe_interval=0)
+        first = node_router.acquire()
+        second = node_router.acquire()
+        node_router.release(first)
+        self.assertNotEqual(first, second)
+        self.assertEqual(node_router.acquire(), first)
+
+    def test_pushes_pinned(self):
+        node_router = router.NodeRouter(
+            ["a:1", "b:2"], primary="b:2", probe_interval=0)
+        self.assertEqual(
+            [node_router.acquire(True) for i in range(3)], ["b:2"] * 3)
+
+    def test_probe(self):
+        node_router = router.NodeRouter(
+            ["a:1", "b:2", "c:3", "d:4"], probe_interval=0, max_lag=10)
+        node_router.probe()
+        self.assertEqual(node_router.healthy(), ["a:1", "b:2"])
+
+    def test_unreachable_dropped(self):
+        node_router = router.NodeRouter(["a:1", "d:4"], probe_interval=0)
+        pyteos.set_node_router(node_router)
+        for i in range(3):
+            pyteos.GetTable("x", "t", "s", is_verbose=False)
+        self.assertEqual(node_router.healthy(), ["a:1"])
+        self.assertEqual([call.address for call in self.nodes.calls],
+            ["a:1", "d:4", "a:1"])
+
+    def test_use_node(self):
+        pyteos.set_node_router(
+            router.NodeRouter(["a:1", "b:2"], probe_interval=0))
+        with pyteos.use_node("c:3"):
+            pyteos.GetInfo(is_verbose=False)
+        pyteos.GetConfig(is_verbose=False)
+        self.assertEqual(
+            [(call.subcommand, call.address) for call in self.nodes.calls],
+            [("info", "c:3"), ("config", "")])
+
+    def test_irreversible_per_node(self):
+        response_cache = cache.ResponseCache()
+        pyteos.set_response_cache(response_cache)
+        pyteos.set_node_router(
+            router.NodeRouter(["a:1", "b:2"], probe_interval=0))
+        with pyteos.use_node("a:1"):
+            pyteos.GetInfo(is_verbose=False)
+
+        # Block 70 is irreversible on a:1, not on b:2, that returns it.
+        with pyteos.use_node("b:2"):
+            pyteos.GetBlock(70, is_verbose=False)
+        self.assertIsNone(response_cache.get(response_cache.block_key(70)))
+        with pyteos.use_node("a:1"):
+            pyteos.GetBlock(70, is_verbose=False)
+        self.assertIsNotNone(response_cache.get(response_cache.block_key(70)))
+
+
+if __name__ == "__main__":
+    unittest.main()
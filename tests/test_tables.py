@@ -0,0 +1,215 @@
+# python3 ./tests/test_tables.py
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "pyteos"))
+
+import pyteos
+import abi
+from fakes import fake_teos, patch
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def pages(responses):
+    """ Answers table reads with the next of the given responses, a list of 
+    rows or `None` for an error.
+    """
+    responses = list(responses)
+    def respond(call):
+        rows = responses.pop(0)
+        if rows is None:
+            return "ERROR\nConnection refused"
+        return {"rows": rows, "more": 0}
+    return respond
+
+
+def tables(state):
+    """ Answers table reads with the rows of the given state, keyed by table
+    and scope. Tables missing from the state fail.
+    """
+    def respond(call):
+        rows = state.get((call.jarg["table"], call.jarg["scope"]))
+        if rows is None or call.jarg["code"] != "ttt1ttt2ttt3":
+            return "ERROR\nNo table"
+        return {"rows": rows, "more": 0}
+    return respond
+
+
+def paged(rows, key):
+    """ Answers table reads with pages of the given rows, ordered by the 
+    numeric value of the `key` names, from the lower bound.
+    """
+    def respond(call):
+        lower = call.jarg["lower_bound"]
+        ordered = sorted(rows, key=lambda row: abi.name_to_int(row[key]))
+        ordered = [row for row in ordered 
+            if not lower or abi.name_to_int(row[key]) >= int(lower)]
+        limit = call.jarg["limit"]
+        return {"rows": ordered[:limit], "more": int(len(ordered) > limit)}
+    return respond
+
+
+def contract(account_name="ttt1ttt2ttt3", name="tic_tac_toe"):
+    contract = pyteos.Contract.__new__(pyteos.Contract)
+    contract.account_name = account_name
+    contract.name = name
+    return contract
+
+
+class TableTest(unittest.TestCase):
+
+    def setUp(self):
+        patch(self, "time.sleep", lambda seconds: None)
+
+    def serializer(self, serializer):
+        patch(self, "pyteos.abi_serializer", lambda account:
+            serializer if account == "ttt1ttt2ttt3" else None)
+
+
+class TestWatchTable(TableTest):
+
+    def test_failed_read_skipped(self):
+        teos = fake_teos(self, pages([
+            [{"id": "1", "v": "a"}, {"id": "2", "v": "b"}],
+            None,
+            [{"id": "1", "v": "a"}, {"id": "2", "v": "c"}]]))
+        changes = contract().watch_table("t", key="id")
+        self.assertEqual(next(changes), ("update", "2", {"id": "2", "v": "c"}))
+        self.assertEqual(
+            [(call.jarg["code"], call.jarg["scope"]) for call in teos.calls],
+            [("ttt1ttt2ttt3", "ttt1ttt2ttt3")] * 3)
+
+    def test_failed_page_keeps_index(self):
+        rows = [{"challenger": name, "v": "a"} 
+            for name in ("alice", "bob", "carol")]
+        respond = paged(rows, "challenger")
+        def update(call):
+            # The first read is complete, the second fails at its second page.
+            if len(teos.calls) == 3:
+                rows[0] = {"challenger": "alice", "v": "b"}
+            if len(teos.calls) == 4:
+                return "ERROR\nConnection refused"
+            return respond(call)
+        teos = fake_teos(self, update)
+        changes = contract().watch_table(
+            "games", key="challenger", limit=2)
+        self.assertEqual(next(changes), ("update", "alice", rows[0]))
+        self.assertEqual(len(teos.calls), 6)
+
+    def test_table_rows_name_keys(self):
+        rows = [{"challenger": name} for name in 
+            ("alice", "bob", "carol", "dave", "eve")]
+        teos = fake_teos(self, paged(rows, "challenger"))
+        self.assertEqual(list(pyteos._table_rows(
+            "ttt", "games", "ttt", "challenger", limit=2)), rows)
+        self.assertEqual([call.jarg["lower_bound"] for call in teos.calls],
+            ["", str(abi.name_to_int("bob") + 1), 
+                str(abi.name_to_int("dave") + 1)])
+
+    def test_table_rows_raise(self):
+        fake_teos(self, pages([None]))
+        with self.assertRaises(pyteos.TableReadError):
+            list(pyteos._table_rows("ttt", "t", "ttt"))
+
+
+class TestSnapshot(TableTest):
+
+    ABI = {"tables": [{"name": "games", "type": "game", "key_names": ["id"]},
+        {"name": "config", "type": "config"}]}
+
+    def setUp(self):
+        TableTest.setUp(self)
+        self.serializer(abi.Serializer(self.ABI))
+
+    def snapshot(self, state):
+        fake_teos(self, tables(state))
+        return contract().snapshot_state(["alice", "bob"])
+
+    def test_diff(self):
+        state = {("games", "alice"): [{"id": "1", "v": "a"}, {"id": "2", "v": "b"}],
+            ("games", "bob"): [{"id": "1", "v": "a"}],
+            ("config", "alice"): [{"k": "1"}], ("config", "bob"): []}
+        before = self.snapshot(state)
+        state[("games", "alice")] = [{"id": "3", "v": "d"}, {"id": "2", "v": "c"}]
+        after = self.snapshot(state)
+
+        self.assertEqual(contract().diff(before, after), [
+            ("insert", "games", "alice", "3", None, {"id": "3", "v": "d"}),
+            ("update", "games", "alice", "2", {"id": "2", "v": "b"},
+                {"id": "2", "v": "c"}),
+            ("delete", "games", "alice", "1", {"id": "1", "v": "a"}, None)])
+
+    def test_digest_order_independent(self):
+        rows = [{"id": str(i), "v": "a"} for i in range(5)]
+        state = {("games", "alice"): rows, ("games", "bob"): [],
+            ("config", "alice"): [], ("config", "bob"): []}
+        before = self.snapshot(state)
+        state[("games", "alice")] = list(reversed(rows))
+        after = self.snapshot(state)
+        self.assertEqual(before[("games", "alice")][0],
+            after[("games", "alice")][0])
+        self.assertEqual(contract().diff(before, after), [])
+
+    def test_failed_read_raises(self):
+        state = {("games", "alice"): [], ("games", "bob"): [],
+            ("config", "alice"): []}
+        with self.assertRaises(pyteos.TableReadError):
+            self.snapshot(state)
+
+
+class TestTableFrame(TableTest):
+
+    ABI = {"structs": [
+        {"name": "point", "base": "", "fields": [
+            {"name": "x", "type": "int32"}, {"name": "y", "type": "int32"}]},
+        {"name": "game", "base": "", "fields": [
+            {"name": "id", "type": "uint64"},
+            {"name": "player", "type": "name"},
+            {"name": "score", "type": "float64"},
+            {"name": "open", "type": "bool"},
+            {"name": "at", "type": "point"},
+            {"name": "board", "type": "uint8[]"}]}],
+        "tables": [{"name": "games", "type": "game", "key_names": ["id"]}]}
+
+    ROW = {"id": "1", "player": "alice", "score": "2.5", "open": 1,
+        "at": {"x": "3", "y": "-4"}, "board": ["0", "1"]}
+
+    def setUp(self):
+        TableTest.setUp(self)
+        self.columns = abi.Serializer(self.ABI).columns("game")
+
+    def test_row_values(self):
+        self.assertEqual(pyteos._row_values(self.columns, self.ROW),
+            (1, "alice", 2.5, True, (3, -4), [0, 1]))
+        self.assertEqual(pyteos._row_values(self.columns,
+            dict(self.ROW, player="")), (1, "", 2.5, True, (3, -4), [0, 1]))
+
+    def test_missing_values_raise(self):
+        for row in [dict(self.ROW, score=""), dict(self.ROW, id=None),
+                dict(self.ROW, at={"x": "3"}), dict(self.ROW, board=None),
+                dict([(key, value) for key, value in self.ROW.items()
+                    if key != "open"])]:
+            with self.assertRaises(abi.AbiError):
+                pyteos._row_values(self.columns, row)
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed.")
+    def test_table_frame(self):
+        self.serializer(abi.Serializer(self.ABI))
+        fake_teos(self, tables({("games", "ttt1ttt2ttt3"): [
+            self.ROW, dict(self.ROW, id="2", score="1")]}))
+        frame = contract().table_frame("games", limit=1)
+
+        self.assertEqual(list(frame["id"]), [1, 2])
+        self.assertEqual(frame["score"].sum(), 3.5)
+        self.assertEqual(list(frame["at"]["y"]), [-4, -4])
+
+
+if __name__ == "__main__":
+    unittest.main()
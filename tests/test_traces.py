@@ -0,0 +1,95 @@
+# python3 ./tests/test_traces.py
+
+import io
+import os
+import sys
+import json
+import tempfile
+import unittest
+import contextlib
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "pyteos"))
+
+import pyteos
+import traces
+from fakes import fake_teos
+
+
+def trace(name, console="", inline=()):
+    return {"act": {"account": "game", "name": name}, "console": console,
+        "receipt": {"receiver": "game"}, "inline_traces": list(inline)}
+
+TRANSACTION = {"transaction_id": "aa", "processed": {
+    "receipt": {"status": "executed"}, "action_traces": [
+        trace("move", "moved ", [trace("log", "logged ", [trace("note")]),
+            trace("pay", "paid")])]}}
+
+
+class TestActionTraces(unittest.TestCase):
+
+    def test_depth_first(self):
+        self.assertEqual(
+            [(trace["act"]["name"], depth) for trace, depth
+                in traces.action_traces(TRANSACTION)],
+            [("move", 0), ("log", 1), ("note", 2), ("pay", 1)])
+        self.assertEqual(list(traces.action_traces({})), [])
+
+    def test_records(self):
+        records = traces.action_records(TRANSACTION, 5)
+        self.assertEqual([(record["index"], record["action"], record["trx_id"],
+            record["status"]) for record in records], [
+                (0, "move", "aa", "executed"), (1, "log", "aa", "executed"),
+                (2, "note", "aa", "executed"), (3, "pay", "aa", "executed")])
+
+
+class TestTraceSink(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "traces.jsonl")
+        fake_teos(self, lambda call: TRANSACTION if call.subcommand == "action"
+            else {"account_name": "game", "code_hash": "0" * 64, "wast": ""},
+            out="pushed")
+
+    def tearDown(self):
+        pyteos.set_trace_sink(None)
+        pyteos._forget_code("game")
+        self.dir.cleanup()
+
+    def test_written(self):
+        sink = traces.TraceSink(self.path)
+        sink.put(TRANSACTION)
+        sink.put(TRANSACTION)
+        sink.close()
+        with open(self.path) as file:
+            lines = [json.loads(line) for line in file]
+        self.assertEqual(len(lines), 8)
+        self.assertEqual((sink.written, sink.dropped), (8, 0))
+
+    def test_push_action_quiet(self):
+        sink = traces.TraceSink(self.path)
+        pyteos.set_trace_sink(sink)
+        contract = pyteos.Contract.__new__(pyteos.Contract)
+        contract.account_name = "game"
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            pyteos.PushAction("game", "move", "{}", is_verbose=True)
+            contract.push_action("move", "{}")
+        self.assertEqual(out.getvalue(), "")
+        self.assertEqual(contract.console, "moved ")
+        sink.close()
+        self.assertEqual(sink.written, 8)
+
+    def test_inline_console(self):
+        contract = pyteos.Contract.__new__(pyteos.Contract)
+        contract.account_name = "game"
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            contract.push_action("move", "{}", inline_console=True)
+        self.assertEqual(contract.console, "moved logged paid")
+        self.assertEqual(out.getvalue(), "pushed\nmoved logged paid\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
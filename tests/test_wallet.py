@@ -0,0 +1,101 @@
+# python3 ./tests/test_wallet.py
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "pyteos"))
+
+import pyteos
+from fakes import fake_teos, patch
+
+
+class Keosd:
+    """ Stands for `keosd`: wallets are opened and unlocked, until it is
+    restarted.
+    """
+    def __init__(self):
+        self.opened = set()
+        self.unlocked = set()
+
+    def restart(self):
+        self.opened = set()
+        self.unlocked = set()
+
+    def respond(self, call):
+        name = call.jarg["name"]
+        if call.subcommand == "open":
+            self.opened.add(name)
+            return {}
+        if not name in self.opened:
+            return "ERROR\nWallet not found: " + name
+        if call.subcommand == "unlock":
+            if name in self.unlocked:
+                return "ERROR\nWallet is already unlocked: " + name
+            self.unlocked.add(name)
+        elif call.subcommand == "lock":
+            self.unlocked.discard(name)
+        return {}
+
+
+class TestWalletSession(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patch(self, "time.time", lambda: self.now)
+        self.keosd = Keosd()
+        self.teos = fake_teos(self, self.keosd.respond)
+        self.session = pyteos.WalletSession(
+            "default", "PW5", timeout=100, margin=10)
+
+    def test_cached(self):
+        self.assertTrue(self.session.unlock())
+        self.assertTrue(self.session.unlock())
+        self.assertTrue(self.session.open())
+        self.assertEqual(self.teos.subcommands(), ["open", "unlock"])
+        self.assertEqual(self.teos.calls[1].jarg["password"], "PW5")
+
+    def test_timeout_margin(self):
+        self.session.unlock()
+        self.now = self.now + 89
+        self.session.unlock()
+        self.assertEqual(self.teos.subcommands(), ["open", "unlock"])
+
+        # keosd still has the wallet unlocked.
+        self.now = self.now + 1
+        self.assertTrue(self.session.unlock())
+        self.assertEqual(self.teos.subcommands(), ["open", "unlock", "unlock"])
+        self.assertEqual(self.session.unlock_time, self.now)
+
+    def test_restart(self):
+        self.session.unlock()
+        self.keosd.restart()
+        self.now = self.now + 95
+        self.assertTrue(self.session.unlock())
+        self.assertEqual(self.teos.subcommands(),
+            ["open", "unlock", "unlock", "open", "unlock"])
+        self.assertEqual(self.keosd.unlocked, {"default"})
+
+    def test_unlock_fails(self):
+        self.teos.respond = lambda call: {} if call.subcommand == "open" \
+            else "ERROR\nInvalid password"
+        self.assertFalse(self.session.unlock())
+        self.assertEqual(self.teos.subcommands(),
+            ["open", "unlock", "open", "unlock"])
+        self.assertFalse(self.session.is_open)
+        self.assertIsNone(self.session.unlock_time)
+
+    def test_lock(self):
+        pyteos.set_wallet_session(self.session)
+        self.addCleanup(pyteos.set_wallet_session, None)
+        self.session.unlock()
+        pyteos.WalletLock("default", is_verbose=False)
+        self.assertIsNone(self.session.unlock_time)
+        self.assertTrue(self.session.unlock())
+        self.assertEqual(self.teos.subcommands(), ["open", "unlock", "lock",
+            "unlock"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,275 @@
+# python3 ./tests/test_workspace.py
+
+import os
+import sys
+import tempfile
+import unittest
+import pathlib
+import concurrent.futures
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "pyteos"))
+
+import pyteos
+import workspace
+from fakes import patch
+
+FILES = {
+    "include/shared.hpp": "#pragma once\n",
+    "include/unused.hpp": "#pragma once\n",
+    "contracts/token/token.cpp":
+        '#include "token.hpp"\n#include <shared.hpp>\n',
+    "contracts/token/token.hpp": "#pragma once\n",
+    "contracts/exchange/exchange.cpp":
+        '#include "../token/token.hpp"\n#include <missing.hpp>\n',
+    "contracts/game/game.cpp": '  #  include "game.hpp"\n',
+    "contracts/game/game.hpp": "#include <shared.hpp>\n",
+    "contracts/docs/readme.md": "not a contract\n",
+    }
+
+
+class WorkspaceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.dir.name).resolve()
+        for name, text in FILES.items():
+            self.write(name, text, 1000)
+        self.built = []
+        self.clock = 2000
+        patch(self, "workspace._build", self.build)
+        patch(self, "concurrent.futures.ProcessPoolExecutor",
+            concurrent.futures.ThreadPoolExecutor)
+        patch(self, "pyteos.output__", lambda msg: None)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, name, text, mtime):
+        file = self.root / name
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_text(text)
+        os.utime(str(file), (mtime, mtime))
+        return file
+
+    def touch(self, name):
+        """ Sets the modification time of a file later than of any file 
+        written before.
+        """
+        self.clock = self.clock + 10
+        os.utime(str(self.root / name), (self.clock, self.clock))
+
+    def build(self, path, include_dir, optimize=""):
+        """ Stands for the build of a contract, in a worker process.
+        """
+        path = pathlib.Path(path)
+        self.built.append(path.name)
+        for suffix in (".wast", ".abi"):
+            self.write(str(path / (path.name + suffix)), "", self.clock + 1)
+        return ""
+
+    def workspace(self):
+        return workspace.ContractWorkspace(self.root / "contracts",
+            include_dirs=[self.root / "include"])
+
+
+class TestContractTarget(WorkspaceTest):
+
+    def test_scan(self):
+        target = workspace.ContractTarget(self.root / "contracts/token")
+        self.assertEqual(target.sources,
+            [self.root / "contracts/token/token.cpp"])
+        self.assertEqual(target.outputs, [
+            self.root / "contracts/token/token.wast",
+            self.root / "contracts/token/token.abi"])
+
+        target.scan()
+        self.assertEqual(target.dependencies, set([
+            self.root / "contracts/token/token.cpp",
+            self.root / "contracts/token/token.hpp"]))
+
+        headers = {}
+        target.scan([self.root / "include"], headers)
+        self.assertEqual(target.dependencies, set([
+            self.root / "contracts/token/token.cpp",
+            self.root / "contracts/token/token.hpp",
+            self.root / "include/shared.hpp"]))
+        self.assertIn(self.root / "include/shared.hpp", headers)
+
+    def test_nested_includes(self):
+        target = workspace.ContractTarget(self.root / "contracts/game")
+        target.scan([self.root / "include"])
+        self.assertEqual(target.dependencies, set([
+            self.root / "contracts/game/game.cpp",
+            self.root / "contracts/game/game.hpp",
+            self.root / "include/shared.hpp"]))
+
+    def test_build_dir(self):
+        (self.root / "contracts/token/build").mkdir()
+        target = workspace.ContractTarget(self.root / "contracts/token")
+        self.assertEqual(target.outputs[1],
+            self.root / "contracts/token/build/token.abi")
+
+    def test_is_stale(self):
+        target = workspace.ContractTarget(self.root / "contracts/token")
+        target.scan([self.root / "include"])
+        self.assertTrue(target.is_stale())
+
+        self.write("contracts/token/token.wast", "", 2000)
+        self.assertTrue(target.is_stale())
+        self.write("contracts/token/token.abi", "", 2000)
+        self.assertFalse(target.is_stale())
+
+        self.touch("include/unused.hpp")
+        self.assertFalse(target.is_stale())
+        self.touch("include/shared.hpp")
+        self.assertTrue(target.is_stale())
+        os.utime(str(self.root / "include/shared.hpp"), (1000, 1000))
+
+        os.remove(str(self.root / "contracts/token/token.hpp"))
+        self.assertTrue(target.is_stale())
+
+
+class TestContractWorkspace(WorkspaceTest):
+
+    def test_targets(self):
+        contracts = self.workspace()
+        self.assertEqual(sorted(contracts.targets),
+            ["exchange", "game", "token"])
+        self.assertEqual(contracts.targets["exchange"].contracts,
+            set(["token"]))
+        self.assertEqual(contracts.targets["token"].contracts, set())
+        self.assertEqual(
+            contracts.dependents(self.root / "contracts/token/token.hpp"),
+            ["exchange", "token"])
+        self.assertEqual(
+            contracts.dependents(self.root / "include/shared.hpp"),
+            ["game", "token"])
+
+    def test_build_stale(self):
+        contracts = self.workspace()
+        self.assertEqual(contracts.build(jobs=2, is_verbose=False),
+            {"exchange": "", "game": "", "token": ""})
+        self.assertEqual(contracts.stale(), [])
+        self.assertEqual(contracts.build(is_verbose=False), {})
+
+        self.touch("contracts/token/token.hpp")
+        self.assertEqual(contracts.stale(), ["exchange", "token"])
+        self.built = []
+        contracts.build(is_verbose=False)
+        self.assertEqual(sorted(self.built), ["exchange", "token"])
+
+        self.touch("include/shared.hpp")
+        self.built = []
+        contracts.build(names=["game"], is_verbose=False)
+        self.assertEqual(self.built, ["game"])
+        self.assertEqual(contracts.stale(), ["token"])
+
+        self.built = []
+        contracts.build(names=["exchange"], force=True, is_verbose=False)
+        self.assertEqual(self.built, ["exchange"])
+
+    def test_build_error(self):
+        patch(self, "workspace._build",
+            lambda path, include_dir, optimize="": "ERROR\nsyntax error")
+        contracts = self.workspace()
+        self.assertEqual(contracts.build(names=["game"], is_verbose=False),
+            {"game": "ERROR\nsyntax error"})
+        self.assertEqual(contracts.stale(), ["exchange", "game", "token"])
+
+    def test_new_header(self):
+        contracts = self.workspace()
+        contracts.build(is_verbose=False)
+        self.write("contracts/game/game.hpp",
+            '#include "rules.hpp"\n', 1000)
+        self.write("contracts/game/rules.hpp", "#pragma once\n", 1000)
+        self.touch("contracts/game/rules.hpp")
+        self.assertEqual(contracts.stale(), [])
+        contracts.scan()
+        self.assertEqual(contracts.stale(), ["game"])
+
+
+class TestFileWatcher(WorkspaceTest):
+    """ Watches files with `inotify`.
+    """
+    def setUp(self):
+        WorkspaceTest.setUp(self)
+        try:
+            workspace._Inotify().close()
+        except (OSError, AttributeError, TypeError):
+            self.skipTest("inotify is not available")
+
+    def watcher(self, files):
+        watcher = workspace.FileWatcher(files, interval=0.01)
+        self.addCleanup(watcher.close)
+        return watcher
+
+    def edit(self, name):
+        self.clock = self.clock + 10
+        return self.write(name, "// edited\n", self.clock)
+
+    def test_rebuild_affected(self):
+        contracts = self.workspace()
+        contracts.build(is_verbose=False)
+        watcher = self.watcher(set().union(*[target.dependencies
+            for target in contracts.targets.values()]))
+
+        self.built = []
+        self.edit("contracts/game/game.hpp")
+        changed, first = watcher.wait(debounce=0.05)
+        self.assertEqual(changed,
+            set([self.root / "contracts/game/game.hpp"]))
+        names = set()
+        for file in changed:
+            names.update(contracts.dependents(file))
+        contracts.build(names=sorted(names), is_verbose=False)
+        self.assertEqual(self.built, ["game"])
+        self.assertEqual(contracts.stale(), [])
+
+    def test_unwatched_ignored(self):
+        watcher = self.watcher([self.root / "contracts/token/token.hpp"])
+        self.edit("contracts/token/token.cpp")
+        self.edit("include/shared.hpp")
+        self.edit("contracts/token/token.hpp")
+        changed, first = watcher.wait(debounce=0.05)
+        self.assertEqual(changed,
+            set([self.root / "contracts/token/token.hpp"]))
+
+    def test_burst(self):
+        watcher = self.watcher([self.root / "contracts/token/token.hpp",
+            self.root / "contracts/token/token.cpp"])
+        self.edit("contracts/token/token.hpp")
+        self.edit("contracts/token/token.cpp")
+        changed, first = watcher.wait(debounce=0.2)
+        self.assertEqual(len(changed), 2)
+
+    def test_watch_again(self):
+        watcher = self.watcher([self.root / "contracts/token/token.hpp"])
+        watcher.watch([self.root / "contracts/game/game.hpp"])
+        self.edit("contracts/token/token.hpp")
+        self.edit("contracts/game/game.hpp")
+        changed, first = watcher.wait(debounce=0.05)
+        self.assertEqual(changed,
+            set([self.root / "contracts/game/game.hpp"]))
+
+
+class TestPollingFileWatcher(TestFileWatcher):
+    """ Polls the modification times of files, without `inotify`.
+    """
+    def setUp(self):
+        WorkspaceTest.setUp(self)
+        def unavailable():
+            raise OSError("inotify_init1 failed")
+        patch(self, "workspace._Inotify", unavailable)
+
+    def test_polling(self):
+        watcher = self.watcher([self.root / "contracts/token/token.hpp"])
+        self.assertIsNone(watcher._FileWatcher__inotify)
+        os.remove(str(self.root / "contracts/token/token.hpp"))
+        changed, first = watcher.wait(debounce=0.05)
+        self.assertEqual(changed,
+            set([self.root / "contracts/token/token.hpp"]))
+
+
+if __name__ == "__main__":
+    unittest.main()